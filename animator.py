@@ -1,17 +1,12 @@
 """
 Abstract animator class that manages the animation.
 """
-import matplotlib.pyplot as plt
-from matplotlib.lines import Line2D
-from matplotlib.text import Text
-from matplotlib.collections import Collection, PathCollection
-from matplotlib.quiver import QuiverKey, Quiver
-import matplotlib.animation as animation
+from matplotlib.artist import Artist
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from typing import List
 from time import perf_counter
-
-
-artists = [Line2D, Collection, Text, QuiverKey, Quiver, PathCollection]
+from frame_stats import FrameStats
 
 
 class Animator:
@@ -26,12 +21,24 @@ class Animator:
          plotting objects from this, such as Line2D.
         -Update the plots inside the update method, which must be
          overriden.
+        -Register the plots that change in every frame with add_plot
+         or add_plots. These are drawn over a cached background of
+         everything else, which is only redrawn after a call to
+         invalidate_background.
         -Call the animation_loop method to show the animation.
 
     Attributes:
     figure [Figure]: Use this to obtain plot elements.
     """
 
+    # Private Attributes:
+    # _plots [list]: The dynamic plots, which are redrawn in every frame,
+    #                in the order that they are drawn.
+    # _static_plots [list]: The static plots, which are part of the
+    #                       cached background.
+    # _background: The saved pixels of the static plots, or None if these
+    #              need to be drawn again.
+
     def __init__(self, dpi: int,
                  animation_interval: int) -> None:
         """
@@ -40,40 +47,102 @@ class Animator:
         self.dots_per_inches = dpi
         self.animation_interval = animation_interval
 
-        self.figure = plt.figure(
+        # The figure isn't made through pyplot, which is slow to
+        # import, so it starts with an offscreen canvas until a
+        # backend such as the Tk one replaces it.
+        self.figure = Figure(
                 dpi=self.dots_per_inches
         )
-        self.main_animation = None
+        FigureCanvasAgg(self.figure)
+        self._timer = None
+        # The callbacks belong to the figure, so this stays
+        # connected when a backend replaces its canvas.
+        self.figure.canvas.mpl_connect("draw_event", self._on_draw)
 
         # All private attributes.
         self._plots = []
+        self._static_plots = []
+        self._background = None
+        self._frame = 0
         self._delta_t = 1.0/60.0
         self._t = perf_counter()
+        # Frame timing statistics, which are only recorded
+        # when these are turned on.
+        self._frame_stats = None
+        self._frame_steps = 0
 
-    def add_plot(self, plot: plt.Artist) -> None:
+    def add_plot(self, plot: Artist, static: bool = False) -> None:
         """
-        Add a list of plot objects so that they can be animated.
+        Add a plot object so that it can be animated. A static plot
+        is instead drawn as part of the background.
         """
-        self._plots.append(plot)
+        if static:
+            plot.set_animated(False)
+            self._static_plots.append(plot)
+            self.invalidate_background()
+        else:
+            plot.set_animated(True)
+            self._plots.append(plot)
 
-    def add_plots(self, plot_objects: List[plt.Artist]) -> None:
+    def add_plots(self, plot_objects: List[Artist],
+                  static: bool = False) -> None:
         """
         Add multiple plots to be animated.
         """
-        self._plots.extend(plot_objects)
+        for plot in plot_objects:
+            self.add_plot(plot, static)
+
+    def remove_plot(self, plot: Artist) -> None:
+        """
+        Stop animating a plot, and remove it from the figure.
+        """
+        if plot in self._static_plots:
+            self._static_plots.remove(plot)
+            self.invalidate_background()
+        elif plot in self._plots:
+            self._plots.remove(plot)
+        plot.remove()
+
+    def replace_plot(self, old_plot: Artist,
+                     new_plot: Artist) -> None:
+        """
+        Replace a plot with another one in the same layer and position,
+        and remove the old plot from the figure.
+        """
+        for plots in (self._static_plots, self._plots):
+            if old_plot in plots:
+                new_plot.set_animated(old_plot.get_animated())
+                plots[plots.index(old_plot)] = new_plot
+        old_plot.remove()
+        self.invalidate_background()
 
     def get_plot(self, index: int):
         """
-        Getter for a plot.
+        Getter for a dynamic plot.
         """
         return self._plots[index]
 
     def set_plot(self, index: int, plot_object) -> None:
         """
-        Setter for a plot.
+        Setter for a dynamic plot.
         """
+        plot_object.set_animated(True)
         self._plots[index] = plot_object
 
+    def get_static_plots(self) -> List[Artist]:
+        """
+        Get the plots that are drawn as part of the background.
+        """
+        return list(self._static_plots)
+
+    def invalidate_background(self) -> None:
+        """
+        Redraw the background in the next frame. Call this after
+        changing anything that isn't a dynamic plot, such as the title,
+        the axes, or a static plot.
+        """
+        self._background = None
+
     def update(self, delta_t: float) -> None:
         """
         Update how each plots will change between each animation frame.
@@ -81,72 +150,136 @@ class Animator:
         """
         raise NotImplementedError
 
+    def enable_frame_stats(self, overlay: bool = False) -> FrameStats:
+        """
+        Start recording how long each animation frame takes.
+        If overlay is True, the statistics are also shown on the plot.
+        """
+        self.disable_frame_stats()
+        self._frame_stats = FrameStats()
+        self._frame_steps = 0
+        if overlay:
+            ax = self.figure.get_axes()[0]
+            self._frame_stats.overlay = ax.text(
+                0.02, 0.98, "", transform=ax.transAxes,
+                verticalalignment="top", fontsize=6, family="monospace",
+                bbox={"facecolor": "white", "alpha": 0.8})
+            self.add_plot(self._frame_stats.overlay)
+        return self._frame_stats
+
+    def disable_frame_stats(self) -> None:
+        """
+        Stop recording how long each animation frame takes.
+        """
+        if self._frame_stats is not None:
+            if self._frame_stats.overlay is not None:
+                self.remove_plot(self._frame_stats.overlay)
+            self._frame_stats = None
+
+    def get_frame_stats(self) -> FrameStats:
+        """
+        Getter for the frame statistics, which is None if these
+        are not being recorded.
+        """
+        return self._frame_stats
+
+    def dump_frame_stats(self, filename: str) -> None:
+        """
+        Save the frame statistics to a JSON file.
+        """
+        if self._frame_stats is not None:
+            self._frame_stats.dump(filename)
+
+    def count_steps(self, steps: int) -> None:
+        """
+        Count integration steps done in the current frame.
+        Derived classes call this from update.
+        """
+        if self._frame_stats is not None:
+            self._frame_steps += steps
+
+    def _make_instrumented_frame(self) -> list:
+        """
+        Generate a single animation frame while
+        recording how long it takes.
+        """
+        t1 = perf_counter()
+        self.update(self._delta_t)
+        t2 = perf_counter()
+        stats = self._frame_stats
+        stats.record_update(t2 - t1, self._frame_steps)
+        self._frame_steps = 0
+        self._delta_t = t2 - self._t
+        self._t = t2
+        if stats.overlay is not None and stats.frames % 10 == 0:
+            stats.overlay.set_text(stats.overlay_text())
+        return self._plots
+
     def _make_frame(self, i: int) -> list:
         """
         Generate a single animation frame.
         """
+        if self._frame_stats is not None:
+            return self._make_instrumented_frame()
         self.update(self._delta_t)
         t = perf_counter()
         self._delta_t = t - self._t
         self._t = t
-        # print(self._plots)
         return self._plots
 
-    def _add_plots(self) -> None:
+    def draw_frame(self) -> None:
+        """
+        Draw the dynamic plots over the cached background, or draw the
+        whole figure if the background needs to be drawn again.
+        """
+        canvas = self.figure.canvas
+        t1 = perf_counter()
+        if self._background is None or not canvas.supports_blit:
+            # This captures the background and draws the dynamic plots
+            # over it through _on_draw.
+            canvas.draw()
+        else:
+            canvas.restore_region(self._background)
+            for plot in self._plots:
+                self.figure.draw_artist(plot)
+            canvas.blit(self.figure.bbox)
+        if self._frame_stats is not None:
+            self._frame_stats.record_draw(perf_counter() - t1)
+
+    def _on_draw(self, event) -> None:
         """
-        Add plots before doing the main animation loop.
+        Save the background after the figure is drawn, which also happens
+        when the window is resized, and then draw the dynamic plots.
         """
-        text_objects = []  # Ensure that text boxes are rendered last
-        self_dict = self.__dict__
-        for key in self_dict:
-            if any([isinstance(self_dict[key], artist) for
-                    artist in artists]):
-                if self_dict[key] not in self._plots:
-                    # Ensure that text boxes are rendered last
-                    if isinstance(self_dict[key], Text):
-                        text_objects.append(self_dict[key])
-                    else:
-                        self._plots.append(self_dict[key])
-        self._plots.extend(text_objects)
+        if event is None or event.canvas is not self.figure.canvas:
+            return
+        if event.canvas.supports_blit:
+            self._background = event.canvas.copy_from_bbox(self.figure.bbox)
+        for plot in self._plots:
+            plot.draw(event.renderer)
+
+    def _step(self) -> None:
+        """
+        Make and draw the next animation frame.
+        """
+        self._make_frame(self._frame)
+        self._frame += 1
+        self.draw_frame()
 
     def animation_loop(self) -> None:
         """This method plays the animation. This must be called in order
         for an animation to be shown.
         """
-        self._add_plots()
-        self.main_animation = animation.FuncAnimation(
-                self.figure,
-                self._make_frame,
-                blit=True,
-                interval=self.animation_interval,
-                # init_func=lambda *arg: []
-        )
+        self.invalidate_background()
+        self._timer = self.figure.canvas.new_timer(
+            interval=self.animation_interval)
+        self._timer.add_callback(self._step)
+        self._timer.start()
 
-    def is_blit(self) -> bool:
+    def stop_animation(self) -> None:
         """
-        Check if blitting is turned on or not.
+        Stop playing the animation.
         """
-        if self.main_animation is not None:
-            return self.main_animation._blit
-        else:
-            return False
-
-    def toggle_blit(self) -> None:
-        """
-        Toggle blit. This is used so that it is possible to
-        update the appearance of the plot title and axes, which would otherwise
-        be entirely static with blitting.
-        """
-        # TODO: Find a better way of updating the axes of the plot
-        # that uses blitting and does not access the
-        # protected members of the Animation class.
-        if self.main_animation._blit:
-            self.main_animation._blit_clear(
-                self.main_animation._drawn_artists, 
-                self.main_animation._blit_cache)
-            self.main_animation._blit = False
-        else:
-            # self.main_animation._init_draw()
-            self.main_animation._step()
-            self.main_animation._blit = True
-            self.main_animation._setup_blit()
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
@@ -0,0 +1,310 @@
+"""
+Maps of where every point of a grid ends up under x' = f(x, y),
+y' = g(x, y), coloured by the fixed point it converges to, or by how
+long it takes to escape.
+
+The grid is computed from coarse to fine, where each level fills in the
+points between those of the level before, so that a coarse map is ready
+quickly. The points of each level are integrated in chunks of bounded
+size, which are spread over a pool of processes when more than one
+worker is used. For example, to save a 2048 by 2048 map of the damped
+pendulum:
+
+    python basin_map.py "y" "5*a*sin(k*x/2) - b*y" --param b=0.5 \\
+        --shape 2048 2048 --workers 8 -o basins.npz --png basins.png
+"""
+import argparse
+import multiprocessing
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib import colormaps
+from sweep import SWEEP_METHODS, integrate_summary
+from batch import parse_parameters
+from typing import Callable, Dict, List, Tuple
+
+
+ATTRACTORS = "attractors"
+ESCAPE_TIME = "escape time"
+
+
+def label_attractors(points: np.ndarray, distance: float,
+                     max_labels: int = 64) -> np.ndarray:
+    """
+    Label the points of a (2, N) array, where points within distance of
+    the first unlabelled point get the same label, with at most
+    max_labels labels. Points left over are labelled -1.
+
+    >>> label_attractors(np.array([[0.0, 1.0, 1e-3, 5.0],
+    ...                            [0.0, 1.0, 0.0, 5.0]]), 0.01, 2)
+    array([ 0,  1,  0, -1])
+    """
+    labels = np.full(points.shape[1], -1)
+    remaining = np.arange(points.shape[1])
+    for label in range(max_labels):
+        if not remaining.size:
+            break
+        centre = points[:, remaining[0]]
+        near = (np.abs(points[:, remaining]
+                       - centre[:, None]).max(axis=0) <= distance)
+        labels[remaining[near]] = label
+        remaining = remaining[~near]
+    return labels
+
+
+class BasinMap:
+    """
+    A map of where the points of a grid over the bounds end up.
+
+    Attributes:
+    shape [Tuple[int, int]]: The number of rows and columns of the grid.
+    bounds [List[float]]: The bounds of the grid.
+    final [np.ndarray]: (2, rows, columns) array of the final states.
+    escape_time [np.ndarray]: The time each point escaped, or nan.
+    converge_time [np.ndarray]: The time each point converged, or nan.
+    stride [int]: The spacing of the points done so far, which is 1
+                  once the map is complete, or 0 before any are done.
+    """
+
+    # Private Attributes:
+    # _f, _g [str]: the expressions of the system
+    # _parameters [Dict[str, float]]: the parameter values
+    # _options [tuple]: method, dt, steps, escape radius and tolerance
+    # _strides [List[int]]: the spacing of the points of each level
+    # _chunk_size [int]: number of points integrated together
+    # _workers [int]: number of processes to use
+    # _done [np.ndarray]: which points of the grid have been computed
+    # _lock [threading.Lock]: guards the results while computing in a thread
+    # _cancelled [threading.Event]: set to stop computing
+    # _thread [threading.Thread]: the thread computing the map, if any
+
+    def __init__(self, f: str, g: str, parameters: Dict[str, float],
+                 bounds: List[float], shape: Tuple[int, int] = (512, 512),
+                 method: str = "rk4", dt: float = 0.05, steps: int = 800,
+                 escape_radius: float = 1e3, tol: float = 1e-3,
+                 levels: int = 4, chunk_size: int = 16384,
+                 workers: int = 1) -> None:
+        """
+        The initializer. The parameters are given by name.
+
+        >>> m = BasinMap("y", "-x - y/2 + x**3/4", {}, [-3, 3, -3, 3],
+        ...              (32, 32), levels=3)
+        >>> m.run()
+        >>> m.stride, int(np.isnan(m.final[0]).sum())
+        (1, 0)
+        >>> labels = m.get_labels()
+        >>> sorted(set(labels.ravel().tolist()))
+        [-1, 0]
+
+        Points where the system isn't defined end up at nan, which
+        counts as escaping.
+
+        >>> m = BasinMap("sqrt(x)", "-y", {}, [-1, 1, -1, 1], (8, 8),
+        ...              levels=2)
+        >>> m.run()
+        >>> labels = m.get_labels()
+        >>> bool(np.all(labels[np.isnan(m.final[0])] == -1))
+        True
+        """
+        self.shape = tuple(shape)
+        self.bounds = list(bounds)
+        self.final = np.full((2,) + self.shape, np.nan, dtype=np.float32)
+        self.escape_time = np.full(self.shape, np.nan, dtype=np.float32)
+        self.converge_time = np.full(self.shape, np.nan, dtype=np.float32)
+        self.stride = 0
+        self._f, self._g = f, g
+        self._parameters = dict(parameters)
+        self._options = (method, dt, steps, escape_radius, tol)
+        self._strides = [2**i for i in reversed(range(levels))]
+        self._chunk_size = chunk_size
+        self._workers = workers
+        self._done = np.zeros(self.shape, dtype=bool)
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    def grid(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the x and y values of the columns and rows of the grid.
+        """
+        xmin, xmax, ymin, ymax = self.bounds
+        rows, columns = self.shape
+        return (np.linspace(xmin, xmax, columns),
+                np.linspace(ymin, ymax, rows))
+
+    def _level_points(self, stride: int) -> np.ndarray:
+        """
+        Get the flat indices of the points of a level
+        that weren't done in a coarser level.
+        """
+        rows, columns = self.shape
+        i, j = np.meshgrid(np.arange(0, rows, stride),
+                           np.arange(0, columns, stride), indexing="ij")
+        index = (i*columns + j).ravel()
+        return index[~self._done.ravel()[index]]
+
+    def _store(self, index: np.ndarray, result: dict) -> None:
+        """
+        Store the results of a chunk of points.
+        """
+        with self._lock:
+            self.final[0].flat[index] = result["final_x"]
+            self.final[1].flat[index] = result["final_y"]
+            self.escape_time.flat[index] = result["escape_time"]
+            self.converge_time.flat[index] = result["converge_time"]
+            self._done.flat[index] = True
+
+    def run(self, callback: Callable = None) -> None:
+        """
+        Compute the map, calling callback with this map after each level.
+        """
+        x, y = self.grid()
+        names = np.array([]).reshape(1, 0)
+        executor = None
+        if self._workers > 1:
+            # Spawn the processes, since this may run in a thread
+            # of a process that uses a GUI toolkit.
+            executor = ProcessPoolExecutor(
+                self._workers, mp_context=multiprocessing.get_context(
+                    "spawn"))
+        try:
+            for stride in self._strides:
+                index = self._level_points(stride)
+                chunks = [index[k:k + self._chunk_size]
+                          for k in range(0, len(index), self._chunk_size)]
+                jobs = []
+                for chunk in chunks:
+                    seeds = np.array([x[chunk % len(x)],
+                                      y[chunk//len(x)]])
+                    args = (self._f, self._g, [], names, seeds,
+                            self._parameters, *self._options)
+                    if executor is None:
+                        if self._cancelled.is_set():
+                            return
+                        self._store(chunk, integrate_summary(*args))
+                    else:
+                        jobs.append((chunk, executor.submit(
+                            integrate_summary, *args)))
+                for chunk, job in jobs:
+                    if self._cancelled.is_set():
+                        return
+                    self._store(chunk, job.result())
+                self.stride = stride
+                if callback is not None:
+                    callback(self)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def start(self, callback: Callable = None) -> None:
+        """
+        Compute the map in a background thread.
+        """
+        self._thread = threading.Thread(target=self.run, args=(callback,),
+                                        daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """
+        Stop computing the map.
+        """
+        self._cancelled.set()
+
+    def is_done(self) -> bool:
+        """
+        Check if every point of the map is done.
+        """
+        return self.stride == 1
+
+    def get_labels(self, stride: int = None) -> np.ndarray:
+        """
+        Get the attractor that each point done at the given stride
+        converged to, where points that escaped are labelled -1 and
+        those that did neither are labelled -2.
+        """
+        stride = self.stride if stride is None else stride
+        with self._lock:
+            final = self.final[:, ::stride, ::stride].reshape(2, -1)
+            escaped = np.isfinite(self.escape_time[::stride, ::stride])
+            converged = np.isfinite(self.converge_time[::stride, ::stride])
+        labels = np.full(final.shape[1], -2)
+        converged = converged.ravel() & ~escaped.ravel()
+        xmin, xmax, ymin, ymax = self.bounds
+        distance = 1e-3*max(xmax - xmin, ymax - ymin)
+        labels[converged] = label_attractors(final[:, converged], distance)
+        labels[escaped.ravel()] = -1
+        return labels.reshape(escaped.shape)
+
+    def get_image(self, mode: str = ATTRACTORS) -> np.ndarray:
+        """
+        Get an RGBA image of the points done so far, with the first row
+        at the bottom. Attractors are coloured by label, escaped points
+        are black, and points that did neither are white. If the mode is
+        ESCAPE_TIME, points are instead coloured by how long they took
+        to escape, and those that didn't are white.
+        """
+        stride = max(self.stride, 1)
+        image = np.ones(self.final[0, ::stride, ::stride].shape + (4,))
+        if mode == ESCAPE_TIME:
+            with self._lock:
+                t = self.escape_time[::stride, ::stride].copy()
+            escaped = np.isfinite(t)
+            if escaped.any():
+                t_max = max(float(t[escaped].max()), 1e-300)
+                image[escaped] = colormaps["viridis"](t[escaped]/t_max)
+            return image
+        labels = self.get_labels(stride)
+        attractor = labels >= 0
+        image[attractor] = colormaps["tab10"](labels[attractor] % 10)
+        image[labels == -1] = (0.0, 0.0, 0.0, 1.0)
+        return image
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Run the command line interface.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("f", help="the expression for x' = f(x, y)")
+    parser.add_argument("g", help="the expression for y' = g(x, y)")
+    parser.add_argument("-p", "--param", action="append", default=[],
+                        metavar="NAME=VALUE",
+                        help="set a parameter, which otherwise keeps "
+                        "its default value")
+    parser.add_argument("--bounds", nargs=4, type=float,
+                        default=[-10.0, 10.0, -10.0, 10.0],
+                        metavar=("XMIN", "XMAX", "YMIN", "YMAX"))
+    parser.add_argument("--shape", nargs=2, type=int, default=[512, 512],
+                        metavar=("ROWS", "COLUMNS"))
+    parser.add_argument("--method", choices=SWEEP_METHODS, default="rk4")
+    parser.add_argument("--dt", type=float, default=0.05)
+    parser.add_argument("--steps", type=int, default=800)
+    parser.add_argument("--escape-radius", type=float, default=1e3)
+    parser.add_argument("--tol", type=float, default=1e-3,
+                        help="speed below which a point has converged")
+    parser.add_argument("--chunk-size", type=int, default=16384,
+                        help="number of points integrated together")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes to use")
+    parser.add_argument("-o", "--output", help="save the map as .npz")
+    parser.add_argument("--png", help="save an image of the attractors")
+    args = parser.parse_args(argv)
+
+    basin_map = BasinMap(args.f, args.g, parse_parameters(args.param),
+                         args.bounds, args.shape, args.method, args.dt,
+                         args.steps, args.escape_radius, args.tol,
+                         chunk_size=args.chunk_size, workers=args.workers)
+    basin_map.run(lambda m: print("Done every %d points" % m.stride))
+    if args.output is not None:
+        np.savez_compressed(args.output, final=basin_map.final,
+                            escape_time=basin_map.escape_time,
+                            converge_time=basin_map.converge_time,
+                            labels=basin_map.get_labels(),
+                            bounds=basin_map.bounds)
+    if args.png is not None:
+        import matplotlib.pyplot as plt
+        plt.imsave(args.png, basin_map.get_image(), origin="lower")
+
+
+if __name__ == "__main__":
+    main()
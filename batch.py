@@ -0,0 +1,286 @@
+"""
+Compute trajectories of x' = f(x, y), y' = g(x, y) from the command line,
+without Tkinter or Matplotlib, and save them to a .npz or .npy file.
+
+For example, to integrate a 32 by 32 grid of initial conditions of the
+damped pendulum for 1000 steps:
+
+    python batch.py "y" "5*a*sin(k*x/2) - b*y" --param b=0.5 \\
+        --grid 32 32 --bounds -10 10 -10 10 --steps 1000 -o pendulum.npz
+
+The .npz output contains the trajectories as an array of shape
+(number of saved steps, 2, number of initial conditions), along with
+the times, initial conditions, expressions, parameters and method used.
+A .npy output only contains the trajectories. The saved steps are
+written to a memory mapped .npy file as they are integrated, so the
+trajectories don't have to fit in memory. For a .npz output this file
+is a temporary one next to it, which is compressed into it at the end.
+"""
+import argparse
+import os
+import numpy as np
+from functions import FunctionR2toR, get_function, get_system
+from diffsolve2d import (forward_euler_ensemble, rungekutta_ensemble,
+                         dormand_prince, backward_euler, trapezoidal,
+                         rosenbrock)
+from typing import Callable, Dict, List
+
+
+METHODS = ["euler", "rk4", "dopri", "beuler", "trapezoidal", "rosenbrock"]
+# Methods that need the Jacobian of f.
+IMPLICIT_METHODS = {"beuler": backward_euler, "trapezoidal": trapezoidal,
+                    "rosenbrock": rosenbrock}
+
+
+def get_parameter_values(function: FunctionR2toR,
+                         values: Dict[str, float]) -> List[float]:
+    """
+    Get the parameter values of a function in the order of its
+    parameters, where parameters not found in values keep
+    their default values.
+    """
+    defaults = function.get_default_values()
+    return [values.get(str(s), defaults[s]) for s in function.parameters]
+
+
+def take_members(params: List[float], members: np.ndarray) -> List[float]:
+    """
+    Get the parameter values of the given members, where parameters
+    given as arrays have a value for every member, and the rest are
+    scalars shared by all of them.
+
+    >>> take_members([2.0, np.array([1.0, 2.0, 3.0])], np.array([0, 2]))
+    [2.0, array([1., 3.])]
+    """
+    return [p[members] if np.ndim(p) else p for p in params]
+
+
+def make_field(vx: FunctionR2toR, vy: FunctionR2toR,
+               vxparams: List[float], vyparams: List[float],
+               members: np.ndarray = None) -> Callable:
+    """
+    Make the function that dictates the mapping of the vector field,
+    which takes a (2, N) array of states. If the indices of the members
+    are given, the field takes the states of only these members.
+    """
+    system = get_system(vx, vy)
+    if members is not None:
+        vxparams = take_members(vxparams, members)
+        vyparams = take_members(vyparams, members)
+
+    def f(xy: np.ndarray, *t: float) -> np.ndarray:
+        # Components that are constant, or only use parameters given
+        # as arrays, don't have the shape of the states on their own.
+        vx, vy, _ = np.broadcast_arrays(
+            *system(xy[0], xy[1], vxparams, vyparams), xy[0])
+        return np.array([vx, vy])
+    return f
+
+
+def make_jacobian(vx: FunctionR2toR, vy: FunctionR2toR,
+                  vxparams: List[float], vyparams: List[float],
+                  members: np.ndarray = None) -> Callable:
+    """
+    Make the function that gives the entries of the Jacobian of the
+    mapping of the vector field, which takes a (2, N) array of states.
+    If the indices of the members are given, it takes the states of
+    only these members.
+    """
+    system = get_system(vx, vy)
+    if members is not None:
+        vxparams = take_members(vxparams, members)
+        vyparams = take_members(vyparams, members)
+
+    def jac(xy: np.ndarray, *t: float) -> tuple:
+        return system.jacobian(xy[0], xy[1], vxparams, vyparams)
+    return jac
+
+
+def grid_seeds(bounds: List[float], nx: int, ny: int) -> np.ndarray:
+    """
+    Get a (2, nx*ny) array of initial conditions on a grid
+    that spans the bounds.
+
+    >>> grid_seeds([0.0, 1.0, -1.0, 1.0], 2, 3)
+    array([[ 0.,  1.,  0.,  1.,  0.,  1.],
+           [-1., -1.,  0.,  0.,  1.,  1.]])
+    """
+    x, y = np.meshgrid(np.linspace(bounds[0], bounds[1], nx),
+                       np.linspace(bounds[2], bounds[3], ny))
+    return np.array([x.ravel(), y.ravel()])
+
+
+def load_seeds(filename: str) -> np.ndarray:
+    """
+    Load initial conditions from a .npy file or a text file with
+    one x y pair on each line, as a (2, N) array.
+    """
+    if filename.endswith(".npy"):
+        seeds = np.load(filename)
+    else:
+        seeds = np.loadtxt(filename, ndmin=2)
+    seeds = np.asarray(seeds, dtype=np.float64)
+    if seeds.ndim != 2 or 2 not in seeds.shape:
+        raise ValueError("Initial conditions must be an array of x, y pairs")
+    return seeds if seeds.shape[0] == 2 else seeds.T
+
+
+def advance(f: Callable, x: np.ndarray, method: str, dt: float,
+            active: np.ndarray, h: np.ndarray,
+            jac: Callable = None) -> np.ndarray:
+    """
+    Do one step of dt of the given method for the active members of
+    a (2, N) array of states, and return the new states. h holds the
+    step size of each member for the adaptive method, and is updated
+    in place.
+    """
+    if method == "euler":
+        return forward_euler_ensemble(f, 0.0, x, dt, active)
+    elif method == "rk4":
+        return rungekutta_ensemble(f, 0.0, x, dt, active)
+    elif method == "dopri":
+        x = x.copy()
+        index = np.flatnonzero(active)
+        x[:, index], h[index] = dormand_prince(
+            f, 0.0, x[:, index], dt, h[index])
+        return x
+    elif method in IMPLICIT_METHODS:
+        x = x.copy()
+        index = np.flatnonzero(active)
+        x[:, index] = IMPLICIT_METHODS[method](f, jac, 0.0, x[:, index], dt)
+        return x
+    raise ValueError("Unknown method %s" % method)
+
+
+def integrate(f: Callable, seeds: np.ndarray, method: str, dt: float,
+              steps: int, save_every: int = 1, jac: Callable = None,
+              out: np.ndarray = None) -> np.ndarray:
+    """
+    Integrate every initial condition with the given method,
+    and return the state at every save_every steps as an array of
+    shape (steps//save_every + 1, 2, N). Members stop being integrated
+    once they are no longer finite. The implicit methods also need
+    the Jacobian jac of f. The states are written to out if it is given,
+    such as an array memory mapped from a file, which is returned.
+
+    >>> f = lambda xy, t: np.array([xy[1], -xy[0]])
+    >>> seeds = np.array([[1.0, 0.0], [0.0, 1.0]])
+    >>> integrate(f, seeds, "rk4", 0.01, 10, 5).shape
+    (3, 2, 2)
+    """
+    x = np.array(seeds, dtype=np.float64)
+    trajectories = out
+    if trajectories is None:
+        trajectories = np.empty(trajectory_shape(x, steps, save_every))
+    trajectories[0] = x
+    h = np.full(x.shape[1], dt)
+    for i in range(1, steps + 1):
+        active = np.isfinite(x).all(axis=0)
+        x = advance(f, x, method, dt, active, h, jac)
+        if i % save_every == 0:
+            trajectories[i//save_every] = x
+    return trajectories
+
+
+def trajectory_shape(seeds: np.ndarray, steps: int,
+                     save_every: int = 1) -> tuple:
+    """
+    Get the shape of the trajectories saved by integrate.
+
+    >>> trajectory_shape(np.zeros((2, 7)), 10, 3)
+    (4, 2, 7)
+    """
+    return (steps//save_every + 1,) + np.shape(seeds)
+
+
+def parse_parameters(parameters: List[str]) -> Dict[str, float]:
+    """
+    Parse a list of name=value strings.
+
+    >>> parse_parameters(["a=1", "k = 0.5"])
+    {'a': 1.0, 'k': 0.5}
+    """
+    values = {}
+    for parameter in parameters:
+        name, _, value = parameter.partition("=")
+        if not _:
+            raise ValueError("Parameters must be given as name=value")
+        values[name.strip()] = float(value)
+    return values
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Run the command line interface.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("f", help="the expression for x' = f(x, y)")
+    parser.add_argument("g", help="the expression for y' = g(x, y)")
+    parser.add_argument("-p", "--param", action="append", default=[],
+                        metavar="NAME=VALUE",
+                        help="set a parameter, which otherwise keeps "
+                        "its default value")
+    parser.add_argument("--bounds", nargs=4, type=float,
+                        default=[-10.0, 10.0, -10.0, 10.0],
+                        metavar=("XMIN", "XMAX", "YMIN", "YMAX"),
+                        help="bounds of the grid of initial conditions")
+    seeds_group = parser.add_mutually_exclusive_group()
+    seeds_group.add_argument("--grid", nargs=2, type=int, default=[16, 16],
+                             metavar=("NX", "NY"),
+                             help="number of initial conditions along "
+                             "each axis")
+    seeds_group.add_argument("--seeds", metavar="FILE",
+                             help="load initial conditions from a .npy "
+                             "or text file instead of using a grid")
+    parser.add_argument("--method", choices=METHODS, default="rk4")
+    parser.add_argument("--dt", type=float, default=0.01)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--save-every", type=int, default=1,
+                        help="only save every this many steps")
+    parser.add_argument("-o", "--output", required=True,
+                        help="a .npz or .npy file to save to")
+    args = parser.parse_args(argv)
+
+    values = parse_parameters(args.param)
+    vx = get_function(args.f)
+    vy = get_function(args.g)
+    names = {str(s) for s in vx.parameters + vy.parameters}
+    unknown = set(values) - names
+    if unknown:
+        parser.error("unknown parameters: %s" % ", ".join(sorted(unknown)))
+    vxparams = get_parameter_values(vx, values)
+    vyparams = get_parameter_values(vy, values)
+    if args.seeds is not None:
+        seeds = load_seeds(args.seeds)
+    else:
+        seeds = grid_seeds(args.bounds, *args.grid)
+    f = make_field(vx, vy, vxparams, vyparams)
+    jac = make_jacobian(vx, vy, vxparams, vyparams)
+    path = args.output
+    if not path.endswith(".npy"):
+        path = args.output + ".tmp.npy"
+    trajectories = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float64,
+        shape=trajectory_shape(seeds, args.steps, args.save_every))
+    try:
+        integrate(f, seeds, args.method, args.dt, args.steps,
+                  args.save_every, jac, trajectories)
+        trajectories.flush()
+        if path != args.output:
+            parameters = dict(zip(map(str, vx.parameters), vxparams))
+            parameters.update(zip(map(str, vy.parameters), vyparams))
+            # The mapped array is written to the archive in chunks.
+            np.savez_compressed(
+                args.output, trajectories=trajectories, seeds=seeds,
+                t=args.dt*args.save_every*np.arange(len(trajectories)),
+                f=args.f, g=args.g, method=args.method,
+                parameter_names=np.array(list(parameters), dtype=str),
+                parameter_values=np.array(list(parameters.values())))
+    finally:
+        del trajectories
+        if path != args.output:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
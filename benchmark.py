@@ -0,0 +1,257 @@
+"""
+Benchmarks of compiling the functions, evaluating the vector field,
+integrating trajectories, and drawing animation frames.
+
+The results are printed, and can be saved as JSON and compared against
+the results of an earlier run:
+
+    python benchmark.py --output before.json
+    python benchmark.py --compare before.json
+
+Comparing exits with a nonzero status if any benchmark is slower than
+its earlier result by more than the given tolerance. Frames are drawn
+with an offscreen Agg canvas, so no window is opened.
+"""
+import matplotlib
+matplotlib.use("Agg")
+import argparse
+import itertools
+import json
+import platform
+import sys
+import numpy as np
+import sympy
+from time import perf_counter, strftime
+from typing import Callable, List
+from functions import FunctionR2toR
+from diffsolve2d import (forward_euler, rungekutta, forward_euler_ensemble,
+                         rungekutta_ensemble, dormand_prince)
+from nonlinear_vector_field import NonLinearVectorField2D
+from presets import PRESETS
+from step_kernels import RK4, get_step_kernel
+
+
+def time_call(func: Callable, number: int, repeat: int = 5) -> float:
+    """
+    Get the time in seconds of a single call of func, taken as the
+    best of repeat runs of number calls each.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        t1 = perf_counter()
+        for _ in range(number):
+            func()
+        t2 = perf_counter()
+        best = min(best, (t2 - t1)/number)
+    return best
+
+
+def make_field(preset: str) -> NonLinearVectorField2D:
+    """
+    Make a vector field that uses one of the presets.
+    """
+    field = NonLinearVectorField2D()
+    field.set_vx(PRESETS[preset][0])
+    field.set_vy(PRESETS[preset][1])
+    return field
+
+
+def bench_compile(scale: int) -> List[dict]:
+    """
+    Time building a FunctionR2toR from each preset expression.
+    """
+    results = []
+    for preset, expressions in PRESETS.items():
+        for name, expression in zip(["f", "g"], expressions):
+            seconds = time_call(lambda: FunctionR2toR(expression),
+                                number=max(1, scale//5), repeat=3)
+            results.append({"name": "compile",
+                            "case": "%s %s" % (preset, name),
+                            "seconds": seconds})
+    return results
+
+
+def bench_field(scale: int) -> List[dict]:
+    """
+    Time evaluating the vector field at a single point
+    and on square grids.
+    """
+    results = []
+    for preset in PRESETS:
+        field = make_field(preset)
+        xy = np.array([1.0, 2.0])
+        seconds = time_call(lambda: field.f(xy), number=100*scale)
+        results.append({"name": "field", "case": "%s scalar" % preset,
+                        "seconds": seconds, "points": 1})
+        for n in [21, 256]:
+            grid = list(np.meshgrid(np.linspace(-10.0, 10.0, n),
+                                    np.linspace(-10.0, 10.0, n)))
+            seconds = time_call(lambda: field.f(grid),
+                                number=max(1, 100*scale//n))
+            results.append({"name": "field",
+                            "case": "%s %dx%d" % (preset, n, n),
+                            "seconds": seconds, "points": n*n})
+    return results
+
+
+def bench_integrators(scale: int) -> List[dict]:
+    """
+    Time single steps of each integration method with one particle,
+    and with an ensemble of particles.
+    """
+    results = []
+    field = make_field("Pendulum 2")
+    xy = np.array([1.0, 2.0])
+    methods = {"forward_euler": lambda: forward_euler(field.f, 0.0, xy, 0.01),
+               "rungekutta": lambda: rungekutta(field.f, 0.0, xy, 0.01),
+               "dormand_prince": lambda: dormand_prince(
+                   field.f, 0.0, xy, 0.01, 0.01)}
+    for name, step in methods.items():
+        seconds = time_call(step, number=20*scale)
+        results.append({"name": "step", "case": name, "seconds": seconds,
+                        "points": 1})
+    system = field.get_system()
+    kernel = get_step_kernel(system, RK4)
+    params = system.order_parameters(field.vxparams, field.vyparams)
+    seconds = time_call(lambda: kernel(1.0, 2.0, 0.01, 100, *params),
+                        number=max(1, scale//5))
+    results.append({"name": "step", "case": "rungekutta kernel",
+                    "seconds": seconds/100, "points": 1})
+    xy = np.random.default_rng(0).uniform(-10.0, 10.0, (2, 10000))
+    ensemble_methods = {
+        "forward_euler_ensemble":
+        lambda: forward_euler_ensemble(field.f, 0.0, xy, 0.01),
+        "rungekutta_ensemble":
+        lambda: rungekutta_ensemble(field.f, 0.0, xy, 0.01)}
+    for name, step in ensemble_methods.items():
+        seconds = time_call(step, number=max(1, scale//5))
+        results.append({"name": "step", "case": name, "seconds": seconds,
+                        "points": xy.shape[1]})
+    return results
+
+
+def bench_rendering(scale: int) -> List[dict]:
+    """
+    Time refreshing and drawing the quiver plot after a parameter
+    changes, and making and drawing an animation frame on an
+    offscreen canvas.
+    """
+    results = []
+    field = make_field("Pendulum 2")
+    field.figure.canvas.draw()
+    values = itertools.count()
+
+    def refresh() -> None:
+        # A new parameter value each time, as when a slider moves, so
+        # the field is evaluated again instead of read from the cache.
+        field.set_parameter("b", 0.5 + 1e-3*next(values))
+        field.plot_vector_field(change_title=False)
+        field.figure.canvas.draw()
+    seconds = time_call(refresh, number=max(1, scale//2))
+    results.append({"name": "quiver", "case": "parameter change and draw",
+                    "seconds": seconds})
+
+    field.particle.set_initial_position(1.0, 1.0)
+    field.figure.canvas.draw()
+
+    def frame() -> None:
+        field._make_frame(0)
+        field.draw_frame()
+    seconds = time_call(frame, number=max(1, scale//2))
+    results.append({"name": "frame", "case": "blitted frame",
+                    "seconds": seconds})
+
+    def full_frame() -> None:
+        field._make_frame(0)
+        field.invalidate_background()
+        field.draw_frame()
+    seconds = time_call(full_frame, number=max(1, scale//10))
+    results.append({"name": "frame", "case": "full frame",
+                    "seconds": seconds})
+    return results
+
+
+BENCHMARKS = {"compile": bench_compile, "field": bench_field,
+              "integrators": bench_integrators, "rendering": bench_rendering}
+
+
+def run(names: List[str], scale: int) -> dict:
+    """
+    Run the benchmarks and return their results along with
+    information about the environment.
+    """
+    results = []
+    for name in names:
+        results.extend(BENCHMARKS[name](scale))
+    for result in results:
+        result["per_second"] = 1.0/result["seconds"]
+    return {"time": strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "sympy": sympy.__version__,
+            "matplotlib": matplotlib.__version__,
+            "scale": scale,
+            "results": results}
+
+
+def compare(results: dict, baseline: dict,
+            tolerance: float) -> List[str]:
+    """
+    Compare the results with those of an earlier run, and return
+    the benchmarks that are slower by more than the tolerance.
+    """
+    previous = {(r["name"], r["case"]): r["seconds"]
+                for r in baseline["results"]}
+    regressions = []
+    for r in results["results"]:
+        key = (r["name"], r["case"])
+        if key not in previous:
+            continue
+        ratio = r["seconds"]/previous[key]
+        line = "%-8s %-32s %8.3fx" % (r["name"], r["case"], ratio)
+        print(line)
+        if ratio > 1.0 + tolerance:
+            regressions.append(line)
+    return regressions
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Run the command line interface.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("benchmarks", nargs="*",
+                        help="benchmarks to run out of %s, which are all "
+                        "of them by default" % ", ".join(BENCHMARKS))
+    parser.add_argument("--scale", type=int, default=100,
+                        help="scales the number of calls that are timed")
+    parser.add_argument("-o", "--output", help="save the results as JSON")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare against results saved as JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative slowdown when comparing")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: %s" % ", ".join(sorted(unknown)))
+
+    results = run(args.benchmarks or list(BENCHMARKS), args.scale)
+    for r in results["results"]:
+        print("%-8s %-32s %12.3e s %12.1f /s" % (
+            r["name"], r["case"], r["seconds"], r["per_second"]))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Slower than %s:" % args.compare)
+            print("\n".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
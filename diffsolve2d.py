@@ -1,5 +1,10 @@
 """
-Foward Euler and Runge-Kutta integration methods.
+Foward Euler, Runge-Kutta and adaptive Dormand-Prince integration methods,
+and the backward Euler, trapezoidal and Rosenbrock methods for stiff systems.
+
+The ensemble variants of these methods advance many initial conditions
+at once. Their state is a (2, N) array with one column per member,
+which is passed to f in a single call.
 
 These integration methods are adapted from
 euler.py (http://www-personal.umich.edu/~mejn/cp/programs/euler.py) 
@@ -15,8 +20,24 @@ In Computational Physics, chapter 8.
 CreateSpace Independent Publishing Platform.
 http://www-personal.umich.edu/~mejn/cp/
 
+The coefficients of the Dormand-Prince method are found in
+
+Dormand, J. R., Prince, P. J. (1980). A family of embedded
+Runge-Kutta formulae. Journal of Computational and Applied
+Mathematics, 6(1), 19-26.
+
+The coefficients of the Rosenbrock method are those of ROS2 in
+
+Verwer, J. G., Spee, E. J., Blom, J. G., Hundsdorfer, W. (1999).
+A second-order Rosenbrock method applied to photochemical dispersion
+problems. SIAM Journal on Scientific Computing, 20(4), 1456-1480.
+
+The implicit methods take the Jacobian of f as a function jac(x, t)
+that returns its entries (df/dx, df/dy, dg/dx, dg/dy), each with
+the shape of x[0].
+
 """
-from typing import Callable
+from typing import Callable, Tuple, Union
 import numpy as np
 
 
@@ -44,5 +65,345 @@ def rungekutta(f: Callable, t: float, x1: np.ndarray,
     return x1 + (a1 + 2*a2 + 2*a3 + a4)/6
 
 
+def _ensemble_step(step: Callable, f: Callable, t: float,
+                   x1: np.ndarray, dt: Union[float, np.ndarray],
+                   active: np.ndarray = None) -> np.ndarray:
+    """
+    Advance the columns of x1 with the given single step method.
+    Only the members flagged in active are passed to f, while
+    the rest are copied over unchanged.
+    """
+    x1 = np.asarray(x1, dtype=np.float64)
+    dt = np.asarray(dt, dtype=np.float64)
+    if active is None:
+        return step(f, t, x1, dt)
+    index = np.flatnonzero(active)
+    x2 = x1.copy()
+    if index.size:
+        if dt.ndim:
+            dt = dt[index]
+        x2[:, index] = step(f, t, x1[:, index], dt)
+    return x2
+
+
+def forward_euler_ensemble(f: Callable, t: float, x1: np.ndarray,
+                           dt: Union[float, np.ndarray],
+                           active: np.ndarray = None) -> np.ndarray:
+    """
+    The forward Euler method for a (2, N) array of states.
+    dt is either a scalar or an array of N step sizes, and active
+    is an optional boolean mask of the members to advance.
+
+    >>> f = lambda xy, t: np.array([xy[1], -xy[0]])
+    >>> x = np.array([[1.0, 2.0, 3.0], [0.0, 0.0, 0.0]])
+    >>> forward_euler_ensemble(f, 0.0, x, 0.5,
+    ...                        np.array([True, False, True]))
+    array([[ 1. ,  2. ,  3. ],
+           [-0.5,  0. , -1.5]])
+    """
+    return _ensemble_step(lambda f, t, x, dt: x + dt*f(x, t),
+                          f, t, x1, dt, active)
+
+
+def rungekutta_ensemble(f: Callable, t: float, x1: np.ndarray,
+                        dt: Union[float, np.ndarray],
+                        active: np.ndarray = None) -> np.ndarray:
+    """
+    4th order Runge-Kutta for a (2, N) array of states.
+    dt is either a scalar or an array of N step sizes, and active
+    is an optional boolean mask of the members to advance.
+
+    >>> f = lambda xy, t: np.array([xy[1], -xy[0]])
+    >>> x = np.array([[1.0, 0.0], [0.0, 1.0]])
+    >>> x2 = rungekutta_ensemble(f, 0.0, x, np.array([0.1, 0.2]))
+    >>> bool(np.allclose(x2[:, 0], rungekutta(f, 0.0, x[:, 0], 0.1)))
+    True
+    >>> bool(np.allclose(x2[:, 1], rungekutta(f, 0.0, x[:, 1], 0.2)))
+    True
+    """
+    return _ensemble_step(_rungekutta_ensemble, f, t, x1, dt, active)
+
+
+def _rungekutta_ensemble(f: Callable, t: float, x1: np.ndarray,
+                         dt: Union[float, np.ndarray]) -> np.ndarray:
+    """
+    4th order Runge-Kutta where dt may vary between the columns of x1.
+    """
+    a1 = dt*f(x1, t)
+    a2 = dt*f(x1 + a1/2.0, t + dt/2.0)
+    a3 = dt*f(x1 + a2/2.0, t + dt/2.0)
+    a4 = dt*f(x1 + a3, t + dt)
+    return x1 + (a1 + 2*a2 + 2*a3 + a4)/6
+
+
+# Butcher tableau of the Dormand-Prince 5(4) method.
+_DP_C = (0.0, 1.0/5.0, 3.0/10.0, 4.0/5.0, 8.0/9.0, 1.0, 1.0)
+_DP_A = ((),
+         (1.0/5.0,),
+         (3.0/40.0, 9.0/40.0),
+         (44.0/45.0, -56.0/15.0, 32.0/9.0),
+         (19372.0/6561.0, -25360.0/2187.0, 64448.0/6561.0,
+          -212.0/729.0),
+         (9017.0/3168.0, -355.0/33.0, 46732.0/5247.0, 49.0/176.0,
+          -5103.0/18656.0),
+         (35.0/384.0, 0.0, 500.0/1113.0, 125.0/192.0,
+          -2187.0/6784.0, 11.0/84.0))
+# Difference between the 5th and 4th order weights.
+_DP_E = (71.0/57600.0, 0.0, -71.0/16695.0, 71.0/1920.0,
+         -17253.0/339200.0, 22.0/525.0, -1.0/40.0)
+
+
+def dormand_prince_step(f: Callable, t: Union[float, np.ndarray],
+                        x1: np.ndarray, dt: Union[float, np.ndarray]
+                        ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    A single step of the Dormand-Prince method. This returns the
+    5th order solution along with an estimate of its local error.
+    x1 is either a 2-vector or a (2, N) array of states.
+    """
+    k = []
+    for c, a in zip(_DP_C, _DP_A):
+        x = x1
+        for a_i, k_i in zip(a, k):
+            if a_i != 0.0:
+                x = x + a_i*k_i
+        k.append(dt*np.asarray(f(x, t + c*dt)))
+    # The last stage is evaluated at the 5th order solution.
+    x2 = x
+    error = sum(e_i*k_i for e_i, k_i in zip(_DP_E, k) if e_i != 0.0)
+    return x2, error
+
+
+def dormand_prince(f: Callable, t: float, x1: np.ndarray,
+                   interval: float, dt: Union[float, np.ndarray],
+                   atol: float = 1e-6, rtol: float = 1e-6,
+                   max_steps: int = 10000
+                   ) -> Tuple[np.ndarray, Union[float, np.ndarray]]:
+    """
+    Integrate over a time interval using the Dormand-Prince method,
+    where the step size is adjusted so that the estimated local error
+    stays within atol + rtol*|x|, and steps that exceed it are rejected.
+    x1 is either a 2-vector or a (2, N) array of states, in which case
+    each member keeps its own step size. The initial step size dt should
+    be the value returned from the previous call. This returns the new
+    state and the step size to use next. Steps that don't give a finite
+    state or error estimate are rejected like any other. Members that
+    can't finish the interval, since their state isn't finite, their
+    step size shrinks to nothing, or max_steps runs out, are set to nan.
+
+    >>> f = lambda xy, t: np.array([xy[1], -xy[0]])
+    >>> x, dt = dormand_prince(f, 0.0, np.array([1.0, 0.0]), np.pi, 0.1)
+    >>> bool(np.allclose(x, [-1.0, 0.0], atol=1e-5))
+    True
+    >>> x, dt = dormand_prince(f, 0.0, np.array([1.0, 0.0]), 1000.0, 0.1,
+    ...                        max_steps=50)
+    >>> np.isnan(x).tolist()
+    [True, True]
+    >>> f = lambda xy, t: np.array([-xy[0]**3, -xy[1]])
+    >>> with np.errstate(all="ignore"):
+    ...     x, dt = dormand_prince(f, 0.0, np.array([10.0, 1.0]), 10.0, 10.0)
+    >>> x.round(4).tolist()
+    [0.2236, 0.0]
+    >>> f = lambda xy, t: np.array([xy[0]**2, 0.0*xy[1]])
+    >>> with np.errstate(all="ignore"):
+    ...     x, dt = dormand_prince(f, 0.0, np.array([[1.0, -1.0],
+    ...                                              [0.0, 0.0]]), 2.0, 0.1)
+    >>> np.isnan(x[0]).tolist(), round(float(x[0, 1]), 4)
+    ([True, False], -0.3333)
+    """
+    x = np.array(x1, dtype=np.float64)
+    shape = x.shape
+    x = x.reshape(2, -1)
+    n = x.shape[1]
+    h = np.array(np.broadcast_to(np.abs(dt), (n,)), dtype=np.float64)
+    h[h == 0.0] = interval
+    remaining = np.full(n, float(interval))
+    tol = 1e-12*abs(interval)
+    # Members that start from a state that isn't finite can't be advanced.
+    diverged = ~np.isfinite(x).all(axis=0)
+    x[:, diverged] = np.nan
+    remaining[diverged] = 0.0
+    for _ in range(max_steps):
+        index = np.flatnonzero(remaining > tol)
+        if not index.size:
+            break
+        h_i = np.minimum(h[index], remaining[index])
+        x_i = x[:, index]
+        x2, error = dormand_prince_step(
+            f, t + interval - remaining[index], x_i, h_i)
+        scale = atol + rtol*np.maximum(np.abs(x_i), np.abs(x2))
+        norm = np.sqrt(np.mean((error/scale)**2, axis=0))
+        # A state that isn't finite has a norm of nan or 0.0,
+        # so such steps are rejected explicitly.
+        accept = (norm <= 1.0) & np.isfinite(x2).all(axis=0)
+        with np.errstate(divide="ignore"):
+            factor = np.clip(0.9*norm**-0.2, 0.2, 5.0)
+        factor[np.isnan(factor)] = 0.2
+        h_next = h_i*factor
+        # Don't let a step that was cut short by the end
+        # of the interval shrink the step size.
+        truncated = accept & (h_i < h[index])
+        h_next[truncated] = np.maximum(h_next[truncated],
+                                       h[index][truncated])
+        h[index] = h_next
+        accepted = index[accept]
+        x[:, accepted] = x2[:, accept]
+        remaining[accepted] -= h_i[accept]
+        # The step size of a member that keeps being rejected shrinks
+        # to nothing, such as when its solution blows up.
+        stuck = index[~accept & (h_next < tol)]
+        x[:, stuck] = np.nan
+        remaining[stuck] = 0.0
+    # Members that weren't integrated over the whole interval.
+    x[:, remaining > tol] = np.nan
+    # Members that were set to nan start again from the step size given.
+    failed = np.isnan(x).any(axis=0)
+    h[failed] = np.broadcast_to(np.abs(dt), (n,))[failed]
+    if len(shape) == 1:
+        return x.reshape(shape), float(h[0])
+    return x.reshape(shape), h
+
+
+def solve_2x2(a: np.ndarray, b: np.ndarray, c: np.ndarray, d: np.ndarray,
+              r: np.ndarray) -> np.ndarray:
+    """
+    Solve the linear systems [[a, b], [c, d]] x = r with Cramer's rule,
+    where r is a 2-vector or a (2, N) array, and the entries of the
+    matrix are either scalars or have N values.
+
+    >>> solve_2x2(2.0, 1.0, 1.0, 3.0, np.array([3.0, 5.0]))
+    array([0.8, 1.4])
+    """
+    det = a*d - b*c
+    return np.array([(d*r[0] - b*r[1])/det, (a*r[1] - c*r[0])/det])
+
+
+def _implicit_step(f: Callable, jac: Callable, t: float, x1: np.ndarray,
+                   dt: Union[float, np.ndarray], theta: float,
+                   iterations: int, tol: float,
+                   halvings: int = 4) -> np.ndarray:
+    """
+    Solve x2 = x1 + dt*((1 - theta)*f(x1) + theta*f(x2)) for x2 with
+    Newton's method, until the Newton step of every member is within
+    tol relative to its state, for at most the given number of
+    iterations. If a member doesn't converge, the step is done again
+    as two steps of dt/2, at most halvings times over, after which
+    the members that still don't converge are set to nan.
+    """
+    x1 = np.asarray(x1, dtype=np.float64)
+    explicit = x1
+    if theta != 1.0:
+        explicit = x1 + (1.0 - theta)*dt*np.asarray(f(x1, t))
+    # Members that start non-finite have nothing to converge to.
+    converged = ~np.all(np.isfinite(x1), axis=0)
+    x2 = x1
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(iterations):
+            a, b, c, d = jac(x2, t + dt)
+            residual = x2 - explicit - theta*dt*np.asarray(f(x2, t + dt))
+            step = solve_2x2(1.0 - theta*dt*a, -theta*dt*b,
+                             -theta*dt*c, 1.0 - theta*dt*d, residual)
+            x2 = x2 - step
+            converged = converged | (np.sum(np.abs(step), axis=0)
+                                     <= tol*(1.0 + np.sum(np.abs(x2), axis=0)))
+            if np.all(converged):
+                return x2
+    if halvings > 0:
+        half = _implicit_step(f, jac, t, x1, dt/2, theta,
+                              iterations, tol, halvings - 1)
+        return _implicit_step(f, jac, t + dt/2, half, dt/2, theta,
+                              iterations, tol, halvings - 1)
+    return np.where(converged, x2, np.nan)
+
+
+def backward_euler(f: Callable, jac: Callable, t: float, x1: np.ndarray,
+                   dt: Union[float, np.ndarray],
+                   iterations: int = 20,
+                   tol: float = 1e-10) -> np.ndarray:
+    """
+    The backward Euler method, where the implicit equation is solved
+    with Newton's method. x1 is either a 2-vector or a (2, N) array
+    of states. If Newton's method doesn't converge for a member within
+    the given number of iterations, the step is split into smaller
+    steps, and a member that still doesn't converge is set to nan.
+
+    >>> f = lambda xy, t: np.array([-1000.0*xy[0], -xy[1]])
+    >>> jac = lambda xy, t: (-1000.0, 0.0, 0.0, -1.0)
+    >>> backward_euler(f, jac, 0.0, np.array([1.0, 1.0]), 0.1)
+    array([0.00990099, 0.90909091])
+
+    The implicit equation of x' = -1000 x^3 is nonlinear, and it is
+    solved to within the tolerance.
+
+    >>> f = lambda xy, t: np.array([-1000.0*xy[0]**3, -xy[1]])
+    >>> jac = lambda xy, t: (-3000.0*xy[0]**2, 0.0, 0.0, -1.0)
+    >>> x = backward_euler(f, jac, 0.0, np.array([1.0, 1.0]), 0.1)
+    >>> abs(float(x[0] + 100.0*x[0]**3 - 1.0)) < 1e-9
+    True
+
+    The implicit equation of x' = x^2 has no solution for a step of 1
+    from x = 1, and the solution blows up before the smaller steps
+    reach the end of it, so the member is set to nan.
+
+    >>> f = lambda xy, t: np.array([xy[0]**2, -xy[1]])
+    >>> jac = lambda xy, t: (2.0*xy[0], 0.0, 0.0, -1.0)
+    >>> x = np.array([[1.0, 0.1], [1.0, 1.0]])
+    >>> np.isnan(backward_euler(f, jac, 0.0, x, 1.0)[0])
+    array([ True, False])
+    """
+    return _implicit_step(f, jac, t, x1, dt, 1.0, iterations, tol)
+
+
+def trapezoidal(f: Callable, jac: Callable, t: float, x1: np.ndarray,
+                dt: Union[float, np.ndarray],
+                iterations: int = 20,
+                tol: float = 1e-10) -> np.ndarray:
+    """
+    The trapezoidal method, where the implicit equation is solved
+    with Newton's method. x1 is either a 2-vector or a (2, N) array
+    of states. As with backward_euler, a member for which Newton's
+    method doesn't converge even in smaller steps is set to nan.
+
+    >>> f = lambda xy, t: np.array([xy[1], -xy[0]])
+    >>> jac = lambda xy, t: (0.0, 1.0, -1.0, 0.0)
+    >>> x = np.array([1.0, 0.0])
+    >>> for _ in range(1000):
+    ...     x = trapezoidal(f, jac, 0.0, x, 0.1)
+    >>> round(float(np.hypot(*x)), 12)
+    1.0
+    """
+    return _implicit_step(f, jac, t, x1, dt, 0.5, iterations, tol)
+
+
+# Parameter of the ROS2 method, which makes it L-stable.
+_ROS2_GAMMA = 1.0 + 1.0/np.sqrt(2.0)
+
+
+def rosenbrock(f: Callable, jac: Callable, t: float, x1: np.ndarray,
+               dt: Union[float, np.ndarray]) -> np.ndarray:
+    """
+    The second order Rosenbrock method ROS2. This is a W-method, so it
+    stays second order even if jac is only an approximation of the
+    Jacobian, and it takes a single linear solve per stage instead of
+    iterating. x1 is either a 2-vector or a (2, N) array of states.
+
+    >>> f = lambda xy, t: np.array([-1000.0*xy[0], -xy[1]])
+    >>> jac = lambda xy, t: (-1000.0, 0.0, 0.0, -1.0)
+    >>> x = np.array([1.0, 1.0])
+    >>> for _ in range(10):
+    ...     x = rosenbrock(f, jac, 0.0, x, 0.1)
+    >>> bool(abs(x[0]) < 1e-6 and abs(x[1] - np.exp(-1.0)) < 1e-2)
+    True
+    """
+    x1 = np.asarray(x1, dtype=np.float64)
+    a, b, c, d = jac(x1, t)
+    h = _ROS2_GAMMA*dt
+    matrix = (1.0 - h*a, -h*b, -h*c, 1.0 - h*d)
+    k1 = solve_2x2(*matrix, np.asarray(f(x1, t)))
+    k2 = solve_2x2(*matrix, np.asarray(f(x1 + dt*k1, t + dt)) - 2.0*k1)
+    return x1 + dt*(1.5*k1 + 0.5*k2)
+
+
 if __name__ == "__main__":
-    pass
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,86 @@
+"""
+Render a vector field as an image of its streamlines, using
+line integral convolution.
+
+Cabral, B., Leedom, L. C. (1993). Imaging vector fields using line
+integral convolution. In Proceedings of SIGGRAPH '93, 263-270.
+"""
+import numpy as np
+from lru_cache import LRUCache
+from typing import Callable, Hashable, List, Tuple
+
+
+_image_cache = LRUCache(8)
+
+
+def line_integral_convolution(f: Callable, bounds: List[float],
+                              shape: Tuple[int, int] = (256, 256),
+                              length: int = 20, seed: int = 0
+                              ) -> np.ndarray:
+    """
+    Get an image of shape (rows, columns) of the streamlines of the
+    vector field f over the bounds. Each pixel is the average of a
+    noise texture along the streamline through it, which is traced for
+    length pixels in both directions. The field is evaluated once
+    on the pixel grid, and every streamline is traced at the same time.
+
+    >>> f = lambda xy: [np.ones_like(xy[0]), np.zeros_like(xy[1])]
+    >>> image = line_integral_convolution(f, [-1.0, 1.0, -1.0, 1.0],
+    ...                                   (8, 16), 4)
+    >>> image.shape
+    (8, 16)
+    >>> bool(np.std(image[:, 4:-4], axis=1).max()
+    ...      < np.std(image[:, 4:-4], axis=0).max())
+    True
+    """
+    rows, columns = shape
+    x = np.linspace(bounds[0], bounds[1], columns)
+    y = np.linspace(bounds[2], bounds[3], rows)
+    u, v = f([np.outer(np.ones(rows), x), np.outer(y, np.ones(columns))])
+    u = np.broadcast_to(u, shape).astype(np.float64)
+    v = np.broadcast_to(v, shape).astype(np.float64)
+    # Step along the streamlines one pixel at a time.
+    u *= (columns - 1)/(bounds[1] - bounds[0])
+    v *= (rows - 1)/(bounds[3] - bounds[2])
+    norm = np.hypot(u, v)
+    moving = np.isfinite(norm) & (norm > 0.0)
+    u = np.where(moving, u/np.where(moving, norm, 1.0), 0.0)
+    v = np.where(moving, v/np.where(moving, norm, 1.0), 0.0)
+
+    noise = np.random.default_rng(seed).random(shape)
+    total = noise.copy()
+    count = np.ones(shape)
+    for direction in (1.0, -1.0):
+        px, py = np.meshgrid(np.arange(columns, dtype=np.float64),
+                             np.arange(rows, dtype=np.float64))
+        inside = moving.copy()
+        for _ in range(length):
+            i = np.clip(np.rint(py), 0, rows - 1).astype(np.intp)
+            j = np.clip(np.rint(px), 0, columns - 1).astype(np.intp)
+            px += direction*u[i, j]
+            py += direction*v[i, j]
+            inside &= ((px > -0.5) & (px < columns - 0.5)
+                       & (py > -0.5) & (py < rows - 0.5))
+            i = np.clip(np.rint(py), 0, rows - 1).astype(np.intp)
+            j = np.clip(np.rint(px), 0, columns - 1).astype(np.intp)
+            total += np.where(inside, noise[i, j], 0.0)
+            count += inside
+    return total/count
+
+
+def get_streamline_image(f: Callable, key: Hashable, bounds: List[float],
+                         shape: Tuple[int, int] = (256, 256),
+                         length: int = 20) -> np.ndarray:
+    """
+    Get the line integral convolution image of f, reusing a previously
+    computed one if there is one in the cache. The key must identify
+    the vector field, including the values of its parameters.
+    """
+    return _image_cache.get(
+        (key, tuple(bounds), tuple(shape), length),
+        lambda: line_integral_convolution(f, bounds, shape, length))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
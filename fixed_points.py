@@ -0,0 +1,201 @@
+"""
+Finding and classifying the fixed points of x' = f(x, y), y' = g(x, y).
+"""
+import cmath
+import numpy as np
+from typing import Callable, List, Tuple
+
+
+STABLE_NODE = "stable node"
+UNSTABLE_NODE = "unstable node"
+STABLE_SPIRAL = "stable spiral"
+UNSTABLE_SPIRAL = "unstable spiral"
+CENTER = "center"
+SADDLE = "saddle"
+DEGENERATE = "degenerate"
+
+
+class FixedPoint:
+    """
+    A fixed point of a system of two ODEs.
+
+    Attributes:
+    x [float]: The x coordinate.
+    y [float]: The y coordinate.
+    trace [float]: The trace of the Jacobian at the fixed point.
+    determinant [float]: The determinant of the Jacobian
+                         at the fixed point.
+    kind [str]: What kind of fixed point this is, from the
+                eigenvalues of the Jacobian.
+    """
+
+    def __init__(self, x: float, y: float,
+                 trace: float, determinant: float, kind: str) -> None:
+        """
+        The initializer.
+        """
+        self.x = x
+        self.y = y
+        self.trace = trace
+        self.determinant = determinant
+        self.kind = kind
+
+    def eigenvalues(self) -> Tuple[complex, complex]:
+        """
+        Get the eigenvalues of the Jacobian at the fixed point.
+
+        >>> FixedPoint(0.0, 0.0, -2.0, 2.0, STABLE_SPIRAL).eigenvalues()
+        ((-1-1j), (-1+1j))
+        """
+        root = cmath.sqrt(self.trace**2 - 4.0*self.determinant)
+        return ((self.trace - root)/2.0, (self.trace + root)/2.0)
+
+    def is_stable(self) -> bool:
+        """
+        Check if nearby trajectories approach this fixed point.
+        """
+        return self.kind in (STABLE_NODE, STABLE_SPIRAL)
+
+    def __repr__(self) -> str:
+        """
+        The string representation.
+        """
+        return "FixedPoint(%g, %g, %s)" % (self.x, self.y, self.kind)
+
+
+def classify(trace: np.ndarray, determinant: np.ndarray,
+             eps: float = 1e-9) -> List[str]:
+    """
+    Classify fixed points by the trace and determinant
+    of their Jacobians.
+
+    >>> classify(np.array([-3.0, 1.0, 0.0, 2.0, 1.0]),
+    ...          np.array([2.0, 1.0, 1.0, -1.0, 0.0]))
+    ['stable node', 'unstable spiral', 'center', 'saddle', 'degenerate']
+    """
+    kinds = []
+    for tr, det in zip(np.ravel(trace), np.ravel(determinant)):
+        scale = eps*max(1.0, tr*tr, abs(det))
+        if abs(det) <= scale:
+            kinds.append(DEGENERATE)
+        elif det < 0.0:
+            kinds.append(SADDLE)
+        elif abs(tr) <= np.sqrt(scale):
+            kinds.append(CENTER)
+        elif tr*tr - 4.0*det < 0.0:
+            kinds.append(STABLE_SPIRAL if tr < 0.0 else UNSTABLE_SPIRAL)
+        else:
+            kinds.append(STABLE_NODE if tr < 0.0 else UNSTABLE_NODE)
+    return kinds
+
+
+def seeds_from_grid(x: np.ndarray, y: np.ndarray,
+                    u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """
+    Get the centres of the cells of a grid that both nullclines
+    pass through, which are the cells where both u and v change sign
+    or are zero at a corner, as a (2, N) array.
+
+    >>> x, y = np.meshgrid(np.arange(4.0), np.arange(4.0))
+    >>> seeds_from_grid(x, y, x - 1.5, y - 0.5)
+    array([[1.5],
+           [0.5]])
+    """
+    def crosses(w: np.ndarray) -> np.ndarray:
+        corners = np.array([w[:-1, :-1], w[:-1, 1:], w[1:, :-1], w[1:, 1:]])
+        return (corners.min(axis=0) <= 0.0) & (corners.max(axis=0) >= 0.0)
+    cells = crosses(u) & crosses(v)
+    xc = (x[:-1, :-1] + x[1:, 1:])/2.0
+    yc = (y[:-1, :-1] + y[1:, 1:])/2.0
+    return np.array([xc[cells], yc[cells]])
+
+
+def newton(f: Callable, jac: Callable, xy: np.ndarray,
+           iterations: int = 20, tol: float = 1e-10) -> np.ndarray:
+    """
+    Do Newton's method from every column of a (2, N) array of
+    starting points at once, where f(x, y) gives both components of the
+    system and jac(x, y) gives the entries of its Jacobian. Return the
+    points that converged, as a (2, M) array.
+
+    >>> f = lambda x, y: (x*x - 1.0, y - x)
+    >>> jac = lambda x, y: (2.0*x, 0.0*x, -1.0 + 0.0*x, 1.0 + 0.0*x)
+    >>> newton(f, jac, np.array([[2.0, -3.0], [0.0, 0.0]])).round(12)
+    array([[ 1., -1.],
+           [ 1., -1.]])
+    """
+    x, y = np.array(xy, dtype=np.float64)
+    for _ in range(iterations):
+        u, v = f(x, y)
+        a, b, c, d = jac(x, y)
+        det = a*d - b*c
+        # Solve the 2x2 linear system for the Newton step
+        # with Cramer's rule.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dx = (d*u - b*v)/det
+            dy = (a*v - c*u)/det
+        keep = np.isfinite(dx) & np.isfinite(dy)
+        x, y = x[keep] - dx[keep], y[keep] - dy[keep]
+        if np.all(np.abs(dx[keep]) + np.abs(dy[keep])
+                  <= tol*(1.0 + np.abs(x) + np.abs(y))):
+            break
+    with np.errstate(invalid="ignore"):
+        u, v = f(x, y)
+        residual = np.abs(u) + np.abs(v)
+    converged = residual <= np.sqrt(tol)*(1.0 + np.abs(x) + np.abs(y))
+    return np.array([x[converged], y[converged]])
+
+
+def deduplicate(xy: np.ndarray, distance: float) -> np.ndarray:
+    """
+    Remove points of a (2, N) array that are within
+    distance of an earlier point.
+
+    >>> deduplicate(np.array([[0.0, 1.0, 1e-9, 1.0], [0.0, 1.0, 0.0, 2.0]]),
+    ...             1e-6)
+    array([[0., 1., 1.],
+           [0., 1., 2.]])
+    """
+    kept = []
+    for point in xy.T:
+        if all(np.abs(point - other).max() > distance for other in kept):
+            kept.append(point)
+    return np.array(kept).T.reshape(2, len(kept))
+
+
+def find_fixed_points(f: Callable, jac: Callable, x: np.ndarray,
+                      y: np.ndarray, u: np.ndarray, v: np.ndarray,
+                      bounds: List[float]) -> List[FixedPoint]:
+    """
+    Find the fixed points within the bounds, given the grid of points
+    x, y where f(x, y) has the values u, v. Newton's method is started
+    from every cell of the grid that both nullclines pass through.
+
+    >>> f = lambda x, y: (y, -np.sin(x) - y/2.0)
+    >>> jac = lambda x, y: (0.0*x, 1.0 + 0.0*x, -np.cos(x), -0.5 + 0.0*x)
+    >>> x, y = np.meshgrid(np.linspace(-4, 4, 21), np.linspace(-4, 4, 21))
+    >>> find_fixed_points(f, jac, x, y, *f(x, y), [-4, 4, -4, 4])
+    [FixedPoint(-3.14159, 0, saddle), FixedPoint(0, 0, stable spiral), \
+FixedPoint(3.14159, 0, saddle)]
+    """
+    seeds = seeds_from_grid(x, y, u, v)
+    if seeds.shape[1] == 0:
+        return []
+    roots = newton(f, jac, seeds)
+    xmin, xmax, ymin, ymax = bounds
+    inside = ((roots[0] >= xmin) & (roots[0] <= xmax)
+              & (roots[1] >= ymin) & (roots[1] <= ymax))
+    spacing = max(xmax - xmin, ymax - ymin)
+    roots = deduplicate(roots[:, inside], 1e-6*spacing)
+    roots = roots[:, np.lexsort((roots[1], roots[0]))]
+    a, b, c, d = jac(roots[0], roots[1])
+    trace, determinant = a + d, a*d - b*c
+    kinds = classify(trace, determinant)
+    return [FixedPoint(float(px), float(py), float(tr), float(det), kind)
+            for px, py, tr, det, kind in zip(roots[0], roots[1], trace,
+                                              determinant, kinds)]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
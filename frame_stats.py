@@ -0,0 +1,131 @@
+"""
+Timing statistics of the animation frames.
+"""
+import json
+import numpy as np
+from typing import Dict
+
+
+class FrameStats:
+    """
+    Records how long the update and draw phases of each animation frame
+    take, and how many integration steps each frame does. The durations
+    are counted in histograms with a fixed number of bins, so the memory
+    used does not grow with the number of frames.
+
+    Attributes:
+    bin_width [float]: The width in seconds of each histogram bin.
+    update_counts [np.ndarray]: Histogram of the update durations, where
+                                the last bin counts every longer duration.
+    draw_counts [np.ndarray]: Histogram of the draw durations.
+    frames [int]: The number of frames recorded.
+    steps [int]: The total number of integration steps.
+    max_steps [int]: The most integration steps done in a single frame.
+    overlay [Text]: Text that shows the statistics on the plot,
+                    or None if they are not shown.
+    """
+
+    def __init__(self, bin_width: float = 5e-4, bins: int = 200) -> None:
+        """
+        The initializer.
+
+        >>> stats = FrameStats(bin_width=1e-3, bins=10)
+        >>> for t in [0.0005, 0.0015, 0.0025, 0.5]:
+        ...     stats.record_update(t, 2)
+        >>> stats.update_counts.tolist()
+        [1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1]
+        >>> stats.frames, stats.steps, stats.max_steps
+        (4, 8, 2)
+        >>> stats.percentile(stats.update_counts, 50)
+        0.002
+        """
+        self.bin_width = bin_width
+        self.update_counts = np.zeros(bins + 1, dtype=np.int64)
+        self.draw_counts = np.zeros(bins + 1, dtype=np.int64)
+        self.frames = 0
+        self.steps = 0
+        self.max_steps = 0
+        self.overlay = None
+        self._update_total = 0.0
+        self._draw_total = 0.0
+        self._draws = 0
+
+    def _bin(self, seconds: float) -> int:
+        """
+        Get the histogram bin of a duration.
+        """
+        return min(int(seconds/self.bin_width), len(self.update_counts) - 1)
+
+    def record_update(self, seconds: float, steps: int) -> None:
+        """
+        Record the duration and number of integration steps
+        of the update phase of a frame.
+        """
+        self.update_counts[self._bin(seconds)] += 1
+        self._update_total += seconds
+        self.frames += 1
+        self.steps += steps
+        self.max_steps = max(self.max_steps, steps)
+
+    def record_draw(self, seconds: float) -> None:
+        """
+        Record the duration of the draw phase of a frame.
+        """
+        self.draw_counts[self._bin(seconds)] += 1
+        self._draw_total += seconds
+        self._draws += 1
+
+    def percentile(self, counts: np.ndarray, q: float) -> float:
+        """
+        Estimate a percentile of the durations counted in a histogram,
+        as the upper edge of the bin that contains it.
+        """
+        total = counts.sum()
+        if total == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(counts), q/100.0*total))
+        return (index + 1)*self.bin_width
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Get a summary of the recorded statistics.
+        """
+        return {
+            "frames": self.frames,
+            "update_mean": self._update_total/max(self.frames, 1),
+            "update_p50": self.percentile(self.update_counts, 50),
+            "update_p99": self.percentile(self.update_counts, 99),
+            "draw_mean": self._draw_total/max(self._draws, 1),
+            "draw_p50": self.percentile(self.draw_counts, 50),
+            "draw_p99": self.percentile(self.draw_counts, 99),
+            "steps_mean": self.steps/max(self.frames, 1),
+            "steps_max": self.max_steps,
+        }
+
+    def overlay_text(self) -> str:
+        """
+        Get the text that shows the statistics on the plot.
+        """
+        s = self.summary()
+        return ("update %.2f ms (p99 %.1f)\n"
+                "draw %.2f ms (p99 %.1f)\n"
+                "steps/frame %.1f (max %d)" % (
+                    1e3*s["update_mean"], 1e3*s["update_p99"],
+                    1e3*s["draw_mean"], 1e3*s["draw_p99"],
+                    s["steps_mean"], s["steps_max"]))
+
+    def dump(self, filename: str) -> None:
+        """
+        Save the summary and histograms as JSON.
+        """
+        data = self.summary()
+        data["bin_width"] = self.bin_width
+        data["update_counts"] = self.update_counts.tolist()
+        data["draw_counts"] = self.draw_counts.tolist()
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=1)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -1,11 +1,28 @@
 """
 functions.py
+
+Sympy takes a long time to import, so it is only imported once an
+expression has to be parsed or differentiated. Functions made from a
+state, such as those of the presets, don't need it.
+
+For the same reason, variables and parameters are referred to by their
+names as strings rather than as sympy Symbols. This holds for the
+symbols, domain_variables and parameters of the functions and the keys
+of get_default_values, which used to be Symbols, so code that looks
+them up by Symbol has to use str(symbol) instead.
 """
+from __future__ import annotations
+import io
+import inspect
+import itertools
+import linecache
+import re
+import tokenize
 import numpy as np
-from sympy import lambdify, abc, latex, diff, integrate
-from sympy.parsing.sympy_parser import parse_expr
-from sympy.core import basic
-from typing import Dict, List, Union
+from lru_cache import LRUCache
+from typing import TYPE_CHECKING, Callable, Dict, List, Union
+if TYPE_CHECKING:
+    from sympy.core import basic
 
 
 class VariableNotFoundError(Exception):
@@ -20,23 +37,81 @@ def zero(*args):
     return args[0]*0
 
 
-def rect(x: np.ndarray) -> np.ndarray:
+def rect(x: Union[np.ndarray, float]) -> Union[np.ndarray, float]:
     """
     Rectangle function.
+
+    >>> rect(np.array([-1.0, -0.25, 0.0, 0.5]))
+    array([0., 1., 1., 0.])
+    >>> rect(0.25)
+    1.0
     """
-    return np.array(
-        [
-            1.0 if (0.5 > x_i > -0.5) else 0.
-            for x_i in x
-        ]
-        )
+    if isinstance(x, (float, int)):
+        return 1.0 if (0.5 > x > -0.5) else 0.
+    return np.where(np.abs(x) < 0.5, 1.0, 0.)
 
 
-def noise(x: np.ndarray) -> np.ndarray:
+class Noise:
     """
-    This is the noise function.
+    A noise function that gives values in [-1, 1). The values are
+    drawn once from a seeded numpy Generator, and then looked up by
+    hashing the input on a fine lattice, so evaluating it at the same
+    points always gives the same noise.
+
+    Attributes:
+    seed [int]: The seed of the generator, or None for a random one.
+    resolution [float]: The spacing of the lattice the input is hashed on.
     """
-    return np.array([2.0*np.random.rand() - 1.0 for _ in range(len(x))])
+
+    # Private Attributes:
+    # _values [np.ndarray]: table of random values, with a power of 2 size
+    # _shift [int]: shift that takes the top bits of a 64 bit hash
+    #               as an index into _values
+
+    # Multiplier of Fibonacci hashing, 2**64 divided by the golden ratio.
+    _HASH = 0x9E3779B97F4A7C15
+    _MASK = 0xFFFFFFFFFFFFFFFF
+
+    def __init__(self, seed: int = None, size_bits: int = 12,
+                 resolution: float = 1e-3) -> None:
+        """
+        The initializer.
+
+        >>> noise = Noise(seed=1)
+        >>> x = np.array([-2.5, 0.0, 0.75, 0.75])
+        >>> values = noise(x)
+        >>> bool(values[2] == values[3] == noise(0.75))
+        True
+        >>> bool(np.all(values == Noise(seed=1)(x)))
+        True
+        """
+        self.seed = seed
+        self.resolution = resolution
+        generator = np.random.default_rng(seed)
+        self._values = generator.uniform(-1.0, 1.0, 2**size_bits)
+        self._shift = 64 - size_bits
+
+    def __call__(self, x: Union[np.ndarray, float]
+                 ) -> Union[np.ndarray, float]:
+        """
+        Evaluate the noise at x.
+        """
+        if isinstance(x, (float, int)):
+            if not np.isfinite(x):
+                return 0.0
+            k = int(np.floor(x/self.resolution))
+            return float(self._values[
+                ((k*self._HASH) & self._MASK) >> self._shift])
+        x = np.asarray(x, dtype=np.float64)
+        finite = np.isfinite(x)
+        k = np.floor(np.where(finite, x, 0.0)/self.resolution)
+        k = np.clip(k, -2.0**62, 2.0**62).astype(np.int64)
+        index = (k.view(np.uint64)*np.uint64(self._HASH)
+                 >> np.uint64(self._shift))
+        return np.where(finite, self._values[index], 0.0)
+
+
+noise = Noise()
 
 
 def multiplies_var(main_var: basic.Basic, arb_var: basic.Basic,
@@ -52,6 +127,8 @@ def multiplies_var(main_var: basic.Basic, arb_var: basic.Basic,
 
     The following examples should clarify what this function does:
 
+    >>> from sympy import abc
+    >>> from sympy.parsing.sympy_parser import parse_expr
     >>> expr = parse_expr("a*sinh(k*x) + c")
     >>> multiplies_var(abc.x, abc.a, expr)
     True
@@ -91,6 +168,55 @@ def multiplies_var(main_var: basic.Basic, arb_var: basic.Basic,
                 (arg is not main_var)])
 
 
+_compiled_count = itertools.count()
+
+
+def compile_lambda(source: str, modules: list) -> Callable:
+    """
+    Compile the source of a function made by lambdify, with the same
+    names available to it as when lambdify is given the modules
+    ["numpy", functions], so that it doesn't have to be made again.
+    The source is run as it is, so it must only ever come from a
+    trusted place, such as the states generated into preset_kernels.py,
+    and never from a file given by a user.
+
+    >>> f = compile_lambda("def f(x, k):\\n    return k*sin(x) + rect(x)",
+    ...                    ["numpy", {"rect": rect}])
+    >>> float(f(0.0, 2.0))
+    1.0
+    >>> print(inspect.getsource(f))
+    def f(x, k):
+        return k*sin(x) + rect(x)
+    """
+    namespace = {"I": 1j}
+    exec("import numpy; from numpy import *; from numpy.linalg import *",
+         namespace)
+    namespace["Heaviside"] = np.heaviside
+    namespace.update(modules[1])
+    # Keep the source where inspect can find it, as lambdify does,
+    # so that the state of the function can be got again.
+    filename = "<compiled lambdify-%d>" % next(_compiled_count)
+    linecache.cache[filename] = (len(source), None,
+                                 source.splitlines(True), filename)
+    exec(compile(source, filename, "exec"), namespace)
+    return namespace[re.search(r"def (\w+)\(", source).group(1)]
+
+
+def _probe(lambda_func: Callable, n_variables: int,
+           parameter_values: List[float]) -> List[str]:
+    """
+    Evaluate a compiled function at a fixed point, to check that it
+    agrees with another one compiled from the same expressions.
+    Return the values as strings, or None if they aren't real.
+    """
+    values = [0.5, 0.25][:n_variables] + list(parameter_values)
+    with np.errstate(all="ignore"):
+        result = np.asarray(lambda_func(*values))
+    if np.iscomplexobj(result) or result.dtype == object:
+        return None
+    return [repr(float(value)) for value in result.ravel()]
+
+
 class FunctionR2toR:
     """
     A callable function class that maps two variables,
@@ -98,102 +224,165 @@ class FunctionR2toR:
 
     Attributes:
     latex_repr [str]: The function as a LaTeX string.
-    symbols [sympy.Symbol]: All variables used in this function.
-    domain_variables [sympy.Symbol]: The variables in the domain.
-    parameters [sympy.Symbol]: All scalar parameters used in the function.
+    symbols [List[str]]: The names of all variables used in this function.
+    domain_variables [List[str]]: The names of the variables in the domain.
+    parameters [List[str]]: The names of all scalar parameters
+                            used in the function.
+    parameter_index [Dict[str, int]]: The position of each
+                                      parameter in parameters.
     """
 
     # Private Attributes:
-    # _symbolic_func [sympy.basic.Basic]: symbol function
+    # _symbolic [sympy.basic.Basic]: symbol function, or None until it is
+    #                                parsed for a function made from a state
+    # _expression [str]: the expression to parse the symbol function from
     # _lambda_func [sympy.Function]: lamba function
+    # _noise [Noise]: the noise function of this function
+    # _modules [list]: the modules passed to lambdify
+    # _default_values [Dict[str, float]]: suggested parameter values
 
     def __init__(self, function_name: str,
                  main_variables:
-                 List[basic.Basic]
-                 = None) -> None:
+                 List[str]
+                 = None, seed: int = None, state: dict = None) -> None:
         """
         The initializer. The parameter must be a
-        string representation of a function.
+        string representation of a function. The seed is used for
+        the noise function, which gives the same values every time
+        this function is evaluated at the same point. If a state from
+        the get_state method is given, the function is compiled from
+        the source in it, and the expression is only parsed once the
+        symbol function is needed. The source is run, so the state
+        must be trusted.
 
         >>> f = FunctionR2toR("a*x*cos(x*y) + b")
         >>> f(2, 3.141592653589793, 1.0, 1.0)
         3.0
-        >>> a = abc.a
-        >>> b = abc.b
-        >>> c = abc.c
-        >>> f.get_default_values() == {a: 1.0, b: 0.0}
+        >>> f.get_default_values() == {"a": 1.0, "b": 0.0}
         True
-        >>> g = FunctionR2toR("a**2*sin(x) + b*y + c", [abc.x, abc.y])
-        >>> g.get_default_values() == {a: 1.0, b: 1.0, c: 0.0}
+        >>> g = FunctionR2toR("a**2*sin(x) + b*y + c", ["x", "y"])
+        >>> g.get_default_values() == {"a": 1.0, "b": 1.0, "c": 0.0}
         True
-        >>> g = FunctionR2toR("a**2*sin(x) + c", [abc.x, abc.y])
-        >>> g.get_default_values() == {a: 1.0, c: 0.0}
+        >>> g = FunctionR2toR("a**2*sin(x) + c", ["x", "y"])
+        >>> g.get_default_values() == {"a": 1.0, "c": 0.0}
         True
-        >>> g = FunctionR2toR("b*sinh(y) + c", [abc.x, abc.y])
-        >>> g.get_default_values() == {b: 1.0, c: 0.0}
+        >>> g = FunctionR2toR("b*sinh(y) + c", ["x", "y"])
+        >>> g.get_default_values() == {"b": 1.0, "c": 0.0}
         True
+        >>> h = FunctionR2toR("", state=f.get_state())
+        >>> float(h(2, 3.141592653589793, 1.0, 1.0)), h._symbolic is None
+        (3.0, True)
+        >>> h.parameters == f.parameters, h.latex_repr == f.latex_repr
+        (True, True)
         """
         self._SINGLE_VARIABLE = 1
         self._DOUBLE_VARIABLE = 2
         self._domain_type = 0
-        if main_variables is None:
-            param1, param2 = abc.x, abc.y
-            main_variables = [param1, param2]
-        else:
-            param1, param2 = main_variables
-        self.domain_variables = main_variables
+        self._expression = function_name
+        self._symbolic = None
         # Dictionary of modules and user defined functions.
         # Used for lambdify from sympy to parse input.
         def zero(*args):
             return args[0]*0
-        module_list = ["numpy", {"rect": rect, "noise": noise, "zero": zero}]
-        self._symbolic_func = parse_expr(function_name)
-        symbol_set = self._symbolic_func.free_symbols
-        symbol_list = list(symbol_set)
-        self.latex_repr = latex(self._symbolic_func)
-        if self._symbolic_func.has(param1) and self._symbolic_func.has(param2):
-            self._domain_type = self._DOUBLE_VARIABLE
-            self.domain_variables = [param1, param2]
-            symbol_list.remove(param1)
-            symbol_list.remove(param2)
-            self.parameters = symbol_list
-            main_variables.extend(symbol_list)
-            self.symbols = main_variables
-            self._lambda_func = lambdify(
-                self.symbols, self._symbolic_func, modules=module_list)
-        elif (self._symbolic_func.has(param1)
-              and not self._symbolic_func.has(param2)):
-            self._domain_type = self._SINGLE_VARIABLE
-            self.domain_variables = [param1]
-            symbols = [param1]
-            symbol_list.remove(param1)
-            self.parameters = symbol_list
-            symbols.extend(symbol_list)
-            self.symbols = symbols
-            self._lambda_func = lambdify(
-                self.symbols, self._symbolic_func, modules=module_list)
-        elif (not self._symbolic_func.has(param1)
-              and self._symbolic_func.has(param2)):
-            self._domain_type = self._SINGLE_VARIABLE
-            self.domain_variables = [param2]
-            symbols = [param2]
-            symbol_list.remove(param2)
-            self.parameters = symbol_list
-            symbols.extend(symbol_list)
-            self.symbols = symbols
-            self._lambda_func = lambdify(
-                self.symbols, self._symbolic_func, modules=module_list)
+        self._noise = Noise(seed)
+        module_list = ["numpy", {"rect": rect, "noise": self._noise,
+                                 "zero": zero}]
+        self._modules = module_list
+        if state is not None and self._set_state(state):
+            return
+        from sympy import Symbol, lambdify, latex
+        from sympy.parsing.sympy_parser import parse_expr
+        if main_variables is None:
+            main_variables = ["x", "y"]
+        param1, param2 = [Symbol(str(s)) for s in main_variables]
+        self._symbolic = parse_expr(function_name)
+        # Sort the parameters, so that they are in the same order
+        # in every run.
+        symbol_list = sorted(self._symbolic.free_symbols, key=str)
+        self.latex_repr = latex(self._symbolic)
+        if self._symbolic.has(param1) and self._symbolic.has(param2):
+            domain = [param1, param2]
+        elif self._symbolic.has(param1):
+            domain = [param1]
+        elif self._symbolic.has(param2):
+            domain = [param2]
         else:
-            zero = parse_expr("zero(x, y)")
-            self._symbolic_func += zero
-            self._domain_type = self._DOUBLE_VARIABLE
-            self.domain_variables = [param1, param2]
-            self.parameters = symbol_list
-            main_variables.extend(symbol_list)
-            self.symbols = main_variables
-            self._lambda_func = lambdify(
-                self.symbols, self._symbolic_func, modules=module_list)
             # raise VariableNotFoundError
+            self._symbolic += parse_expr("zero(x, y)")
+            domain = [param1, param2]
+        for variable in domain:
+            if variable in symbol_list:
+                symbol_list.remove(variable)
+        self._domain_type = (self._DOUBLE_VARIABLE if len(domain) == 2
+                             else self._SINGLE_VARIABLE)
+        self._lambda_func = lambdify(
+            domain + symbol_list, self._symbolic, modules=module_list)
+        # Parameters are known by their names, so that
+        # functions made from a state don't need sympy.
+        self.domain_variables = [str(s) for s in domain]
+        self.parameters = [str(s) for s in symbol_list]
+        self.symbols = self.domain_variables + self.parameters
+        self.parameter_index = {s: i for i, s in enumerate(self.parameters)}
+        # Walking the expression tree is slow for larger expressions,
+        # so only do this once.
+        self._default_values = self._find_default_values()
+
+    @property
+    def _symbolic_func(self) -> basic.Basic:
+        """
+        The symbol function, which is parsed the first time it is needed.
+        """
+        if self._symbolic is None:
+            from sympy.parsing.sympy_parser import parse_expr
+            self._symbolic = parse_expr(self._expression)
+        return self._symbolic
+
+    def get_state(self) -> dict:
+        """
+        Get a dict of strings and numbers from which this function
+        can be made again without parsing its expression.
+        """
+        expression = (self._expression if self._symbolic is None
+                      else str(self._symbolic))
+        state = {"expression": expression,
+                 "domain_variables": list(self.domain_variables),
+                 "parameters": list(self.parameters),
+                 "default_values": [self._default_values[s]
+                                    for s in self.parameters],
+                 "latex": self.latex_repr,
+                 "source": inspect.getsource(self._lambda_func)}
+        state["probe"] = _probe(self._lambda_func,
+                                len(self.domain_variables),
+                                state["default_values"])
+        return state
+
+    def _set_state(self, state: dict) -> bool:
+        """
+        Set this function from a state, and return whether this worked.
+        The function compiled from the state must give the same value
+        as when the state was made, or else the expression is parsed.
+        """
+        try:
+            lambda_func = compile_lambda(state["source"], self._modules)
+            probe = _probe(lambda_func, len(state["domain_variables"]),
+                           state["default_values"])
+        except (KeyError, NameError, SyntaxError, TypeError, ValueError):
+            return False
+        if probe is None or probe != state["probe"]:
+            return False
+        self._expression = state["expression"]
+        self.latex_repr = state["latex"]
+        self.domain_variables = list(state["domain_variables"])
+        self._domain_type = (self._DOUBLE_VARIABLE
+                             if len(self.domain_variables) == 2
+                             else self._SINGLE_VARIABLE)
+        self.parameters = list(state["parameters"])
+        self.symbols = self.domain_variables + self.parameters
+        self._lambda_func = lambda_func
+        self.parameter_index = {s: i for i, s in enumerate(self.parameters)}
+        self._default_values = dict(zip(self.parameters,
+                                        state["default_values"]))
+        return True
 
     def __call__(self,
                  param1: Union[np.array, float],
@@ -202,10 +391,10 @@ class FunctionR2toR:
         """
         Call this class as if it were a function.
 
-        >>> f = FunctionR2toR("a**2*sin(x) + b*y", [abc.x, abc.y])
+        >>> f = FunctionR2toR("a**2*sin(x) + b*y", ["x", "y"])
         >>> f(0.0, 1.0, 2.0, 2.0)
         2.0
-        >>> f = FunctionR2toR("a**2*(x**2 + 1)", [abc.x, abc.y])
+        >>> f = FunctionR2toR("a**2*(x**2 + 1)", ["x", "y"])
         >>> f(1.0, 1.0)
         2.0
         """
@@ -217,21 +406,292 @@ class FunctionR2toR:
         else:
             pass
 
-    def get_default_values(self) -> Dict[basic.Basic, float]:
+    def get_default_values(self) -> Dict[str, float]:
         """
         Get a dict of the suggested default values for each parameter
         used in this function.
         """
+        return dict(self._default_values)
+
+    def _find_default_values(self) -> Dict[str, float]:
+        """
+        Find the suggested default values for each parameter, where
+        parameters that multiply a variable default to 1.0
+        and the rest default to 0.0.
+        """
+        from sympy import Symbol
         default_values_dict = {}
         for s in self.parameters:
             value = float(multiplies_var(
-                self.symbols[0], s, self._symbolic_func)
+                Symbol(self.symbols[0]), Symbol(s), self._symbolic_func)
                           or multiplies_var(
-                              self.symbols[1], s, self._symbolic_func))
+                              Symbol(self.symbols[1]), Symbol(s),
+                              self._symbolic_func))
             default_values_dict[s] = value
         return default_values_dict
 
 
+class SystemR2toR2:
+    """
+    A callable that evaluates two FunctionR2toR objects as the
+    components of a single vector valued function. Both components
+    are compiled into one function, so that any subexpressions
+    they share are only computed once.
+
+    Attributes:
+    components [List[FunctionR2toR]]: The two component functions.
+    parameters [List[str]]: The names of the distinct parameters of both
+                            components, in the order passed to the
+                            compiled function.
+    """
+
+    # Private Attributes:
+    # _lambda_func [sympy.Function]: lambda function of x, y and
+    #                                the parameters returning both components
+    # _parameter_index [List[int]]: position of each parameter within the
+    #                               concatenated component parameters,
+    #                               or None if these are the same
+    # _variable_names [List[str]]: the names of the variables of the domain
+    # _symbolic [tuple]: the symbolic expressions of both components,
+    #                    where g calls noise_g instead of noise, or None
+    #                    until they are needed
+    # _modules [list]: the modules passed to lambdify
+    # _jacobian_func [sympy.Function]: lambda function returning the
+    #                                  Jacobian, which is only made
+    #                                  once it is needed, unless it
+    #                                  is in the state
+
+    def __init__(self, vx: FunctionR2toR, vy: FunctionR2toR,
+                 main_variables: List[str] = None,
+                 state: dict = None) -> None:
+        """
+        The initializer. If a state from the get_state method is given,
+        the system is compiled from the source in it instead, which is
+        run, so the state must be trusted.
+
+        >>> v = SystemR2toR2(FunctionR2toR("a*x*y - x"),
+        ...                  FunctionR2toR("x*y - a*y"))
+        >>> v.parameters
+        ['a']
+        >>> [float(c) for c in v(1.0, 2.0, [2.0], [2.0])]
+        [3.0, -2.0]
+        >>> v = SystemR2toR2(FunctionR2toR("y"), FunctionR2toR("k"))
+        >>> [c.tolist() for c in v(np.zeros(2), np.ones(2), [], [3.0])]
+        [[1.0, 1.0], [3.0, 3.0]]
+        >>> w = SystemR2toR2(v.components[0], v.components[1],
+        ...                  state=v.get_state())
+        >>> w._symbolic is None, [float(c) for c in w(1.0, 2.0, [], [3.0])]
+        (True, [2.0, 3.0])
+        """
+        if main_variables is None:
+            main_variables = ["x", "y"]
+        self.components = [vx, vy]
+        component_parameters = vx.parameters + vy.parameters
+        self.parameters = []
+        for s in component_parameters:
+            if s not in self.parameters:
+                self.parameters.append(s)
+        self._parameter_index = None
+        if len(self.parameters) != len(component_parameters):
+            self._parameter_index = [component_parameters.index(s)
+                                     for s in self.parameters]
+        # Components that only use one of x or y still take both,
+        # so that the domain of each component is resolved here
+        # instead of on every call.
+        module_list = ["numpy", {"rect": rect, "noise": vx._noise,
+                                 "noise_g": vy._noise, "zero": zero}]
+        self._variable_names = [str(s) for s in main_variables]
+        self._symbolic = None
+        self._modules = module_list
+        self._jacobian_func = None
+        self._lambda_func = None
+        if state is not None:
+            self._set_state(state, vx, vy)
+        if self._lambda_func is None:
+            from sympy import lambdify
+            self._lambda_func = lambdify(
+                self._arguments(), self._expressions,
+                modules=module_list, cse=True)
+
+    def _arguments(self) -> list:
+        """
+        Get the symbols of the variables and then the parameters,
+        in the order the compiled functions take them.
+        """
+        from sympy import Symbol
+        return [Symbol(s) for s in self._variable_names + self.parameters]
+
+    @property
+    def _expressions(self) -> tuple:
+        """
+        The symbolic expressions of both components, which are
+        only found once they are needed.
+        """
+        if self._symbolic is None:
+            from sympy import Function
+            vx, vy = self.components
+            # Rename the noise function of g, so that each component
+            # keeps the noise values of its own FunctionR2toR.
+            vy_symbolic_func = vy._symbolic_func.replace(
+                Function("noise"), Function("noise_g"))
+            self._symbolic = (vx._symbolic_func, vy_symbolic_func)
+        return self._symbolic
+
+    def get_state(self) -> dict:
+        """
+        Get a dict of strings from which this system can be compiled
+        again from the same components without lambdify. The Jacobian
+        is included once it has been made.
+        """
+        vx, vy = self.components
+        values = [*vx.get_default_values().values(),
+                  *vy.get_default_values().values()]
+        params = self.order_parameters(values[:len(vx.parameters)],
+                                       values[len(vx.parameters):])
+        state = {"parameters": list(self.parameters),
+                 "source": inspect.getsource(self._lambda_func),
+                 "probe": _probe(self._lambda_func, 2, params)}
+        if self._jacobian_func is not None:
+            state["jacobian"] = inspect.getsource(self._jacobian_func)
+        return state
+
+    def _set_state(self, state: dict, vx: FunctionR2toR,
+                   vy: FunctionR2toR) -> None:
+        """
+        Compile the system from a state, if it is for
+        components with the same parameters.
+        """
+        if state.get("parameters") != self.parameters:
+            return
+        vx_values = [vx.get_default_values()[s] for s in vx.parameters]
+        vy_values = [vy.get_default_values()[s] for s in vy.parameters]
+        try:
+            lambda_func = compile_lambda(state["source"], self._modules)
+            probe = _probe(lambda_func, 2,
+                           self.order_parameters(vx_values, vy_values))
+            jacobian_func = None
+            if "jacobian" in state:
+                jacobian_func = compile_lambda(state["jacobian"],
+                                               self._modules)
+        except (KeyError, NameError, SyntaxError, TypeError, ValueError):
+            return
+        if probe is not None and probe == state.get("probe"):
+            self._lambda_func = lambda_func
+            self._jacobian_func = jacobian_func
+
+    def order_parameters(self, vx_params: List[float],
+                         vy_params: List[float]) -> List[float]:
+        """
+        Get the parameter values in the order of the parameters attribute,
+        from the parameter values of each component function.
+        """
+        if self._parameter_index is None:
+            return [*vx_params, *vy_params]
+        params = [*vx_params, *vy_params]
+        return [params[i] for i in self._parameter_index]
+
+    def jacobian(self, x: Union[np.array, float], y: Union[np.array, float],
+                 vx_params: List[float], vy_params: List[float]) -> tuple:
+        """
+        Evaluate the Jacobian matrix of both components, and return
+        its entries (df/dx, df/dy, dg/dx, dg/dy) with the shape of x.
+        The derivatives are found symbolically the first time this is
+        called. The rect and noise functions are taken to be piecewise
+        constant, so their derivatives are zero.
+
+        >>> v = SystemR2toR2(FunctionR2toR("a*x*y - x"),
+        ...                  FunctionR2toR("sin(y) + noise(x)"))
+        >>> [float(c) for c in v.jacobian(1.0, 0.0, [2.0], [])]
+        [-1.0, 2.0, 0.0, 1.0]
+        >>> [c.shape for c in v.jacobian(np.zeros(3), np.ones(3), [1.0], [])]
+        [(3,), (3,), (3,), (3,)]
+        """
+        if self._jacobian_func is None:
+            from sympy import lambdify, diff, Derivative, Subs, S
+            variables = self._arguments()[:2]
+            entries = []
+            for expression in self._expressions:
+                for variable in variables:
+                    derivative = diff(expression, variable).replace(
+                        lambda e: isinstance(e, (Derivative, Subs)),
+                        lambda e: S.Zero)
+                    entries.append(derivative)
+            self._jacobian_func = lambdify(
+                self._arguments(), tuple(entries),
+                modules=self._modules, cse=True)
+        params = self.order_parameters(vx_params, vy_params)
+        jac = self._jacobian_func(x, y, *params)
+        # Constant entries are returned as scalars.
+        return tuple(np.broadcast_to(entry, np.shape(x)) for entry in jac)
+
+    def __call__(self, x: Union[np.array, float], y: Union[np.array, float],
+                 vx_params: List[float], vy_params: List[float]) -> tuple:
+        """
+        Evaluate both components, where vx_params and vy_params are
+        the parameter values of each component function in the
+        order of their parameters attribute.
+        """
+        return self._lambda_func(
+            x, y, *self.order_parameters(vx_params, vy_params))
+
+
+# Caches of compiled functions, so that going back to a recently
+# used expression doesn't parse and lambdify it again.
+function_cache = LRUCache(64)
+system_cache = LRUCache(16)
+
+
+def normalize_expression(function_name: str) -> str:
+    """
+    Get a normalized form of an expression string, where the tokens
+    are separated by single spaces.
+
+    >>> normalize_expression("a*x  -b *y")
+    'a * x - b * y'
+    """
+    try:
+        tokens = tokenize.generate_tokens(
+            io.StringIO(function_name.strip()).readline)
+        return " ".join(token.string for token in tokens if token.string
+                        and token.type not in (tokenize.NEWLINE,
+                                               tokenize.NL))
+    except (tokenize.TokenError, IndentationError):
+        return function_name.strip()
+
+
+def get_function(function_name: str,
+                 main_variables: List[str] = None,
+                 state: dict = None) -> FunctionR2toR:
+    """
+    Get a FunctionR2toR for an expression, reusing a previously
+    compiled one for the same expression and variables if there is
+    one in the cache. Otherwise it is made from the state if one is
+    given, which must be trusted since the source in it is run.
+
+    >>> get_function("a*x + y") is get_function("a * x + y")
+    True
+    """
+    if main_variables is None:
+        main_variables = ["x", "y"]
+    key = (normalize_expression(function_name),
+           tuple(str(s) for s in main_variables))
+    return function_cache.get(
+        key, lambda: FunctionR2toR(function_name, list(main_variables),
+                                   state=state))
+
+
+def get_system(vx: FunctionR2toR, vy: FunctionR2toR,
+               state: dict = None) -> SystemR2toR2:
+    """
+    Get the SystemR2toR2 of two component functions, reusing a
+    previously compiled one if there is one in the cache. Otherwise
+    it is made from the state if one is given, which must be trusted
+    since the source in it is run.
+    """
+    return system_cache.get((vx, vy),
+                            lambda: SystemR2toR2(vx, vy, state=state))
+
+
 if __name__ == "__main__":
     import doctest
     from time import perf_counter
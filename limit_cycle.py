@@ -0,0 +1,166 @@
+"""
+Streaming detection of closed orbits and limit cycles.
+"""
+import numpy as np
+from typing import Dict, Sequence
+
+
+class LimitCycleAnalyzer:
+    """
+    Finds the period and amplitude of a trajectory as its points come in,
+    from where it crosses a Poincaré section. The section is the line
+    through the initial point that is normal to the direction the
+    trajectory first moves in, and only crossings in that same direction
+    are counted. The trajectory has converged to a closed orbit once the
+    crossing point and the time between crossings stop changing, relative
+    to the size of the orbit, for several crossings in a row.
+
+    Only the last point, the last crossing, and the extent of the
+    trajectory since then are kept, so the memory used doesn't grow
+    with the length of the trajectory.
+
+    Attributes:
+    tol [float]: The relative change of the crossing point and period
+                 below which an orbit has converged.
+    confirmations [int]: The number of converged crossings in a row
+                         needed to confirm a closed orbit.
+    crossings [int]: The number of crossings so far.
+    period [float]: The time between the last two crossings,
+                    or nan if there haven't been two yet.
+    amplitude [np.ndarray]: Half of the extent along x and y of the
+                            trajectory between the last two crossings.
+    change [float]: The relative change of the crossing point at the
+                    last crossing, which gets smaller by a constant
+                    factor each cycle when approaching a limit cycle.
+    converged [int]: The number of converged crossings in a row.
+    """
+
+    # Private Attributes:
+    # _origin [np.ndarray]: the initial point, which the section goes through
+    # _normal [np.ndarray]: normal of the section, or None until the
+    #                       trajectory first moves
+    # _last [np.ndarray]: the last point added
+    # _t [float]: the time of the last point added
+    # _crossing [np.ndarray]: the point of the last crossing
+    # _crossing_t [float]: the time of the last crossing
+    # _min, _max [np.ndarray]: extent of the trajectory since the last crossing
+
+    def __init__(self, tol: float = 1e-3, confirmations: int = 3) -> None:
+        """
+        The initializer.
+
+        >>> analyzer = LimitCycleAnalyzer()
+        >>> analyzer.reset(1.0, 0.0)
+        >>> t = np.arange(1, 4001)*0.01
+        >>> analyzer.add_points(np.cos(t), -np.sin(t), 0.01)
+        >>> analyzer.crossings, round(float(analyzer.period), 6)
+        (6, 6.283185)
+        >>> analyzer.amplitude.round(4).tolist(), analyzer.is_confirmed()
+        ([1.0, 1.0], True)
+        """
+        self.tol = tol
+        self.confirmations = confirmations
+        self.reset(0.0, 0.0)
+
+    def reset(self, x: float, y: float) -> None:
+        """
+        Start analyzing a new trajectory from the initial point x, y.
+        """
+        self.crossings = 0
+        self.period = np.nan
+        self.amplitude = np.zeros(2)
+        self.change = np.nan
+        self.converged = 0
+        self._origin = np.array([x, y], dtype=np.float64)
+        self._normal = None
+        self._last = self._origin.copy()
+        self._t = 0.0
+        self._crossing = None
+        self._crossing_t = 0.0
+        self._min = self._origin.copy()
+        self._max = self._origin.copy()
+
+    def is_confirmed(self) -> bool:
+        """
+        Check if the trajectory has converged to a closed orbit.
+        """
+        return self.converged >= self.confirmations
+
+    def add_points(self, x: Sequence[float], y: Sequence[float],
+                   dt: float) -> None:
+        """
+        Add the next points of the trajectory, which are dt apart in time.
+        """
+        points = np.array([x, y], dtype=np.float64).reshape(2, -1)
+        if not points.shape[1]:
+            return
+        if self._normal is None:
+            moved = np.flatnonzero(np.any(points != self._origin[:, None],
+                                          axis=0))
+            if not moved.size:
+                self._t += dt*points.shape[1]
+                return
+            normal = points[:, moved[0]] - self._origin
+            self._normal = normal/np.hypot(*normal)
+        path = np.concatenate([self._last[:, None], points], axis=1)
+        t = self._t + dt*np.arange(path.shape[1])
+        s = self._normal @ (path - self._origin[:, None])
+        index = np.flatnonzero((s[:-1] < 0.0) & (s[1:] >= 0.0))
+        start = 0
+        for i in index:
+            # Find where the segment crosses the section.
+            w = s[i]/(s[i] - s[i + 1])
+            crossing = path[:, i] + w*(path[:, i + 1] - path[:, i])
+            crossing_t = t[i] + w*dt
+            self._extend(path[:, start:i + 2])
+            self._add_crossing(crossing, crossing_t)
+            self._min = np.minimum(crossing, path[:, i + 1])
+            self._max = np.maximum(crossing, path[:, i + 1])
+            start = i + 1
+        self._extend(path[:, start:])
+        self._last = path[:, -1]
+        self._t = t[-1]
+
+    def _extend(self, points: np.ndarray) -> None:
+        """
+        Extend the extent of the trajectory since the last crossing.
+        """
+        if points.shape[1]:
+            self._min = np.minimum(self._min, points.min(axis=1))
+            self._max = np.maximum(self._max, points.max(axis=1))
+
+    def _add_crossing(self, crossing: np.ndarray, crossing_t: float) -> None:
+        """
+        Update the estimates with a new crossing of the section.
+        """
+        self.crossings += 1
+        if self._crossing is not None:
+            period = crossing_t - self._crossing_t
+            amplitude = (self._max - self._min)/2.0
+            scale = max(np.hypot(*amplitude), 1e-300)
+            self.change = np.hypot(*(crossing - self._crossing))/scale
+            period_change = abs(period - self.period)/period
+            if self.change < self.tol and period_change < self.tol:
+                self.converged += 1
+            else:
+                self.converged = 0
+            self.period = period
+            self.amplitude = amplitude
+        self._crossing = crossing
+        self._crossing_t = crossing_t
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Get a summary of the estimates.
+        """
+        return {"crossings": self.crossings,
+                "period": float(self.period),
+                "amplitude_x": float(self.amplitude[0]),
+                "amplitude_y": float(self.amplitude[1]),
+                "change": float(self.change),
+                "confirmed": self.is_confirmed()}
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
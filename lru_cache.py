@@ -0,0 +1,89 @@
+"""
+Bounded cache that evicts the least recently used entries.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    """
+    A cache holding at most maxsize entries. Once it is full, adding
+    a new entry evicts the one that was least recently used.
+
+    Attributes:
+    maxsize [int]: The maximum number of entries.
+    hits [int]: The number of lookups that found an entry.
+    misses [int]: The number of lookups that had to create an entry.
+    """
+
+    # Private Attributes:
+    # _entries [OrderedDict]: entries ordered from least to most recently used
+
+    def __init__(self, maxsize: int = 32) -> None:
+        """
+        The initializer.
+
+        >>> cache = LRUCache(2)
+        >>> cache.get("a", lambda: 1), cache.get("b", lambda: 2)
+        (1, 2)
+        >>> cache.get("a", lambda: 3)
+        1
+        >>> cache.get("c", lambda: 4)
+        4
+        >>> "b" in cache, cache.hits, cache.misses
+        (False, 1, 3)
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Get the entry for key, or create it by calling factory
+        if it is not in the cache.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = factory()
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return value
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def clear(self) -> None:
+        """
+        Remove every entry and reset the counters.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def items(self) -> list:
+        """
+        Get the (key, value) pairs of the entries, from the least
+        to the most recently used, without counting as lookups.
+        """
+        return list(self._entries.items())
+
+    def __contains__(self, key: Hashable) -> bool:
+        """
+        Check if there is an entry for key.
+        """
+        return key in self._entries
+
+    def __len__(self) -> int:
+        """
+        The number of entries.
+        """
+        return len(self._entries)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
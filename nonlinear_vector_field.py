@@ -2,12 +2,24 @@
 General vector field in 2D
 """
 
+import os
+import threading
 import numpy as np
 from vector_field import BaseVectorField2D
-from functions import FunctionR2toR, abc
-from diffsolve2d import forward_euler, rungekutta
+from functions import get_function, get_system, SystemR2toR2
+from diffsolve2d import (forward_euler, rungekutta, dormand_prince,
+                         backward_euler, trapezoidal, rosenbrock)
+from trajectory_buffer import TrajectoryBuffer
+from simulation_worker import SimulationWorker
+from simulation_clock import SimulationClock
+from fixed_points import FixedPoint, find_fixed_points
+from step_kernels import EULER, RK4, get_step_kernel, run_kernel
+from limit_cycle import LimitCycleAnalyzer
+from basin_map import ATTRACTORS, BasinMap
+from trajectory_log import TrajectoryLog
+from presets import get_function_state, get_system_state
 from typing import Callable, Union, List, Tuple
-from matplotlib.pyplot import Artist
+from matplotlib.artist import Artist
 
 
 class ParticleModel:
@@ -15,9 +27,10 @@ class ParticleModel:
     Particle model class.
     """
 
-    def __init__(self, ax) -> None:
+    def __init__(self, ax, max_length: int = 10000) -> None:
         """
-        Constructor.
+        Constructor. At most max_length of the most recent
+        points of the trajectory are kept.
         """
         self._pointmodel = ax.scatter(0.0, 0.0, s=12.0, color="black")
         self._bounds = list(ax.get_xlim())
@@ -25,11 +38,27 @@ class ParticleModel:
         linemodel, = ax.plot([0.0], [0.0])
         self._linemodel = linemodel
         self._xy = [0.0, 0.0]
-        self._xarr = [0.0]
-        self._yarr = [0.0]
+        self._trajectory = TrajectoryBuffer(max_length)
+        self._trajectory.append(0.0, 0.0)
         self._FORWARD_EULER = 1
         self._RUNGE_KUTTA = 4
+        self._DORMAND_PRINCE = 5
+        self._BACKWARD_EULER = 6
+        self._TRAPEZOIDAL = 7
+        self._ROSENBROCK = 8
         self._method = self._RUNGE_KUTTA
+        # Step size carried over between calls to the adaptive method.
+        self._adaptive_dt = 1e-2
+        # Guards the position and trajectory, which may be
+        # advanced by a background SimulationWorker.
+        self._lock = threading.Lock()
+        # Optionally analyzes the trajectory for closed orbits,
+        # and stops integrating once one is confirmed.
+        self._analyzer = None
+        self._stop_on_cycle = False
+        # Optionally writes every point of the trajectory to disk,
+        # while only the most recent points are kept in memory.
+        self._log = None
 
     def set_method(self, method_name: str) -> None:
         """
@@ -40,6 +69,88 @@ class ParticleModel:
             self._method = self._FORWARD_EULER
         elif method_name == "Runge-Kutta":
             self._method = self._RUNGE_KUTTA
+        elif method_name == "Dormand-Prince":
+            self._method = self._DORMAND_PRINCE
+        elif method_name == "Backward Euler":
+            self._method = self._BACKWARD_EULER
+        elif method_name == "Trapezoidal":
+            self._method = self._TRAPEZOIDAL
+        elif method_name == "Rosenbrock":
+            self._method = self._ROSENBROCK
+
+    def get_method(self) -> str:
+        """
+        Get the name of the method used to numerically solve the ODE.
+        """
+        names = {self._FORWARD_EULER: "Forward Euler",
+                 self._RUNGE_KUTTA: "Runge-Kutta",
+                 self._DORMAND_PRINCE: "Dormand-Prince",
+                 self._BACKWARD_EULER: "Backward Euler",
+                 self._TRAPEZOIDAL: "Trapezoidal",
+                 self._ROSENBROCK: "Rosenbrock"}
+        return names[self._method]
+
+    def get_kernel_method(self) -> str:
+        """
+        Get the method of the generated step kernels that matches the
+        method used, or None if there isn't one.
+        """
+        if self._method is self._FORWARD_EULER:
+            return EULER
+        elif self._method is self._RUNGE_KUTTA:
+            return RK4
+        return None
+
+    def set_analyzer(self, analyzer: LimitCycleAnalyzer,
+                     stop_on_cycle: bool = False) -> None:
+        """
+        Set the analyzer that the trajectory is passed through as it is
+        integrated, or None for no analyzer. If stop_on_cycle is True, the
+        particle stops once the analyzer confirms a closed orbit.
+        """
+        with self._lock:
+            self._analyzer = analyzer
+            self._stop_on_cycle = stop_on_cycle
+            if analyzer is not None:
+                analyzer.reset(*self._xy)
+
+    def get_analyzer(self) -> LimitCycleAnalyzer:
+        """
+        Getter for the analyzer.
+        """
+        return self._analyzer
+
+    def set_log(self, log: TrajectoryLog) -> None:
+        """
+        Set the log that every point of the trajectory is written to
+        from the current position on, or None to stop writing points.
+        """
+        with self._lock:
+            self._log = log
+            if log is not None:
+                log.break_line()
+                log.append(*self._xy)
+
+    def get_log(self) -> TrajectoryLog:
+        """
+        Getter for the log.
+        """
+        return self._log
+
+    def is_finished(self) -> bool:
+        """
+        Check if the particle has stopped, because it is on
+        a closed orbit that has already been found.
+        """
+        return (self._stop_on_cycle and self._analyzer is not None
+                and self._analyzer.is_confirmed())
+
+    def is_implicit(self) -> bool:
+        """
+        Check if the method used needs the Jacobian.
+        """
+        return self._method in (self._BACKWARD_EULER, self._TRAPEZOIDAL,
+                                self._ROSENBROCK)
 
     def set_bounds(self, bounds: Tuple[Union[int, float]]) -> None:
         """
@@ -58,23 +169,104 @@ class ParticleModel:
         Update the appearance
         """
         self._pointmodel.set_offsets([self._xy])
-        self._linemodel.set_xdata(self._xarr)
-        self._linemodel.set_ydata(self._yarr)
+        self._linemodel.set_data(self._trajectory.x, self._trajectory.y)
 
     def set_initial_position(self, x: float, y: float) -> None:
         """
         Set the initial position
         """
-        self._xarr = [x]
-        self._yarr = [y]
-        self._xy = [x, y]
-        self._update_appearance()
+        with self._lock:
+            self._trajectory.clear()
+            self._trajectory.append(x, y)
+            self._xy = [x, y]
+            if self._analyzer is not None:
+                self._analyzer.reset(x, y)
+            if self._log is not None:
+                self._log.break_line()
+                self._log.append(x, y)
+            self._update_appearance()
 
-    def update(self, f: Callable, delta_t: float) -> None:
+    def get_trajectory(self) -> np.ndarray:
         """
-        Update the position, given an integration function and
-        a time interval.
+        Get a (2, N) array of the points of the trajectory that are
+        kept, where the last one is the current position.
         """
+        with self._lock:
+            return np.array([self._trajectory.x, self._trajectory.y])
+
+    def set_trajectory(self, xy: np.ndarray) -> None:
+        """
+        Set the points of the trajectory from a (2, N) array, where
+        the particle continues from the last one.
+        """
+        if xy.shape[1] == 0:
+            return
+        with self._lock:
+            self._trajectory.clear()
+            self._trajectory.extend(xy[0], xy[1])
+            self._xy = [float(xy[0, -1]), float(xy[1, -1])]
+            if self._analyzer is not None:
+                self._analyzer.reset(*self._xy)
+            self._update_appearance()
+
+    def update(self, f: Callable, delta_t: float,
+               jac: Callable = None) -> None:
+        """
+        Update the position and appearance, given an integration
+        function and a time interval. The implicit methods also
+        need the Jacobian of the integration function.
+        """
+        with self._lock:
+            self._advance(f, delta_t, jac)
+            self._update_appearance()
+
+    def advance(self, f: Callable, delta_t: float,
+                jac: Callable = None) -> None:
+        """
+        Update the position without updating the appearance,
+        given an integration function and a time interval.
+        """
+        with self._lock:
+            self._advance(f, delta_t, jac)
+
+    def advance_with_kernel(self, kernel: Callable, delta_t: float,
+                            steps: int, params: List[float]) -> bool:
+        """
+        Do several steps at once with a generated step kernel, without
+        updating the appearance. Return False and leave the position
+        unchanged if the kernel couldn't do these steps.
+        """
+        with self._lock:
+            if self.is_finished():
+                return True
+            result = run_kernel(kernel, self._xy[0], self._xy[1],
+                                delta_t/2, steps, params)
+            if result is None:
+                return False
+            xs, ys = result
+            if xs:
+                self._trajectory.extend(xs, ys)
+                self._xy = [xs[-1], ys[-1]]
+                if self._log is not None:
+                    self._log.extend(xs, ys)
+                if self._analyzer is not None:
+                    self._analyzer.add_points(xs, ys, delta_t/2)
+        return True
+
+    def refresh(self) -> None:
+        """
+        Update the appearance with the latest position.
+        """
+        with self._lock:
+            self._update_appearance()
+
+    def _advance(self, f: Callable, delta_t: float,
+                 jac: Callable = None) -> None:
+        """
+        Helper function for update and advance.
+        """
+        if self.is_finished():
+            return
         # x_prev, y_prev = self._xy
         if self._method is self._RUNGE_KUTTA:
             self._xy = rungekutta(
@@ -82,6 +274,18 @@ class ParticleModel:
         elif self._method is self._FORWARD_EULER:
             self._xy = forward_euler(
                 f, 0.0, self._xy, delta_t/2)
+        elif self._method is self._DORMAND_PRINCE:
+            self._xy, self._adaptive_dt = dormand_prince(
+                f, 0.0, self._xy, delta_t/2, self._adaptive_dt)
+        elif self._method is self._BACKWARD_EULER:
+            self._xy = backward_euler(
+                f, jac, 0.0, self._xy, delta_t/2)
+        elif self._method is self._TRAPEZOIDAL:
+            self._xy = trapezoidal(
+                f, jac, 0.0, self._xy, delta_t/2)
+        elif self._method is self._ROSENBROCK:
+            self._xy = rosenbrock(
+                f, jac, 0.0, self._xy, delta_t/2)
         # TODO: This is to stop adding points to be line plotted
         # if the particle moves too far away from the centre of the plot.
         # Think of a better strategy.
@@ -91,58 +295,158 @@ class ParticleModel:
         #     or self._xy[1] > 2*self._bounds[3]):
             # if not (((self._xy[0] - x_prev)**2 +
             #         (self._xy[1] - y_prev)**2) < 1e-10):
-        self._xarr.append(self._xy[0])
-        self._yarr.append(self._xy[1])
-        self._update_appearance()
+        self._trajectory.append(self._xy[0], self._xy[1])
+        if self._log is not None:
+            self._log.append(self._xy[0], self._xy[1])
+        if self._analyzer is not None:
+            self._analyzer.add_points([self._xy[0]], [self._xy[1]],
+                                      delta_t/2)
 
     def remove_line(self) -> None:
         """
         Remove a line.
         """
-        self._xarr = []
-        self._yarr = []
-        self._update_appearance()
+        with self._lock:
+            self._trajectory.clear()
+            # The orbit from here on is a different one.
+            if self._analyzer is not None:
+                self._analyzer.reset(*self._xy)
+            self._update_appearance()
 
 
 class NonLinearVectorField2D(BaseVectorField2D):
     """
     Nonlinear vector field in 2d class.
+
+    Attributes:
+    basin_image [AxesImage]: The image of the basin map, which is shown
+                             under the quiver plot, or None.
     """
-    def __init__(self) -> None:
+
+    # Private Attributes:
+    # _expressions [List[str]]: the expressions of f and g
+    # _basin_map [BasinMap]: the basin map being shown, or None
+    # _basin_mode [str]: how the basin map is coloured
+    # _basin_key [tuple]: the field key the basin map was computed for
+    # _basin_stride [int]: the stride of the basin map that is shown
+    # _kernel_sources [dict]: sources of the step kernels of the system
+    #                         by method, if it is a preset with kernels
+    #                         generated in preset_kernels.py
+
+    def __init__(self, state: dict = None) -> None:
         """
-        Initializer.
+        Initializer. If a state from get_state is given, the session
+        is restored from it.
         """
-        self._vx = FunctionR2toR("a*x - b*y + k1")
-        self._vy = FunctionR2toR("c*x + d*y + k2")
-        vx_params = self._vx.get_default_values()
-        vy_params = self._vy.get_default_values()
-        self.vxparams = [vx_params[s] for s in self._vx.get_default_values()]
-        self.vyparams = [vy_params[s] for s in self._vy.get_default_values()]
-        BaseVectorField2D.__init__(self, [-10.0, 10.0, -10.0, 10.0])
+        self._kernel_sources = {}
+        # Held while changing the functions or parameters, and by the
+        # background worker while it integrates.
+        self.field_lock = threading.RLock()
+        if state is None:
+            self._set_functions("a*x - b*y + k1", "c*x + d*y + k2")
+        else:
+            self._set_functions(state["f"], state["g"], state["parameters"])
+        self._worker = None
+        # Turns the time between frames into fixed integration steps.
+        self.clock = SimulationClock()
+        self.cycle_text = None
+        self.basin_image = None
+        self._basin_map = None
+        self._basin_mode = ATTRACTORS
+        self._basin_key = None
+        self._basin_stride = 0
+        BaseVectorField2D.__init__(
+            self, [-10.0, 10.0, -10.0, 10.0] if state is None
+            else state["bounds"])
         self.particle = ParticleModel(self.figure.get_axes()[0])
         self.add_plots(self.particle.get_plots())
+        if state is not None:
+            self.set_state(state)
+
+    def _set_functions(self, f: str, g: str,
+                       parameters: dict = None) -> None:
+        """
+        Set both expressions, where the parameters not given by name
+        in parameters take their default values. The expressions of the
+        presets are compiled from their generated states.
+        """
+        with self.field_lock:
+            self._expressions = [f, g]
+            self._vx = get_function(f, state=get_function_state(f))
+            self._vy = get_function(g, state=get_function_state(g))
+            self._system = None
+            vx_params = self._vx.get_default_values()
+            vy_params = self._vy.get_default_values()
+            self.vxparams = [vx_params[s] for s in self._vx.parameters]
+            self.vyparams = [vy_params[s] for s in self._vy.parameters]
+            for symbol, value in (parameters or {}).items():
+                self.set_parameter(symbol, float(value))
 
     def set_vx(self, args_vx: str) -> None:
         """
         Set vx.
         """
-        self._vx = FunctionR2toR(args_vx)
-        vx_params = self._vx.get_default_values()
-        self.vxparams = [vx_params[s] for s in self._vx.get_default_values()]
+        with self.field_lock:
+            self._vx = get_function(args_vx,
+                                    state=get_function_state(args_vx))
+            self._expressions[0] = args_vx
+            self._system = None
+            vx_params = self._vx.get_default_values()
+            self.vxparams = [vx_params[s]
+                             for s in self._vx.get_default_values()]
+        # The trajectory so far, and any closed orbit found in it,
+        # belong to the old system.
+        self.particle.remove_line()
 
     def set_vy(self, args_vy: str) -> None:
         """
         Set vy.
         """
-        self._vy = FunctionR2toR(args_vy)
-        vy_params = self._vy.get_default_values()
-        self.vyparams = [vy_params[s] for s in self._vy.get_default_values()]
+        with self.field_lock:
+            self._vy = get_function(args_vy,
+                                    state=get_function_state(args_vy))
+            self._expressions[1] = args_vy
+            self._system = None
+            vy_params = self._vy.get_default_values()
+            self.vyparams = [vy_params[s]
+                             for s in self._vy.get_default_values()]
+        self.particle.remove_line()
+
+    def get_parameter(self, symbol) -> float:
+        """
+        Get the value of a parameter, or None if neither
+        f nor g uses it.
+        """
+        if symbol in self._vx.parameter_index:
+            return self.vxparams[self._vx.parameter_index[symbol]]
+        if symbol in self._vy.parameter_index:
+            return self.vyparams[self._vy.parameter_index[symbol]]
+        return None
+
+    def set_parameter(self, symbol, value: float) -> None:
+        """
+        Set the value of a parameter in whichever of
+        f and g uses it.
+        """
+        with self.field_lock:
+            if symbol in self._vx.parameter_index:
+                self.vxparams[self._vx.parameter_index[symbol]] = value
+            if symbol in self._vy.parameter_index:
+                self.vyparams[self._vy.parameter_index[symbol]] = value
+
+    def field_key(self) -> tuple:
+        """
+        Get a key that identifies the vector field along with its
+        parameters. The compiled functions are cached, so the same
+        expressions give the same function objects.
+        """
+        return (self._vx, self._vy,
+                tuple(self.vxparams), tuple(self.vyparams))
 
     def set_bounds(self, bounds):
         """
         Set the axes.
         """
-        self.toggle_blit()
         # ax = self.figure.get_axes[0]
         self.bounds = bounds
         self.set_coords(*bounds)
@@ -150,15 +454,9 @@ class NonLinearVectorField2D(BaseVectorField2D):
         ax = self.figure.get_axes()[0]
         ax.set_xlim([self.bounds[0], self.bounds[1]])
         ax.set_ylim([self.bounds[2], self.bounds[3]])
-        xdot, ydot = self.f(self.xy)
-        print(self._plots)
-        self.line.set_alpha(0.0)
-        # self.line.set_visible(False)
-        # self.line.remove()
-        self.line = ax.quiver(self.xy[0], self.xy[1],
-                              xdot, ydot, color="black")
-        self.line.set_UVC(xdot, ydot)
-        self.set_plot(2, self.line)
+        self.particle.set_bounds(bounds)
+        # The basin map only covers the bounds it was computed for.
+        self.clear_basin_map()
         # self.text = text(self.bounds[0] + 1, self.bounds[3] - 1,
         #                  "", color="black")
         # self.text.set_bbox({"facecolor": "white", "alpha": 1.0})
@@ -168,35 +466,57 @@ class NonLinearVectorField2D(BaseVectorField2D):
         #                   "", color="black")
         # self.set_plot(-1, self.title)
         # self.title.set_bbox({"facecolor": "white", "alpha": 1.0})
-        self.toggle_blit()
-        self.plot_vector_field()
+        # The quiver plot is reused, and only the parts of the
+        # field that haven't been seen yet are evaluated.
+        self.plot_vector_field(change_title=False)
+
+    def get_system(self) -> SystemR2toR2:
+        """
+        Get the compiled system of both components.
+        """
+        system = self._system
+        if system is None:
+            # Compile both components together the first time
+            # they are needed after either of them is set.
+            preset = get_system_state(*self._expressions) or {}
+            system = self._system = get_system(self._vx, self._vy,
+                                               preset.get("system"))
+            self._kernel_sources = preset.get("kernels", {})
+        return system
 
     def f(self, xy: np.ndarray,
           *t: float) -> Union[list, np.ndarray]:
         """
         Function that dictates the mapping of the vector field.
         """
-        vx = None
-        vy = None
-        # print(self._vx.domain_variables)
-        if len(self._vx.domain_variables) == 2:
-            vx = self._vx(xy[0], xy[1], *self.vxparams)
-        elif len(self._vx.domain_variables) == 1:
-            if self._vx.domain_variables[0] == abc.x:
-                vx = self._vx(xy[0], *self.vxparams)
-            elif self._vx.domain_variables[0] == abc.y:
-                vx = self._vx(xy[1], *self.vxparams)
-
-        if len(self._vy.domain_variables) == 2:
-            vy = self._vy(xy[0], xy[1], *self.vyparams)
-        elif len(self._vy.domain_variables) == 1:
-            if self._vy.domain_variables[0] == abc.x:
-                vy = self._vy(xy[0], *self.vyparams)
-            elif self._vy.domain_variables[0] == abc.y:
-                vy = self._vy(xy[1], *self.vyparams)
-
+        system = self.get_system()
+        vx, vy = system(xy[0], xy[1], self.vxparams, self.vyparams)
         return [vx, vy] if isinstance(xy, list) else np.array([vx, vy])
 
+    def jac(self, xy: np.ndarray, *t: float) -> tuple:
+        """
+        The entries (df/dx, df/dy, dg/dx, dg/dy) of the Jacobian
+        of the mapping of the vector field.
+        """
+        return self.get_system().jacobian(xy[0], xy[1],
+                                          self.vxparams, self.vyparams)
+
+    def find_fixed_points(self, xdot: np.ndarray,
+                          ydot: np.ndarray) -> List[FixedPoint]:
+        """
+        Find the fixed points within the bounds, starting Newton's method
+        from where the nullclines cross between the points of the
+        quiver plot.
+        """
+        system = self.get_system()
+        vxparams, vyparams = list(self.vxparams), list(self.vyparams)
+        x, y = self.xy
+        return find_fixed_points(
+            lambda x, y: system(x, y, vxparams, vyparams),
+            lambda x, y: system.jacobian(x, y, vxparams, vyparams),
+            x, y, np.broadcast_to(xdot, x.shape),
+            np.broadcast_to(ydot, x.shape), self.bounds)
+
     def set_values(self) -> None:
         """
         Set values.
@@ -207,14 +527,244 @@ class NonLinearVectorField2D(BaseVectorField2D):
         """
         Set interative line.
         """
+        self.clock.reset()
         self.particle.set_initial_position(x, y)
 
     def update(self, delta_t: float) -> None:
         """
         Update the vector field at each time step.
         """
-        for _ in range(self.simulation_speed):
-            self.particle.update(self.f, delta_t)
+        if self.is_simulating_in_background():
+            # Only show what the worker has integrated so far.
+            self.particle.refresh()
+            self._update_cycle_text()
+            self._update_basin_map()
+            return
+        self.simulate(delta_t)
+        self.particle.refresh()
+        self._update_cycle_text()
+        self._update_basin_map()
+
+    def simulate(self, delta_t: float) -> int:
+        """
+        Integrate the particle for the steps of the simulation clock
+        that fit into delta_t seconds, sped up by the simulation speed.
+        Return the number of steps taken.
+        """
+        steps = self.clock.tick(delta_t, self.simulation_speed)
+        if self.particle.is_finished():
+            # The orbit is already known, so stop integrating it.
+            steps = 0
+        if steps and not self._advance_with_kernel(steps):
+            for _ in range(steps):
+                self.particle.advance(self.f, self.clock.dt, self.jac)
+        self.count_steps(steps)
+        return steps
+
+    def _advance_with_kernel(self, steps: int) -> bool:
+        """
+        Do the steps of the simulation with a generated step kernel,
+        if there is one for the method used. Return whether this worked.
+        """
+        method = self.particle.get_kernel_method()
+        if method is None:
+            return False
+        with self.field_lock:
+            system = self.get_system()
+            kernel = get_step_kernel(system, method,
+                                     self._kernel_sources.get(method))
+            if kernel is None:
+                return False
+            params = system.order_parameters(self.vxparams, self.vyparams)
+        return self.particle.advance_with_kernel(kernel, self.clock.dt,
+                                                 steps, params)
+
+    def set_cycle_detection(self, detect: bool) -> None:
+        """
+        Set whether the trajectory is analyzed for closed orbits, where
+        the particle stops once one is found, and its period and
+        amplitude are shown.
+        """
+        if detect and self.cycle_text is None:
+            ax = self.figure.get_axes()[0]
+            self.cycle_text = ax.text(
+                0.02, 0.02, "", transform=ax.transAxes, fontsize=6,
+                bbox={"facecolor": "white", "alpha": 0.8})
+            self.add_plot(self.cycle_text)
+            self.particle.set_analyzer(LimitCycleAnalyzer(),
+                                       stop_on_cycle=True)
+        elif not detect and self.cycle_text is not None:
+            self.particle.set_analyzer(None)
+            self.remove_plot(self.cycle_text)
+            self.cycle_text = None
+
+    def _update_cycle_text(self) -> None:
+        """
+        Show the period and amplitude of the orbit found so far.
+        """
+        analyzer = self.particle.get_analyzer()
+        if self.cycle_text is None or analyzer is None:
+            return
+        if analyzer.crossings < 2:
+            self.cycle_text.set_text("Looking for a closed orbit...")
+            return
+        self.cycle_text.set_text(
+            "period %.4g, amplitude %.3g, %.3g%s" % (
+                analyzer.period, *analyzer.amplitude,
+                " (closed orbit)" if analyzer.is_confirmed() else ""))
+
+    def compute_basin_map(self, mode: str = ATTRACTORS) -> None:
+        """
+        Start computing the basin map of every pixel of the plot in the
+        background, coloured by the attractor each one converges to, or
+        by how long it takes to escape if the mode is ESCAPE_TIME. The
+        map is shown under the quiver plot, and gets finer as each level
+        of it is done.
+        """
+        self.clear_basin_map()
+        with self.field_lock:
+            parameters = {str(s): value for s, value in
+                          zip(self._vx.parameters, self.vxparams)}
+            parameters.update({str(s): value for s, value in
+                               zip(self._vy.parameters, self.vyparams)})
+            self._basin_key = self.field_key()
+            f, g = self._expressions
+        ax = self.figure.get_axes()[0]
+        shape = (int(np.clip(ax.bbox.height, 64, 2048)),
+                 int(np.clip(ax.bbox.width, 64, 2048)))
+        self._basin_map = BasinMap(f, g, parameters, list(self.bounds),
+                                   shape, levels=5,
+                                   workers=os.cpu_count() or 1)
+        self._basin_mode = mode
+        self._basin_stride = 0
+        self._basin_map.start()
+
+    def clear_basin_map(self) -> None:
+        """
+        Stop computing the basin map, and hide it.
+        """
+        if self._basin_map is None:
+            return
+        self._basin_map.cancel()
+        self._basin_map = None
+        if self.basin_image is not None:
+            self.basin_image.set_visible(False)
+        self.invalidate_background()
+
+    def _update_basin_map(self) -> None:
+        """
+        Show the levels of the basin map done since the last frame,
+        or clear it if the vector field or its parameters changed.
+        """
+        basin_map = self._basin_map
+        if basin_map is None:
+            return
+        if self.field_key() != self._basin_key:
+            self.clear_basin_map()
+            return
+        if basin_map.stride == self._basin_stride:
+            return
+        self._basin_stride = basin_map.stride
+        image = basin_map.get_image(self._basin_mode)
+        extent = basin_map.bounds
+        if self.basin_image is None:
+            ax = self.figure.get_axes()[0]
+            self.basin_image = ax.imshow(
+                image, extent=extent, origin="lower",
+                interpolation="nearest", zorder=-1)
+            ax.set_xlim(self.bounds[0], self.bounds[1])
+            ax.set_ylim(self.bounds[2], self.bounds[3])
+            self.add_plot(self.basin_image, static=True)
+        else:
+            self.basin_image.set_data(image)
+            self.basin_image.set_extent(extent)
+        self.basin_image.set_visible(True)
+        self.invalidate_background()
+
+    def start_recording(self, path: str) -> None:
+        """
+        Start writing every point of the trajectory to a trajectory
+        log at path, which can be read back with np.load.
+        """
+        self.stop_recording()
+        self.particle.set_log(TrajectoryLog(path))
+
+    def stop_recording(self) -> None:
+        """
+        Stop writing the trajectory, and close its log.
+        """
+        log = self.particle.get_log()
+        if log is not None:
+            self.particle.set_log(None)
+            log.close()
+
+    def is_recording(self) -> bool:
+        """
+        Check if the trajectory is being written to a log.
+        """
+        return self.particle.get_log() is not None
+
+    def get_state(self) -> dict:
+        """
+        Get the state of the session, which is a dict of strings, numbers,
+        lists and dicts, except for the points of the trajectory under
+        "trajectory" and the cached values of the field under "tiles",
+        which are arrays. This holds the expressions, the values of the
+        parameters by name, the bounds and the integrator, but never
+        what the expressions were compiled to, since a state may be
+        loaded from a file that can't be trusted to run.
+        """
+        with self.field_lock:
+            names = dict.fromkeys(self._vx.parameters + self._vy.parameters)
+            return {"f": self._expressions[0], "g": self._expressions[1],
+                    "parameters": {s: float(self.get_parameter(s))
+                                   for s in names},
+                    "bounds": [float(b) for b in self.bounds],
+                    "method": self.particle.get_method(),
+                    "simulation_speed": self.simulation_speed,
+                    "field_mode": self.field_mode,
+                    "field_resolution": self.field_resolution,
+                    "show_nullclines": self.show_nullclines,
+                    "trajectory": self.particle.get_trajectory(),
+                    "tiles": self.field_cache.get_tiles(self.field_key())}
+
+    def set_state(self, state: dict) -> None:
+        """
+        Restore the session from a state from get_state. The vector
+        field is only plotted once, using the cached values in it.
+        Expressions that aren't those of a preset are parsed again.
+        """
+        self.clear_basin_map()
+        with self.field_lock:
+            self._set_functions(state["f"], state["g"], state["parameters"])
+            self.field_cache.add_tiles(self.field_key(), state["tiles"])
+        self.particle.set_method(state["method"])
+        self.particle.set_trajectory(np.asarray(state["trajectory"]))
+        self.clock.reset()
+        self.simulation_speed = state["simulation_speed"]
+        self.field_mode = state["field_mode"]
+        self.field_resolution = state["field_resolution"]
+        self.show_nullclines = state["show_nullclines"]
+        self.set_bounds(state["bounds"])
+        self.set_title()
+
+    def set_background_simulation(self, background: bool) -> None:
+        """
+        Set whether the particle is integrated in a background thread,
+        instead of in each animation frame.
+        """
+        if background and self._worker is None:
+            self._worker = SimulationWorker(self)
+            self._worker.start()
+        elif not background and self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+
+    def is_simulating_in_background(self) -> bool:
+        """
+        Check if the particle is integrated in a background thread.
+        """
+        return self._worker is not None
 
     def plot_trajectories(self, init_call: bool = False) -> None:
         """
@@ -245,9 +795,5 @@ class NonLinearVectorField2D(BaseVectorField2D):
         """
         Set title.
         """
-        if self.is_blit():
-            self.toggle_blit()
-            self._set_title()
-            self.toggle_blit()
-        else:
-            self._set_title()
+        self._set_title()
+        self.invalidate_background()
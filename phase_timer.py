@@ -0,0 +1,69 @@
+"""
+Timing of the phases of starting the app.
+
+This only uses the standard library, so that it can be imported
+before anything else and time the imports too.
+"""
+from time import perf_counter
+from typing import List, Tuple
+
+
+class PhaseTimer:
+    """
+    Records how long each phase of a process takes, where a phase
+    ends each time it is marked.
+
+    Attributes:
+    start [float]: The time the timer was made, from perf_counter.
+    phases [List[Tuple[str, float]]]: The name and end time of each
+                                      phase, in the order marked.
+    """
+
+    def __init__(self) -> None:
+        """
+        The initializer, which starts the first phase.
+
+        >>> timer = PhaseTimer()
+        >>> timer.mark("imports")
+        >>> timer.mark("window")
+        >>> [name for name, _ in timer.durations()]
+        ['imports', 'window']
+        >>> print(timer.report().splitlines()[-1].split()[0])
+        total
+        """
+        self.start = perf_counter()
+        self.phases = []
+
+    def mark(self, name: str) -> None:
+        """
+        End the current phase, giving it a name, and start the next one.
+        """
+        self.phases.append((name, perf_counter()))
+
+    def durations(self) -> List[Tuple[str, float]]:
+        """
+        Get the name and duration in seconds of each phase.
+        """
+        durations, previous = [], self.start
+        for name, t in self.phases:
+            durations.append((name, t - previous))
+            previous = t
+        return durations
+
+    def report(self) -> str:
+        """
+        Get a table of how long each phase took, in milliseconds,
+        along with the total.
+        """
+        durations = self.durations()
+        width = max([len(name) for name, _ in durations] + [5])
+        lines = ["%-*s %9.1f ms" % (width, name, 1e3*t)
+                 for name, t in durations]
+        lines.append("%-*s %9.1f ms" % (width, "total",
+                                        1e3*sum(t for _, t in durations)))
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
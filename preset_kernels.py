@@ -0,0 +1,121 @@
+"""
+What the presets compile to. This file is generated by presets.py,
+so edit the presets there and run it again instead.
+"""
+
+FUNCTION_STATES = {
+    'a * x - b * y + k1': {
+        'expression': 'a*x - b*y + k1',
+        'domain_variables': ['x', 'y'],
+        'parameters': ['a', 'b', 'k1'],
+        'default_values': [1.0, 1.0, 0.0],
+        'latex': 'a x - b y + k_{1}',
+        'source': 'def _lambdifygenerated(x, y, a, b, k1):\n    return a*x - b*y + k1\n',
+        'probe': ['0.25'],
+    },
+    'c * x + d * y + k2': {
+        'expression': 'c*x + d*y + k2',
+        'domain_variables': ['x', 'y'],
+        'parameters': ['c', 'd', 'k2'],
+        'default_values': [1.0, 1.0, 0.0],
+        'latex': 'c x + d y + k_{2}',
+        'source': 'def _lambdifygenerated(x, y, c, d, k2):\n    return c*x + d*y + k2\n',
+        'probe': ['0.75'],
+    },
+    'y': {
+        'expression': 'y',
+        'domain_variables': ['y'],
+        'parameters': [],
+        'default_values': [],
+        'latex': 'y',
+        'source': 'def _lambdifygenerated(y):\n    return y\n',
+        'probe': ['0.5'],
+    },
+    '5 * a * sin ( k * x / 2 )': {
+        'expression': '5*a*sin(k*x/2)',
+        'domain_variables': ['x'],
+        'parameters': ['a', 'k'],
+        'default_values': [1.0, 1.0],
+        'latex': '5 a \\sin{\\left(\\frac{k x}{2} \\right)}',
+        'source': 'def _lambdifygenerated(x, a, k):\n    return 5*a*sin((1/2)*k*x)\n',
+        'probe': ['1.2370197962726146'],
+    },
+    '5 * a * sin ( k * x / 2 ) - b * y': {
+        'expression': '5*a*sin(k*x/2) - b*y',
+        'domain_variables': ['x', 'y'],
+        'parameters': ['a', 'b', 'k'],
+        'default_values': [1.0, 1.0, 1.0],
+        'latex': '5 a \\sin{\\left(\\frac{k x}{2} \\right)} - b y',
+        'source': 'def _lambdifygenerated(x, y, a, b, k):\n    return 5*a*sin((1/2)*k*x) - b*y\n',
+        'probe': ['0.9870197962726146'],
+    },
+    '10 * a * x / 2 - 3 * b * x * y / 2': {
+        'expression': '5*a*x - 3*b*x*y/2',
+        'domain_variables': ['x', 'y'],
+        'parameters': ['a', 'b'],
+        'default_values': [1.0, 1.0],
+        'latex': '5 a x - \\frac{3 b x y}{2}',
+        'source': 'def _lambdifygenerated(x, y, a, b):\n    return 5*a*x - 3/2*b*x*y\n',
+        'probe': ['2.3125'],
+    },
+    '6 * d * x * y / 4 - 10 * e * y / 2': {
+        'expression': '3*d*x*y/2 - 5*e*y',
+        'domain_variables': ['x', 'y'],
+        'parameters': ['d', 'e'],
+        'default_values': [1.0, 1.0],
+        'latex': '\\frac{3 d x y}{2} - 5 e y',
+        'source': 'def _lambdifygenerated(x, y, d, e):\n    return (3/2)*d*x*y - 5*e*y\n',
+        'probe': ['-1.0625'],
+    },
+}
+
+SYSTEM_STATES = {
+    ('a * x - b * y + k1', 'c * x + d * y + k2'): {
+        'system': {
+            'parameters': ['a', 'b', 'k1', 'c', 'd', 'k2'],
+            'source': 'def _lambdifygenerated(x, y, a, b, k1, c, d, k2):\n    return (a*x - b*y + k1, c*x + d*y + k2,)\n',
+            'probe': ['0.25', '0.75'],
+            'jacobian': 'def _lambdifygenerated(x, y, a, b, k1, c, d, k2):\n    return (a, -b, c, d,)\n',
+        },
+        'kernels': {
+            'euler': 'def kernel(x, y, dt, steps, _p0, _p1, _p2, _p3, _p4, _p5):\n    xs, ys = [], []\n    for _ in range(steps):\n        _x, _y = x, y\n        _u = _p0*_x - _p1*_y + _p2\n        _v = _p3*_x + _p4*_y + _p5\n        x, y = x + dt*_u, y + dt*_v\n        xs.append(x)\n        ys.append(y)\n    return xs, ys',
+            'rk4': 'def kernel(x, y, dt, steps, _p0, _p1, _p2, _p3, _p4, _p5):\n    xs, ys = [], []\n    for _ in range(steps):\n        _x, _y = x, y\n        _u = _p0*_x - _p1*_y + _p2\n        _v = _p3*_x + _p4*_y + _p5\n        _u1, _v1 = _u, _v\n        _x, _y = x + 0.5*dt*_u1, y + 0.5*dt*_v1\n        _u = _p0*_x - _p1*_y + _p2\n        _v = _p3*_x + _p4*_y + _p5\n        _u2, _v2 = _u, _v\n        _x, _y = x + 0.5*dt*_u2, y + 0.5*dt*_v2\n        _u = _p0*_x - _p1*_y + _p2\n        _v = _p3*_x + _p4*_y + _p5\n        _u3, _v3 = _u, _v\n        _x, _y = x + dt*_u3, y + dt*_v3\n        _u = _p0*_x - _p1*_y + _p2\n        _v = _p3*_x + _p4*_y + _p5\n        x = x + dt*(_u1 + 2.0*_u2 + 2.0*_u3 + _u)/6.0\n        y = y + dt*(_v1 + 2.0*_v2 + 2.0*_v3 + _v)/6.0\n        xs.append(x)\n        ys.append(y)\n    return xs, ys',
+        },
+    },
+    ('y', '5 * a * sin ( k * x / 2 )'): {
+        'system': {
+            'parameters': ['a', 'k'],
+            'source': 'def _lambdifygenerated(x, y, a, k):\n    return (y, 5*a*sin((1/2)*k*x),)\n',
+            'probe': ['0.25', '1.2370197962726146'],
+            'jacobian': 'def _lambdifygenerated(x, y, a, k):\n    return (0, 1, (5/2)*a*k*cos((1/2)*k*x), 0,)\n',
+        },
+        'kernels': {
+            'euler': 'def kernel(x, y, dt, steps, _p0, _p1):\n    xs, ys = [], []\n    for _ in range(steps):\n        _x, _y = x, y\n        _u = _y\n        _v = 5*_p0*math.sin((1/2)*_p1*_x)\n        x, y = x + dt*_u, y + dt*_v\n        xs.append(x)\n        ys.append(y)\n    return xs, ys',
+            'rk4': 'def kernel(x, y, dt, steps, _p0, _p1):\n    xs, ys = [], []\n    for _ in range(steps):\n        _x, _y = x, y\n        _u = _y\n        _v = 5*_p0*math.sin((1/2)*_p1*_x)\n        _u1, _v1 = _u, _v\n        _x, _y = x + 0.5*dt*_u1, y + 0.5*dt*_v1\n        _u = _y\n        _v = 5*_p0*math.sin((1/2)*_p1*_x)\n        _u2, _v2 = _u, _v\n        _x, _y = x + 0.5*dt*_u2, y + 0.5*dt*_v2\n        _u = _y\n        _v = 5*_p0*math.sin((1/2)*_p1*_x)\n        _u3, _v3 = _u, _v\n        _x, _y = x + dt*_u3, y + dt*_v3\n        _u = _y\n        _v = 5*_p0*math.sin((1/2)*_p1*_x)\n        x = x + dt*(_u1 + 2.0*_u2 + 2.0*_u3 + _u)/6.0\n        y = y + dt*(_v1 + 2.0*_v2 + 2.0*_v3 + _v)/6.0\n        xs.append(x)\n        ys.append(y)\n    return xs, ys',
+        },
+    },
+    ('y', '5 * a * sin ( k * x / 2 ) - b * y'): {
+        'system': {
+            'parameters': ['a', 'b', 'k'],
+            'source': 'def _lambdifygenerated(x, y, a, b, k):\n    return (y, 5*a*sin((1/2)*k*x) - b*y,)\n',
+            'probe': ['0.25', '0.9870197962726146'],
+            'jacobian': 'def _lambdifygenerated(x, y, a, b, k):\n    return (0, 1, (5/2)*a*k*cos((1/2)*k*x), -b,)\n',
+        },
+        'kernels': {
+            'euler': 'def kernel(x, y, dt, steps, _p0, _p1, _p2):\n    xs, ys = [], []\n    for _ in range(steps):\n        _x, _y = x, y\n        _u = _y\n        _v = 5*_p0*math.sin((1/2)*_p2*_x) - _p1*_y\n        x, y = x + dt*_u, y + dt*_v\n        xs.append(x)\n        ys.append(y)\n    return xs, ys',
+            'rk4': 'def kernel(x, y, dt, steps, _p0, _p1, _p2):\n    xs, ys = [], []\n    for _ in range(steps):\n        _x, _y = x, y\n        _u = _y\n        _v = 5*_p0*math.sin((1/2)*_p2*_x) - _p1*_y\n        _u1, _v1 = _u, _v\n        _x, _y = x + 0.5*dt*_u1, y + 0.5*dt*_v1\n        _u = _y\n        _v = 5*_p0*math.sin((1/2)*_p2*_x) - _p1*_y\n        _u2, _v2 = _u, _v\n        _x, _y = x + 0.5*dt*_u2, y + 0.5*dt*_v2\n        _u = _y\n        _v = 5*_p0*math.sin((1/2)*_p2*_x) - _p1*_y\n        _u3, _v3 = _u, _v\n        _x, _y = x + dt*_u3, y + dt*_v3\n        _u = _y\n        _v = 5*_p0*math.sin((1/2)*_p2*_x) - _p1*_y\n        x = x + dt*(_u1 + 2.0*_u2 + 2.0*_u3 + _u)/6.0\n        y = y + dt*(_v1 + 2.0*_v2 + 2.0*_v3 + _v)/6.0\n        xs.append(x)\n        ys.append(y)\n    return xs, ys',
+        },
+    },
+    ('10 * a * x / 2 - 3 * b * x * y / 2', '6 * d * x * y / 4 - 10 * e * y / 2'): {
+        'system': {
+            'parameters': ['a', 'b', 'd', 'e'],
+            'source': 'def _lambdifygenerated(x, y, a, b, d, e):\n    x0 = (3/2)*x*y\n    return (5*a*x - b*x0, d*x0 - 5*e*y,)\n',
+            'probe': ['2.3125', '-1.0625'],
+            'jacobian': 'def _lambdifygenerated(x, y, a, b, d, e):\n    x0 = (3/2)*b\n    x1 = (3/2)*d\n    return (5*a - x0*y, -x*x0, x1*y, -5*e + x*x1,)\n',
+        },
+        'kernels': {
+            'euler': 'def kernel(x, y, dt, steps, _p0, _p1, _p2, _p3):\n    xs, ys = [], []\n    for _ in range(steps):\n        _x, _y = x, y\n        _c0 = (3/2)*_x*_y\n        _u = -_c0*_p1 + 5*_p0*_x\n        _v = _c0*_p2 - 5*_p3*_y\n        x, y = x + dt*_u, y + dt*_v\n        xs.append(x)\n        ys.append(y)\n    return xs, ys',
+            'rk4': 'def kernel(x, y, dt, steps, _p0, _p1, _p2, _p3):\n    xs, ys = [], []\n    for _ in range(steps):\n        _x, _y = x, y\n        _c0 = (3/2)*_x*_y\n        _u = -_c0*_p1 + 5*_p0*_x\n        _v = _c0*_p2 - 5*_p3*_y\n        _u1, _v1 = _u, _v\n        _x, _y = x + 0.5*dt*_u1, y + 0.5*dt*_v1\n        _c0 = (3/2)*_x*_y\n        _u = -_c0*_p1 + 5*_p0*_x\n        _v = _c0*_p2 - 5*_p3*_y\n        _u2, _v2 = _u, _v\n        _x, _y = x + 0.5*dt*_u2, y + 0.5*dt*_v2\n        _c0 = (3/2)*_x*_y\n        _u = -_c0*_p1 + 5*_p0*_x\n        _v = _c0*_p2 - 5*_p3*_y\n        _u3, _v3 = _u, _v\n        _x, _y = x + dt*_u3, y + dt*_v3\n        _c0 = (3/2)*_x*_y\n        _u = -_c0*_p1 + 5*_p0*_x\n        _v = _c0*_p2 - 5*_p3*_y\n        x = x + dt*(_u1 + 2.0*_u2 + 2.0*_u3 + _u)/6.0\n        y = y + dt*(_v1 + 2.0*_v2 + 2.0*_v3 + _v)/6.0\n        xs.append(x)\n        ys.append(y)\n    return xs, ys',
+        },
+    },
+}
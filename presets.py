@@ -0,0 +1,120 @@
+"""
+Preset vector fields, given as the expressions for f(x, y) and g(x, y).
+
+What the presets compile to is generated ahead of time into
+preset_kernels.py, so that they can be shown without importing sympy.
+After changing the presets, generate it again with:
+
+    python presets.py
+"""
+import os
+from typing import Dict, Iterator, Tuple
+
+
+PRESETS = {
+    "Linear": ["a*x - b*y + k1", "c*x + d*y + k2"],
+    "Pendulum 1": ["y", "5*a*sin(k*x/2)"],
+    "Pendulum 2": ["y", "5*a*sin(k*x/2)-b*y"],
+    # "Rescaled Lotka–Volterra": ["a*(x+10)/2 - b*(x+10)*(y+10)/2",
+    #                    "d*(x+10)*(y+10)/4 - e*(y+10)/2"]
+    "Lotka–Volterra": ["10*a*x/2 - 3*b*x*y/2",
+                       "6*d*x*y/4 - 10*e*y/2"]
+    }
+
+
+def get_function_state(expression: str) -> dict:
+    """
+    Get the generated state of the function of an expression
+    used by a preset, or None if there isn't one.
+    """
+    from functions import normalize_expression
+    try:
+        from preset_kernels import FUNCTION_STATES
+    except ImportError:
+        return None
+    return FUNCTION_STATES.get(normalize_expression(expression))
+
+
+def get_system_state(f: str, g: str) -> dict:
+    """
+    Get the generated state of the system of a preset along with the
+    sources of its step kernels by method, as a dict with the keys
+    "system" and "kernels", or None if there isn't one.
+    """
+    from functions import normalize_expression
+    try:
+        from preset_kernels import SYSTEM_STATES
+    except ImportError:
+        return None
+    return SYSTEM_STATES.get((normalize_expression(f),
+                              normalize_expression(g)))
+
+
+def make_preset_states() -> Iterator[Tuple[str, dict]]:
+    """
+    Compile the presets, and generate the name and value of each
+    dict of states in preset_kernels.py.
+    """
+    from functions import get_function, get_system, normalize_expression
+    from step_kernels import EULER, RK4, kernel_source
+    function_states, system_states = {}, {}
+    for f, g in PRESETS.values():
+        vx, vy = get_function(f), get_function(g)
+        system = get_system(vx, vy)
+        # Make the Jacobian, so that it is part of the state.
+        system.jacobian(0.0, 0.0, [1.0]*len(vx.parameters),
+                        [1.0]*len(vy.parameters))
+        kernels = {}
+        for method in (EULER, RK4):
+            try:
+                kernels[method] = kernel_source(system, method)
+            except (NotImplementedError, TypeError, ValueError):
+                pass
+        function_states[normalize_expression(f)] = vx.get_state()
+        function_states[normalize_expression(g)] = vy.get_state()
+        system_states[(normalize_expression(f), normalize_expression(g))] = {
+            "system": system.get_state(), "kernels": kernels}
+    yield "FUNCTION_STATES", function_states
+    yield "SYSTEM_STATES", system_states
+
+
+def format_value(value, indent: int = 0) -> str:
+    """
+    Format a value as Python source, with an item of a dict on each
+    line, and anything else written with repr, so that strings such as
+    sources stay one literal each.
+
+    >>> print(format_value({"a": {"b": [1, 2]}, "c": "x + y"}))
+    {
+        'a': {
+            'b': [1, 2],
+        },
+        'c': 'x + y',
+    }
+    """
+    if not isinstance(value, dict):
+        return repr(value)
+    if not value:
+        return "{}"
+    inner = " "*(indent + 4)
+    items = ["%s%r: %s,\n" % (inner, key, format_value(item, indent + 4))
+             for key, item in value.items()]
+    return "{\n%s%s}" % ("".join(items), " "*indent)
+
+
+def write_preset_kernels(path: str) -> None:
+    """
+    Write the module with the states of the presets.
+    """
+    states: Dict[str, dict] = dict(make_preset_states())
+    with open(path, "w", encoding="utf-8") as file:
+        file.write('"""\nWhat the presets compile to. This file is '
+                   'generated by presets.py,\nso edit the presets '
+                   'there and run it again instead.\n"""\n')
+        for name, value in states.items():
+            file.write("\n%s = %s\n" % (name, format_value(value)))
+
+
+if __name__ == "__main__":
+    write_preset_kernels(os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), "preset_kernels.py"))
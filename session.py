@@ -0,0 +1,80 @@
+"""
+Snapshots of a session, so that the app can be started again from
+where it was left.
+
+A snapshot is a .npz file with the state of the session as JSON, and
+each array of the state, such as the trajectory and the cached values
+of the vector field, stored as an array of its own. It only holds data,
+such as the expressions and the values of the parameters, and never
+code, so loading a snapshot doesn't run anything from it. The
+expressions are compiled again when it is restored, which doesn't need
+sympy for the expressions of the presets.
+"""
+import json
+import numpy as np
+
+
+# Snapshots of version 1 held compiled source code, and aren't loaded.
+SESSION_VERSION = 2
+
+
+def _split_arrays(state: dict, prefix: str = "") -> tuple:
+    """
+    Split a state into a copy of it without the arrays in it or in the
+    dicts in it, and a dict of the arrays by their keys joined with "/".
+
+    >>> _split_arrays({"a": np.zeros(2), "b": {"c": np.ones(1)}, "d": 1})
+    ({'b': {}, 'd': 1}, {'a': array([0., 0.]), 'b/c': array([1.])})
+    """
+    rest, arrays = {}, {}
+    for key, value in state.items():
+        if isinstance(value, np.ndarray):
+            arrays[prefix + key] = value
+        elif isinstance(value, dict):
+            rest[key], inner = _split_arrays(value, prefix + key + "/")
+            arrays.update(inner)
+        else:
+            rest[key] = value
+    return rest, arrays
+
+
+def save_session(path: str, state: dict) -> None:
+    """
+    Save the state of a session to a .npz file.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "session.npz")
+    >>> save_session(path, {"f": "y", "tiles": {"u": np.ones((1, 2))}})
+    >>> load_session(path)
+    {'f': 'y', 'tiles': {'u': array([[1., 1.]])}}
+    """
+    state, arrays = _split_arrays(state)
+    np.savez_compressed(path, version=SESSION_VERSION,
+                        state=json.dumps(state),
+                        **{"array/" + key: value
+                           for key, value in arrays.items()})
+
+
+def load_session(path: str) -> dict:
+    """
+    Load the state of a session from a .npz file.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        if int(data["version"]) != SESSION_VERSION:
+            raise ValueError("Unsupported session version %d"
+                             % int(data["version"]))
+        state = json.loads(str(data["state"]))
+        for name in data.files:
+            if not name.startswith("array/"):
+                continue
+            keys = name.split("/")[1:]
+            entry = state
+            for key in keys[:-1]:
+                entry = entry.setdefault(key, {})
+            entry[keys[-1]] = data[name]
+    return state
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
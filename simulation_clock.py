@@ -0,0 +1,93 @@
+"""
+Fixed timestep clock for the simulation.
+"""
+
+
+class SimulationClock:
+    """
+    Converts elapsed wall-clock time into a whole number of fixed size
+    integration steps. Time that is left over from a frame is carried
+    over to the next one, and the number of steps per frame is capped,
+    so that the amount of work per frame stays bounded and the same
+    steps are taken no matter how fast the machine is.
+
+    When a frame would need more than max_substeps steps, the policy
+    decides what happens to the time that is left over:
+    CATCH_UP keeps it to be made up over the next frames, up to a
+    backlog of max_backlog steps, while DROP throws it away.
+
+    Attributes:
+    dt [float]: The size of each step.
+    max_substeps [int]: The maximum number of steps per frame.
+    policy [str]: Either CATCH_UP or DROP.
+    max_backlog [int]: The most steps kept to catch up on.
+    steps [int]: The total number of steps taken.
+    """
+
+    CATCH_UP = "catch up"
+    DROP = "drop"
+
+    def __init__(self, dt: float = 1.0/60.0, max_substeps: int = 40,
+                 policy: str = "drop", max_backlog: int = 200) -> None:
+        """
+        The initializer.
+
+        >>> clock = SimulationClock(dt=0.1, max_substeps=3)
+        >>> clock.tick(0.25), clock.tick(0.05)
+        (2, 1)
+        >>> clock.tick(1.0)
+        3
+        >>> clock.tick(0.0)
+        0
+        >>> clock.set_policy(SimulationClock.CATCH_UP)
+        >>> clock.tick(0.5), clock.tick(0.0), clock.tick(0.0)
+        (3, 2, 0)
+        """
+        if policy not in (self.CATCH_UP, self.DROP):
+            raise ValueError("Unknown policy %s" % policy)
+        self.dt = dt
+        self.max_substeps = max_substeps
+        self.policy = policy
+        self.max_backlog = max_backlog
+        self.steps = 0
+        self._accumulator = 0.0
+
+    def set_policy(self, policy: str) -> None:
+        """
+        Setter for the policy.
+        """
+        if policy not in (self.CATCH_UP, self.DROP):
+            raise ValueError("Unknown policy %s" % policy)
+        self.policy = policy
+
+    def reset(self) -> None:
+        """
+        Throw away any time carried over.
+        """
+        self._accumulator = 0.0
+
+    def tick(self, elapsed: float, speed: float = 1.0) -> int:
+        """
+        Add elapsed seconds, sped up by speed, and get the
+        number of steps to take.
+        """
+        self._accumulator += elapsed*speed
+        # Allow for rounding error when the time is a multiple of dt.
+        steps = int(self._accumulator/self.dt + 1e-9)
+        if steps > self.max_substeps:
+            if self.policy == self.DROP:
+                self._accumulator -= steps*self.dt
+            else:
+                backlog = min(steps, self.max_backlog) - self.max_substeps
+                self._accumulator -= steps*self.dt - backlog*self.dt
+            steps = self.max_substeps
+        else:
+            self._accumulator -= steps*self.dt
+        self._accumulator = max(self._accumulator, 0.0)
+        self.steps += steps
+        return steps
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,71 @@
+"""
+Integrate a vector field in a background thread.
+"""
+import threading
+from time import perf_counter
+
+
+class SimulationWorker:
+    """
+    Integrates the particle of a vector field in a background thread,
+    so that the rate of integration does not depend on how fast the
+    plot can be redrawn. At each tick the worker takes the integration
+    steps of the simulation clock of the field for the time since the
+    last tick, and the particle stores the new points in its trajectory.
+    The animation then only has to show whatever points are ready
+    at each frame.
+
+    Attributes:
+    rate [float]: The number of ticks per second.
+    """
+
+    # Private Attributes:
+    # _field [NonLinearVectorField2D]: the vector field that is integrated
+    # _stop_event [threading.Event]: set to stop the thread
+    # _thread [threading.Thread]: the background thread
+
+    def __init__(self, field, rate: float = 60.0) -> None:
+        """
+        The initializer.
+        """
+        self.rate = rate
+        self._field = field
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Start integrating in the background.
+        """
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop integrating and wait for the thread to finish.
+        """
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self) -> bool:
+        """
+        Check if the worker is integrating.
+        """
+        return self._thread is not None
+
+    def _run(self) -> None:
+        """
+        The loop run by the background thread.
+        """
+        field = self._field
+        t = perf_counter()
+        while not self._stop_event.wait(1.0/self.rate):
+            t2 = perf_counter()
+            delta_t = t2 - t
+            t = t2
+            with field.field_lock:
+                field.simulate(delta_t)
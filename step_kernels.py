@@ -0,0 +1,164 @@
+"""
+Generated functions that do many integration steps of a single particle
+in one call.
+
+Stepping one particle through SystemR2toR2 and the methods of diffsolve2d
+goes through numpy for a pair of floats, so most of the time is spent
+on calls and array creation instead of arithmetic. A kernel instead
+inlines the expressions of both components into Python source, which
+uses the math module on floats, with one block for each stage of the
+method. It is generated once for each system and method, and takes the
+parameter values as arguments, so it is reused when these change. Only
+generating the source needs sympy, so kernels made from a known source
+don't import it.
+"""
+import math
+from lru_cache import LRUCache
+from functions import SystemR2toR2
+from typing import Callable, List
+
+
+EULER = "euler"
+RK4 = "rk4"
+
+# Statements for each method, which update x and y by one step of dt.
+# STAGE stands for evaluating the system at _x, _y into _u, _v.
+_METHOD_STATEMENTS = {
+    EULER: ["_x, _y = x, y",
+            "STAGE",
+            "x, y = x + dt*_u, y + dt*_v"],
+    RK4: ["_x, _y = x, y",
+          "STAGE",
+          "_u1, _v1 = _u, _v",
+          "_x, _y = x + 0.5*dt*_u1, y + 0.5*dt*_v1",
+          "STAGE",
+          "_u2, _v2 = _u, _v",
+          "_x, _y = x + 0.5*dt*_u2, y + 0.5*dt*_v2",
+          "STAGE",
+          "_u3, _v3 = _u, _v",
+          "_x, _y = x + dt*_u3, y + dt*_v3",
+          "STAGE",
+          "x = x + dt*(_u1 + 2.0*_u2 + 2.0*_u3 + _u)/6.0",
+          "y = y + dt*(_v1 + 2.0*_v2 + 2.0*_v3 + _v)/6.0"]}
+
+
+def kernel_source(system: SystemR2toR2, method: str) -> str:
+    """
+    Get the source of the kernel of a system for the given method.
+
+    >>> from functions import FunctionR2toR
+    >>> v = SystemR2toR2(FunctionR2toR("y"), FunctionR2toR("-sin(x)"))
+    >>> print(kernel_source(v, EULER))
+    def kernel(x, y, dt, steps):
+        xs, ys = [], []
+        for _ in range(steps):
+            _x, _y = x, y
+            _u = _y
+            _v = -math.sin(_x)
+            x, y = x + dt*_u, y + dt*_v
+            xs.append(x)
+            ys.append(y)
+        return xs, ys
+    """
+    from sympy import Symbol, cse, numbered_symbols
+    from sympy.printing.pycode import PythonCodePrinter
+    # Rename every symbol, so that none of them clash
+    # with the names used in the kernel.
+    x, y = system._arguments()[:2]
+    names = {x: Symbol("_x"), y: Symbol("_y")}
+    arguments = []
+    for i, s in enumerate(system.parameters):
+        names[Symbol(s)] = Symbol("_p%d" % i)
+        arguments.append("_p%d" % i)
+    expressions = [e.xreplace(names) for e in system._expressions]
+    replacements, (u, v) = cse(expressions, numbered_symbols("_c"))
+    printer = PythonCodePrinter({"allow_unknown_functions": True,
+                                 "strict": True})
+    stage = ["%s = %s" % (s, printer.doprint(e)) for s, e in replacements]
+    stage += ["_u = %s" % printer.doprint(u), "_v = %s" % printer.doprint(v)]
+    lines = ["def kernel(%s):" % ", ".join(["x", "y", "dt", "steps"]
+                                          + arguments),
+             "    xs, ys = [], []",
+             "    for _ in range(steps):"]
+    for statement in _METHOD_STATEMENTS[method]:
+        for line in (stage if statement == "STAGE" else [statement]):
+            lines.append("        " + line)
+    lines += ["        xs.append(x)",
+              "        ys.append(y)",
+              "    return xs, ys"]
+    return "\n".join(lines)
+
+
+def make_step_kernel(system: SystemR2toR2, method: str,
+                     source: str = None) -> Callable:
+    """
+    Make a function kernel(x, y, dt, steps, *params) that does the given
+    number of steps of the method from x, y, and returns the lists of
+    x and y values after each step. The parameter values are in the order
+    of the parameters of the system. This returns None if the expressions
+    of the system can't be written with the math module. The source from
+    kernel_source can be given if it is already known, such as those
+    generated into preset_kernels.py. It is run, so it must be trusted.
+
+    >>> from functions import FunctionR2toR
+    >>> v = SystemR2toR2(FunctionR2toR("y"), FunctionR2toR("-k*x"))
+    >>> kernel = make_step_kernel(v, RK4)
+    >>> xs, ys = kernel(1.0, 0.0, math.pi/100, 100, 1.0)
+    >>> len(xs), round(xs[-1], 6), abs(round(ys[-1], 6))
+    (100, -1.0, 0.0)
+    """
+    if source is None:
+        try:
+            source = kernel_source(system, method)
+        except (NotImplementedError, TypeError, ValueError):
+            return None
+    _, namespace = system._modules
+    namespace = dict(namespace)
+    namespace["math"] = math
+    exec(compile(source, "<step kernel %s>" % method, "exec"), namespace)
+    return namespace["kernel"]
+
+
+# Kernels of recently used systems, since the same
+# system object is reused while only its parameters change.
+kernel_cache = LRUCache(16)
+
+
+def get_step_kernel(system: SystemR2toR2, method: str,
+                    source: str = None) -> Callable:
+    """
+    Get the kernel of a system for the given method, reusing one
+    made before if there is one in the cache.
+    """
+    return kernel_cache.get((system, method),
+                            lambda: make_step_kernel(system, method, source))
+
+
+def run_kernel(kernel: Callable, x: float, y: float, dt: float, steps: int,
+               params: List[float]) -> tuple:
+    """
+    Call a kernel, and return the lists of x and y values, or None if
+    the result isn't real or a math function was given a value outside
+    of its domain. In that case the steps should be redone with numpy,
+    which gives nan and inf instead.
+
+    >>> from functions import FunctionR2toR
+    >>> v = SystemR2toR2(FunctionR2toR("sqrt(x)"), FunctionR2toR("y"))
+    >>> kernel = make_step_kernel(v, EULER)
+    >>> run_kernel(kernel, 1.0, 1.0, 1.0, 2, [])
+    ([2.0, 3.414213562373095], [2.0, 4.0])
+    >>> run_kernel(kernel, -1.0, 1.0, 1.0, 2, []) is None
+    True
+    """
+    try:
+        xs, ys = kernel(float(x), float(y), dt, steps, *params)
+    except (ArithmeticError, ValueError):
+        return None
+    if xs and (isinstance(xs[-1], complex) or isinstance(ys[-1], complex)):
+        return None
+    return xs, ys
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,276 @@
+"""
+Integrate a set of initial conditions of x' = f(x, y), y' = g(x, y)
+for every combination of parameter values over given ranges, and save
+a summary of each trajectory as columns of a .npz file.
+
+For example, to see which values of the damping b and the strength a
+of the damped pendulum keep a grid of initial conditions bounded:
+
+    python sweep.py "y" "5*a*sin(k*x/2) - b*y" --range b=0:2:21 \\
+        --range a=0.5,1,2 --grid 8 8 --steps 2000 --workers 4 -o sweep.npz
+
+A range is either start:stop:number, for evenly spaced values, or
+a list of values separated by commas. Without any ranges, there is a
+single combination where every parameter keeps its value from --param
+or its default value. Every member of a combination
+and initial condition is integrated together, with the parameter values
+broadcast as arrays through the compiled functions. The combinations
+are split into chunks, which are integrated by a pool of processes
+when more than one worker is used. The adaptive method isn't available
+here, since it takes a different number of steps for each member.
+
+There is a row for each combination and initial condition, with columns
+for each swept parameter, the initial and final state, whether the
+trajectory escaped past the escape radius and when, and the time after
+which it stayed converged to a fixed point. The times are nan if the
+trajectory never escaped or converged.
+"""
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functions import get_function
+from batch import (METHODS, advance, get_parameter_values, grid_seeds,
+                   load_seeds, make_field, make_jacobian, parse_parameters)
+from typing import Dict, List
+
+
+# The adaptive method evaluates the field at a different subset of the
+# members for each of its substeps, which the parameter arrays of
+# the members can't follow.
+SWEEP_METHODS = [method for method in METHODS if method != "dopri"]
+
+
+def parse_range(text: str) -> np.ndarray:
+    """
+    Parse the values of a range given as start:stop:number,
+    or as values separated by commas.
+
+    >>> parse_range("0:1:5")
+    array([0.  , 0.25, 0.5 , 0.75, 1.  ])
+    >>> parse_range("1, 2.5")
+    array([1. , 2.5])
+    """
+    if ":" in text:
+        start, stop, number = text.split(":")
+        return np.linspace(float(start), float(stop), int(number))
+    return np.array([float(value) for value in text.split(",")])
+
+
+def parse_ranges(ranges: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Parse a list of name=range strings.
+
+    >>> parse_ranges(["b=0:1:3"])
+    {'b': array([0. , 0.5, 1. ])}
+    """
+    values = {}
+    for parameter in ranges:
+        name, _, text = parameter.partition("=")
+        if not _:
+            raise ValueError("Ranges must be given as name=range")
+        values[name.strip()] = parse_range(text)
+    return values
+
+
+def combinations(ranges: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Get every combination of the values of the ranges, as an array
+    with a row for each combination and a column for each range.
+
+    >>> combinations({"a": np.array([1.0, 2.0]), "b": np.array([0.0, 5.0])})
+    array([[1., 0.],
+           [1., 5.],
+           [2., 0.],
+           [2., 5.]])
+    >>> combinations({}).shape
+    (1, 0)
+    """
+    if not ranges:
+        return np.empty((1, 0))
+    grids = np.meshgrid(*ranges.values(), indexing="ij")
+    return np.array([grid.ravel() for grid in grids]).T.reshape(
+        -1, len(ranges))
+
+
+def integrate_summary(f: str, g: str, names: List[str],
+                      combos: np.ndarray, seeds: np.ndarray,
+                      fixed: Dict[str, float], method: str, dt: float,
+                      steps: int, escape_radius: float,
+                      tol: float) -> Dict[str, np.ndarray]:
+    """
+    Integrate every initial condition for every combination of
+    parameter values at once, and return the final states, whether and
+    when each trajectory escaped, and the time each converged, with the
+    initial conditions varying fastest. The functions are built from
+    their expressions, so that this can run in another process. Only
+    the members that haven't escaped are advanced at each step.
+
+    >>> s = integrate_summary("-a*x", "-y", ["a"], np.array([[1.0], [-1.0]]),
+    ...                       np.array([[1.0], [1.0]]), {}, "rk4", 0.1, 200,
+    ...                       100.0, 1e-6)
+    >>> s["escaped"].tolist(), bool(np.isnan(s["converge_time"][1]))
+    ([False, True], True)
+    >>> round(float(s["escape_time"][1]), 6)
+    4.7
+    >>> bool(10.0 < s["converge_time"][0] < 20.0)
+    True
+    """
+    if method not in SWEEP_METHODS:
+        raise ValueError("Unknown method %s" % method)
+    vx, vy = get_function(f), get_function(g)
+    n_seeds = seeds.shape[1]
+    # Each parameter is either a scalar, or has a value for every member.
+    values = dict(fixed)
+    for i, name in enumerate(names):
+        values[name] = np.repeat(combos[:, i], n_seeds)
+    vxparams = get_parameter_values(vx, values)
+    vyparams = get_parameter_values(vy, values)
+
+    x = np.tile(seeds, len(combos))
+    n = x.shape[1]
+    h = np.full(n, dt)
+    escaped = np.zeros(n, dtype=bool)
+    escape_time = np.full(n, np.nan)
+    converge_time = np.full(n, np.nan)
+    members = np.arange(n)
+    field = make_field(vx, vy, vxparams, vyparams)
+    jac = make_jacobian(vx, vy, vxparams, vyparams)
+    with np.errstate(all="ignore"):
+        for i in range(1, steps + 1):
+            if members.size != n - np.count_nonzero(escaped):
+                # The parameter arrays have a value for every member,
+                # so the field is remade for those still advancing.
+                members = np.flatnonzero(~escaped)
+                field = make_field(vx, vy, vxparams, vyparams, members)
+                jac = make_jacobian(vx, vy, vxparams, vyparams, members)
+            x_next = x.copy()
+            x_next[:, members] = advance(
+                field, x[:, members], method, dt,
+                np.ones(members.size, dtype=bool), h[members], jac)
+            speed = np.abs(x_next - x).max(axis=0)/dt
+            x = x_next
+            escaping = ~escaped & ~(np.abs(x).max(axis=0) < escape_radius)
+            escape_time[escaping] = i*dt
+            escaped |= escaping
+            converged = (speed < tol) & ~escaped
+            # Keep the first time of the last stretch
+            # where the trajectory stayed converged.
+            converge_time[~converged] = np.nan
+            converge_time[converged & np.isnan(converge_time)] = i*dt
+            if escaped.all():
+                break
+    return {"final_x": x[0], "final_y": x[1], "escaped": escaped,
+            "escape_time": escape_time, "converge_time": converge_time}
+
+
+def sweep(f: str, g: str, ranges: Dict[str, np.ndarray], seeds: np.ndarray,
+          fixed: Dict[str, float] = None, method: str = "rk4",
+          dt: float = 0.01, steps: int = 1000, escape_radius: float = 1e6,
+          tol: float = 1e-6, workers: int = 1,
+          chunk_size: int = 64) -> Dict[str, np.ndarray]:
+    """
+    Integrate the initial conditions for every combination of the
+    parameter values in ranges, where the other parameters take their
+    values from fixed, or else their default values. Return the columns
+    of the summary of each trajectory. Chunks of chunk_size combinations
+    are integrated by a pool of processes if workers is more than 1.
+
+    >>> columns = sweep("y", "-k*x - b*y", {"b": np.array([0.0, 1.0])},
+    ...                 np.array([[1.0], [0.0]]), steps=3000)
+    >>> columns["b"].tolist(), np.isfinite(columns["converge_time"]).tolist()
+    ([0.0, 1.0], [False, True])
+    """
+    fixed = {} if fixed is None else fixed
+    seeds = np.asarray(seeds, dtype=np.float64)
+    names = list(ranges)
+    combos = combinations(ranges)
+    chunks = [combos[i:i + chunk_size]
+              for i in range(0, len(combos), chunk_size)]
+    args = (seeds, fixed, method, dt, steps, escape_radius, tol)
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(integrate_summary, f, g, names,
+                                       chunk, *args) for chunk in chunks]
+            results = [future.result() for future in futures]
+    else:
+        results = [integrate_summary(f, g, names, chunk, *args)
+                   for chunk in chunks]
+    n_seeds = seeds.shape[1]
+    columns = {"combination": np.repeat(np.arange(len(combos)), n_seeds)}
+    for i, name in enumerate(names):
+        columns[name] = np.repeat(combos[:, i], n_seeds)
+    columns["seed_x"] = np.tile(seeds[0], len(combos))
+    columns["seed_y"] = np.tile(seeds[1], len(combos))
+    for key in results[0]:
+        columns[key] = np.concatenate([r[key] for r in results])
+    return columns
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Run the command line interface.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("f", help="the expression for x' = f(x, y)")
+    parser.add_argument("g", help="the expression for y' = g(x, y)")
+    parser.add_argument("-r", "--range", action="append", default=[],
+                        metavar="NAME=RANGE",
+                        help="sweep a parameter over start:stop:number "
+                        "or a list of values separated by commas")
+    parser.add_argument("-p", "--param", action="append", default=[],
+                        metavar="NAME=VALUE",
+                        help="set a parameter that isn't swept, which "
+                        "otherwise keeps its default value")
+    parser.add_argument("--bounds", nargs=4, type=float,
+                        default=[-10.0, 10.0, -10.0, 10.0],
+                        metavar=("XMIN", "XMAX", "YMIN", "YMAX"),
+                        help="bounds of the grid of initial conditions")
+    seeds_group = parser.add_mutually_exclusive_group()
+    seeds_group.add_argument("--grid", nargs=2, type=int, default=[4, 4],
+                             metavar=("NX", "NY"),
+                             help="number of initial conditions along "
+                             "each axis")
+    seeds_group.add_argument("--seeds", metavar="FILE",
+                             help="load initial conditions from a .npy "
+                             "or text file instead of using a grid")
+    parser.add_argument("--method", choices=SWEEP_METHODS, default="rk4")
+    parser.add_argument("--dt", type=float, default=0.01)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--escape-radius", type=float, default=1e6,
+                        help="trajectories that go further than this "
+                        "from the origin along either axis have escaped")
+    parser.add_argument("--tol", type=float, default=1e-6,
+                        help="speed below which a trajectory "
+                        "is taken to have converged")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes to use")
+    parser.add_argument("--chunk-size", type=int, default=64,
+                        help="number of combinations integrated together")
+    parser.add_argument("-o", "--output", required=True,
+                        help="a .npz file to save to")
+    args = parser.parse_args(argv)
+
+    ranges = parse_ranges(args.range)
+    fixed = parse_parameters(args.param)
+    vx, vy = get_function(args.f), get_function(args.g)
+    names = {str(s) for s in vx.parameters + vy.parameters}
+    unknown = (set(ranges) | set(fixed)) - names
+    if unknown:
+        parser.error("unknown parameters: %s" % ", ".join(sorted(unknown)))
+    if args.seeds is not None:
+        seeds = load_seeds(args.seeds)
+    else:
+        seeds = grid_seeds(args.bounds, *args.grid)
+    columns = sweep(args.f, args.g, ranges, seeds, fixed, args.method,
+                    args.dt, args.steps, args.escape_radius, args.tol,
+                    args.workers, args.chunk_size)
+    np.savez_compressed(
+        args.output, f=args.f, g=args.g, method=args.method, dt=args.dt,
+        steps=args.steps, swept=np.array(list(ranges), dtype=str),
+        fixed_names=np.array(list(fixed), dtype=str),
+        fixed_values=np.array(list(fixed.values()), dtype=np.float64),
+        **columns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Cache of the values of a vector field on a lattice, stored in tiles.
+"""
+import numpy as np
+from lru_cache import LRUCache
+from typing import Callable, Dict, Hashable, Tuple
+
+
+class TiledFieldCache:
+    """
+    Caches the values of a vector field at the points
+    (j*spacing, i*spacing) of a lattice, for integers i and j, in square
+    tiles of tile_size by tile_size points. Moving the view around
+    only evaluates the field on the tiles that haven't been seen yet,
+    and these are evaluated together in a single call.
+
+    Attributes:
+    tile_size [int]: The number of points along each side of a tile.
+    tiles [LRUCache]: The cached tiles, which counts hits and misses.
+    """
+
+    def __init__(self, tile_size: int = 16, max_tiles: int = 1024) -> None:
+        """
+        The initializer.
+
+        >>> calls = []
+        >>> def f(xy):
+        ...     calls.append(xy[0].size)
+        ...     return [xy[0], 2.0*xy[1]]
+        >>> cache = TiledFieldCache(tile_size=4)
+        >>> u, v = cache.evaluate(f, "key", 0.5, -2, -3, 3, 5)
+        >>> u[0], v[:, 0]
+        (array([-1.5, -1. , -0.5,  0. ,  0.5]), array([-2., -1.,  0.]))
+        >>> u, v = cache.evaluate(f, "key", 0.5, -1, -2, 3, 5)
+        >>> calls
+        [64]
+        """
+        self.tile_size = tile_size
+        self.tiles = LRUCache(max_tiles)
+
+    def evaluate(self, f: Callable, key: Hashable, spacing: float,
+                 i0: int, j0: int, rows: int, columns: int
+                 ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the values of the vector field f on the rows by columns
+        lattice points starting from (j0*spacing, i0*spacing). The key
+        must identify the vector field, including its parameters.
+        """
+        size = self.tile_size
+        ti0, ti1 = i0//size, (i0 + rows - 1)//size
+        tj0, tj1 = j0//size, (j0 + columns - 1)//size
+        tile_keys = [(key, spacing, ti, tj)
+                     for ti in range(ti0, ti1 + 1)
+                     for tj in range(tj0, tj1 + 1)]
+        tiles = {k: self.tiles.get(k, None)
+                 for k in tile_keys if k in self.tiles}
+        missing = [k for k in tile_keys if k not in tiles]
+        if missing:
+            tiles.update(self._evaluate_tiles(f, spacing, missing))
+        u = np.empty(((ti1 - ti0 + 1)*size, (tj1 - tj0 + 1)*size))
+        v = np.empty_like(u)
+        for k in tile_keys:
+            _, _, ti, tj = k
+            tile = tiles[k]
+            rows_slice = slice((ti - ti0)*size, (ti - ti0 + 1)*size)
+            columns_slice = slice((tj - tj0)*size, (tj - tj0 + 1)*size)
+            u[rows_slice, columns_slice] = tile[0]
+            v[rows_slice, columns_slice] = tile[1]
+        i, j = i0 - ti0*size, j0 - tj0*size
+        return (u[i:i + rows, j:j + columns],
+                v[i:i + rows, j:j + columns])
+
+    def contains(self, key: Hashable, spacing: float,
+                 i: int, j: int) -> bool:
+        """
+        Check if the tile with the lattice point (j*spacing, i*spacing)
+        of the vector field with the given key is cached.
+
+        >>> cache = TiledFieldCache(tile_size=2)
+        >>> _ = cache.evaluate(lambda xy: xy, "key", 1.0, 0, 0, 2, 2)
+        >>> cache.contains("key", 1.0, 1, 1), cache.contains("key", 1.0, 2, 0)
+        (True, False)
+        """
+        size = self.tile_size
+        return (key, spacing, i//size, j//size) in self.tiles
+
+    def get_tiles(self, key: Hashable) -> Dict[str, np.ndarray]:
+        """
+        Get the cached tiles of the vector field with the given key, as
+        arrays of the spacing, the tile row and column, and the values
+        of u and v of each tile.
+
+        >>> cache = TiledFieldCache(tile_size=2)
+        >>> _ = cache.evaluate(lambda xy: xy, "key", 1.0, 0, 0, 2, 4)
+        >>> tiles = cache.get_tiles("key")
+        >>> tiles["index"].tolist(), tiles["u"].shape
+        ([[0, 0], [0, 1]], (2, 2, 2))
+        >>> other = TiledFieldCache(tile_size=2)
+        >>> other.add_tiles("other key", tiles)
+        >>> u, v = other.evaluate(None, "other key", 1.0, 0, 1, 2, 3)
+        >>> u.tolist()
+        [[1.0, 2.0, 3.0], [1.0, 2.0, 3.0]]
+        """
+        size = self.tile_size
+        entries = [(k, tile) for k, tile in self.tiles.items()
+                   if k[0] == key]
+        return {"spacing": np.array([k[1] for k, _ in entries]),
+                "index": np.array([k[2:] for k, _ in entries],
+                                  dtype=int).reshape(-1, 2),
+                "u": np.array([tile[0] for _, tile in entries]).reshape(
+                    -1, size, size),
+                "v": np.array([tile[1] for _, tile in entries]).reshape(
+                    -1, size, size)}
+
+    def add_tiles(self, key: Hashable, tiles: Dict[str, np.ndarray]) -> None:
+        """
+        Add tiles from get_tiles to the cache, as the tiles of
+        the vector field with the given key.
+        """
+        if tiles["u"].shape[1:] != (self.tile_size, self.tile_size):
+            return
+        for spacing, (ti, tj), u, v in zip(tiles["spacing"], tiles["index"],
+                                           tiles["u"], tiles["v"]):
+            k = (key, float(spacing), int(ti), int(tj))
+            self.tiles.get(k, lambda: (u.copy(), v.copy()))
+
+    def _evaluate_tiles(self, f: Callable, spacing: float,
+                        tile_keys: list) -> dict:
+        """
+        Evaluate f on the given tiles in one call, by placing
+        the tiles side by side, and add them to the cache.
+        """
+        size = self.tile_size
+        offsets = np.arange(size)
+        x = np.concatenate([np.outer(np.ones(size), (tj*size + offsets))
+                            for _, _, _, tj in tile_keys], axis=1)*spacing
+        y = np.concatenate([np.outer((ti*size + offsets), np.ones(size))
+                            for _, _, ti, _ in tile_keys], axis=1)*spacing
+        u, v = f([x, y])
+        u = np.broadcast_to(u, x.shape)
+        v = np.broadcast_to(v, x.shape)
+        tiles = {}
+        for n, k in enumerate(tile_keys):
+            columns = slice(n*size, (n + 1)*size)
+            tiles[k] = (u[:, columns].copy(), v[:, columns].copy())
+            self.tiles.get(k, lambda: tiles[k])
+        return tiles
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -2,28 +2,45 @@
 App for nonlinear_vector_field.py
 
 TODO:
- Need to implement moving the plot view and zooming out
- with the mouse. Initial attempts at this implementation
- are found in the commented out parts of code.
  Setup different ways to plot trajectories, such
  as plotting multiple trajectories.
+
+Run with --profile-startup to print how long each phase of
+starting the app takes, up to when the first frame is drawn.
 """
+from phase_timer import PhaseTimer
+# Started before the other imports, so that they are timed too.
+startup = PhaseTimer()
+import argparse
 import tkinter as tk
+from tkinter import filedialog
 from nonlinear_vector_field import NonLinearVectorField2D
+from basin_map import ATTRACTORS, ESCAPE_TIME
+from presets import PRESETS
+from session import load_session, save_session
+from update_scheduler import UpdateScheduler
 from matplotlib.backends import backend_tkagg
+startup.mark("imports")
 
 
 class App(NonLinearVectorField2D):
     """
     """
 
-    def __init__(self) -> None:
+    def __init__(self, session: str = None,
+                 profile_startup: bool = False) -> None:
         """
-        This is the constructor.
+        This is the constructor. If the path of a session
+        snapshot is given, the session is restored from it. If
+        profile_startup is True, the time taken by each phase of
+        starting the app is printed once the first frame is drawn.
         """
+        state = None if session is None else load_session(session)
+        startup.mark("load session")
 
         # Initialize the parent class
-        NonLinearVectorField2D.__init__(self)
+        NonLinearVectorField2D.__init__(self, state)
+        startup.mark("vector field")
 
         # Primary Tkinter GUI
         self.window = tk.Tk()
@@ -47,17 +64,80 @@ class App(NonLinearVectorField2D):
                 row=0, column=0, rowspan=maxrowspan, columnspan=3)
         self._canvas_height = self.canvas.get_tk_widget().winfo_height()
         self.canvas.get_tk_widget().bind("<B1-Motion>", self.mouse_listener)
+        self._profile_startup = profile_startup
+        self._first_draw = self.figure.canvas.mpl_connect(
+            "draw_event", self._on_first_draw)
+        startup.mark("window")
         
         # Right click menu
         self.menu = tk.Menu(self.window, tearoff=0)
         self.menu.add_command(label="Use Forward-Euler",
                               command=lambda *args:
                               self.particle.set_method(
-                                  "Forward-Euler"))
+                                  "Forward Euler"))
         self.menu.add_command(label="Use Runge-Kutta",
                               command=lambda *args:
                               self.particle.set_method(
                                   "Runge-Kutta"))
+        self.menu.add_command(label="Use Dormand-Prince",
+                              command=lambda *args:
+                              self.particle.set_method(
+                                  "Dormand-Prince"))
+        self.menu.add_command(label="Use Backward Euler",
+                              command=lambda *args:
+                              self.particle.set_method(
+                                  "Backward Euler"))
+        self.menu.add_command(label="Use Trapezoidal",
+                              command=lambda *args:
+                              self.particle.set_method(
+                                  "Trapezoidal"))
+        self.menu.add_command(label="Use Rosenbrock",
+                              command=lambda *args:
+                              self.particle.set_method(
+                                  "Rosenbrock"))
+        self.menu.add_command(label="Show Arrows",
+                              command=lambda *args:
+                              self.set_field_mode(self.ARROWS))
+        self.menu.add_command(label="Show Streamlines",
+                              command=lambda *args:
+                              self.set_field_mode(self.STREAMLINES))
+        self.menu.add_command(label="Show Arrows and Streamlines",
+                              command=lambda *args:
+                              self.set_field_mode(
+                                  self.ARROWS_AND_STREAMLINES))
+        self.menu.add_command(label="Arrow Density Auto/Fixed",
+                              command=lambda *args:
+                              self.set_field_resolution(
+                                  21 if self.field_resolution == "auto"
+                                  else "auto"))
+        self.menu.add_command(label="Show/Hide Nullclines and Fixed Points",
+                              command=lambda *args:
+                              self.set_show_nullclines(
+                                  not self.show_nullclines))
+        self.menu.add_command(label="Detect Closed Orbits On/Off",
+                              command=lambda *args:
+                              self.set_cycle_detection(
+                                  self.cycle_text is None))
+        self.menu.add_command(label="Basin Map: Attractors",
+                              command=lambda *args:
+                              self.compute_basin_map(ATTRACTORS))
+        self.menu.add_command(label="Basin Map: Escape Time",
+                              command=lambda *args:
+                              self.compute_basin_map(ESCAPE_TIME))
+        self.menu.add_command(label="Hide Basin Map",
+                              command=lambda *args: self.clear_basin_map())
+        self.menu.add_command(label="Record Trajectory On/Off",
+                              command=self.toggle_recording)
+        self.menu.add_command(label="Save Session...",
+                              command=self.save_session)
+        self.menu.add_command(label="Load Session...",
+                              command=self.load_session)
+        self.menu.add_command(label="Show/Hide Frame Timing",
+                              command=self.toggle_frame_stats)
+        self.menu.add_command(label="Simulate in Background On/Off",
+                              command=lambda *args:
+                              self.set_background_simulation(
+                                  not self.is_simulating_in_background()))
         self.window.bind("<ButtonRelease-3>", self.popup_menu)
 
         # Thanks to stackoverflow user rudivonstaden for
@@ -85,34 +165,32 @@ class App(NonLinearVectorField2D):
         #
         self.figure.patch.set_facecolor(colour)
 
-        self._zoom = False
+        # The plot is zoomed in steps of 2**(1/4), counted from the
+        # bounds of the preset, so that zooming back gives exactly the
+        # same spacing of arrows and reuses the cached field.
+        self._zoom_level = 0
+        self._home_bounds = [-10.0, 10.0, -10.0, 10.0]
+        self._drag_start = None
         self._mouse_action = 2
-        # self.mouse_dropdown_dict = {"Move Plot Around": 1, 
-        #                             "Plot Trajectories": 2}
-        # self.mouse_dropdown_string = tk.StringVar(self.window)
-        # self.mouse_dropdown_string.set("Set Mouse...")
-        # self.mouse_dropdown = tk.OptionMenu(
-        #     self.window,
-        #     self.mouse_dropdown_string,
-        #     *tuple(key for key in self.mouse_dropdown_dict),
-        #     command=self.set_mouse_action  
-        # )
-        # self.mouse_dropdown.grid(
-        #     row=0, column=3, padx=(10, 10), pady=(0, 0)
-        # )
-        # self.canvas.get_tk_widget().bind_all("<MouseWheel>", self.zoom)
-        # self.canvas.get_tk_widget().bind_all("<Button-4>", self.zoom)
-        # self.canvas.get_tk_widget().bind_all("<Button-5>", self.zoom)
-
-        self.preset_dropdown_dict = {
-            "Linear": ["a*x - b*y + k1", "c*x + d*y + k2"],
-            "Pendulum 1": ["y", "5*a*sin(k*x/2)"],
-            "Pendulum 2": ["y", "5*a*sin(k*x/2)-b*y"],
-            # "Rescaled Lotka–Volterra": ["a*(x+10)/2 - b*(x+10)*(y+10)/2", 
-            #                    "d*(x+10)*(y+10)/4 - e*(y+10)/2"]
-            "Lotka–Volterra": ["10*a*x/2 - 3*b*x*y/2", 
-                               "6*d*x*y/4 - 10*e*y/2"]
-            }
+        self.mouse_dropdown_dict = {"Move Plot Around": 1, 
+                                    "Plot Trajectories": 2}
+        self.mouse_dropdown_string = tk.StringVar(self.window)
+        self.mouse_dropdown_string.set("Set Mouse...")
+        self.mouse_dropdown = tk.OptionMenu(
+            self.window,
+            self.mouse_dropdown_string,
+            *tuple(key for key in self.mouse_dropdown_dict),
+            command=self.set_mouse_action  
+        )
+        self.mouse_dropdown.grid(
+            row=0, column=3, padx=(10, 10), pady=(0, 0)
+        )
+        self.canvas.get_tk_widget().bind("<ButtonPress-1>", self.mouse_press)
+        self.canvas.get_tk_widget().bind("<MouseWheel>", self.zoom)
+        self.canvas.get_tk_widget().bind("<Button-4>", self.zoom)
+        self.canvas.get_tk_widget().bind("<Button-5>", self.zoom)
+
+        self.preset_dropdown_dict = dict(PRESETS)
         self.preset_dropdown_string = tk.StringVar(self.window)
         self.preset_dropdown_string.set("Choose Preset Vector Field")
         self.preset_dropdown = tk.OptionMenu(
@@ -184,14 +262,68 @@ class App(NonLinearVectorField2D):
             padx=(10, 10)
             )
 
+        # Changes from the widgets are applied once per frame
+        self.scheduler = UpdateScheduler(self.apply_updates)
+
         # Sliders
         self.sliderslist = []
         self.sliderslist_symbols = []
         self.simulation_speed_slider = None
         self.quit_button = None
         self.set_sliders()
-        self.set_preset_dropdown("Linear")
+        startup.mark("widgets")
+        if state is None:
+            self.set_preset_dropdown("Linear")
+            self.scheduler.flush()
+        else:
+            self._set_app_state(state)
         self.preset_dropdown_string.set("Choose Preset Vector Field")
+        startup.mark("preset")
+
+    def _on_first_draw(self, event) -> None:
+        """
+        End the startup timing once the first frame is drawn.
+        """
+        self.figure.canvas.mpl_disconnect(self._first_draw)
+        startup.mark("first frame")
+        if self._profile_startup:
+            print(startup.report())
+
+    def save_session(self, *event: tk.Event) -> None:
+        """
+        Save a snapshot of the session to a file chosen by the user.
+        """
+        path = filedialog.asksaveasfilename(
+            defaultextension=".npz", filetypes=[("Session", "*.npz")])
+        if path:
+            state = self.get_state()
+            state["zoom_level"] = self._zoom_level
+            state["home_bounds"] = list(self._home_bounds)
+            save_session(path, state)
+
+    def load_session(self, *event: tk.Event) -> None:
+        """
+        Restore the session from a snapshot chosen by the user.
+        """
+        path = filedialog.askopenfilename(filetypes=[("Session", "*.npz")])
+        if path:
+            state = load_session(path)
+            self.set_state(state)
+            self.set_sliders()
+            self._set_app_state(state)
+
+    def _set_app_state(self, state: dict) -> None:
+        """
+        Restore the parts of a session that belong to the widgets.
+        """
+        self._zoom_level = state.get("zoom_level", 0)
+        self._home_bounds = state.get("home_bounds", list(state["bounds"]))
+        self.enter_vx.delete(0, tk.END)
+        self.enter_vx.insert(0, state["f"])
+        self.enter_vy.delete(0, tk.END)
+        self.enter_vy.insert(0, state["g"])
+        if self.simulation_speed_slider is not None:
+            self.simulation_speed_slider.set(state["simulation_speed"])
 
     def set_preset_dropdown(self, *event: tk.Event) -> None:
         """
@@ -199,52 +331,53 @@ class App(NonLinearVectorField2D):
         """
         event = event[0]
         args_vx, args_vy = self.preset_dropdown_dict[event]
-        self._update_function(args_vx, args_vy)
+        self.scheduler.request(self.scheduler.EXPRESSIONS, (args_vx, args_vy))
         if event == "Lotka–Volterra":
-            if any([self.bounds[i] != [0.0, 10.0, 0.0, 10.0][i] 
-                   for i in range(len(self.bounds))]):
-                self.set_bounds([0.0, 10.0, 0.0, 10.0])
+            self._home_bounds = [0.0, 10.0, 0.0, 10.0]
         else:
-            if any([self.bounds[i] != [-10.0, 10.0, -10.0, 10.0][i] 
-                   for i in range(len(self.bounds))]):
-                self.set_bounds([-10.0, 10.0, -10.0, 10.0])
-
-    # def set_mouse_action(self, *event: tk.Event) -> None:
-    #     """
-    #     Set the mouse action.
-    #     """
-    #     event = event[0]
-    #     self._mouse_action = self.mouse_dropdown_dict[event]
-
-    def slider_update(self, *event: tk.Event) -> None:
-        """
-        Update the functions given input from the slider.
-        """
-        self.particle.remove_line()
-        vx_params = self._vx.get_default_values()
-        vy_params = self._vy.get_default_values()
-        for i in range(len(self.sliderslist)):
-            symbol = self.sliderslist_symbols[i]
-            if symbol in vx_params:
-                vx_params[symbol] = self.sliderslist[i].get()
-            if symbol in vy_params:
-                vy_params[symbol] = self.sliderslist[i].get()
-        # print(self.sliderslist_symbols)
-        # print("vx params: ", vx_params)
-        # print("vy params: ", vy_params, "\n")
-        self.vxparams = []
-        for key in self._vx.symbols:
-            if key in vx_params:
-                self.vxparams.append(vx_params[key])
-        self.vyparams = []
-        for key in self._vy.symbols:
-            if key in vy_params:
-                self.vyparams.append(vy_params[key])
-        # vx_parameter_set = {s for s in self._vx.get_default_values()}
-        # vy_parameter_set = {s for s in self._vy.get_default_values()}
-        # self.vxparams = [vx_params[s] for s in vx_parameter_set]
-        # self.vyparams = [vy_params[s] for s in vy_parameter_set]
-        self.plot_vector_field(change_title=False)
+            self._home_bounds = [-10.0, 10.0, -10.0, 10.0]
+        self._zoom_level = 0
+        self.scheduler.request(self.scheduler.BOUNDS, self._home_bounds)
+
+    def apply_updates(self, pending: dict) -> None:
+        """
+        Apply the changes collected by the scheduler, and then
+        recompute the vector field once.
+        """
+        expressions = pending.get(self.scheduler.EXPRESSIONS)
+        parameters = pending.get(self.scheduler.PARAMETERS)
+        bounds = pending.get(self.scheduler.BOUNDS)
+        if expressions is not None:
+            self.set_vx(expressions[0])
+            self.set_vy(expressions[1])
+            self.set_sliders()
+            # Parameter changes from the old sliders no longer apply.
+            parameters = None
+        if parameters is not None:
+            self.particle.remove_line()
+            for symbol, value in parameters.items():
+                self.set_parameter(symbol, value)
+        if bounds is not None and any([self.bounds[i] != bounds[i]
+                                       for i in range(len(self.bounds))]):
+            self.set_bounds(bounds)
+        else:
+            self.plot_vector_field(change_title=expressions is not None)
+
+    def set_mouse_action(self, *event: tk.Event) -> None:
+        """
+        Set the mouse action.
+        """
+        event = event[0]
+        self._mouse_action = self.mouse_dropdown_dict[event]
+
+    def slider_update(self, symbol, value: str) -> None:
+        """
+        Update the functions given input from the slider
+        of the parameter symbol.
+        """
+        if self.get_parameter(symbol) != float(value):
+            self.scheduler.request(self.scheduler.PARAMETERS,
+                                   {symbol: float(value)})
         # self._clear_plot_after_zoom_or_move()
 
     def mouse_listener(self, event: tk.Event) -> None:
@@ -264,26 +397,30 @@ class App(NonLinearVectorField2D):
             x = (event.x - pixel_xlim[0])*mx + xlim[0]
             y = (height - event.y - pixel_ylim[0])*my + ylim[0]
             self.set_interactive_line(x, y)
-        # elif self._mouse_action == 1:
-        #     ax = self.figure.get_axes()[0]
-        #     xlim = ax.get_xlim()
-        #     ylim = ax.get_ylim()
-
-    def _update_function(self, args_vx: str, args_vy: str) -> None:
-        """
-        Helper function for update_function_by_entry and
-        update_function_by_preset.
-        """
-        self.set_vx(args_vx)
-        self.set_vy(args_vy)
-        # self.f = Functionx(str_args)
-        # ones = ([1 for i in range(len(self.f.symbols) - 1)])
-        # self.y = self.f(self.x, *ones)
-        self.plot_vector_field()
-        # self.text.set_text("f(x) = $%s$" % (self.f.latex_repr))
-        self.set_sliders()
-        # self.lim_update()
-        # self.set_title()
+        elif self._mouse_action == 1 and self._drag_start is not None:
+            ax = self.figure.get_axes()[0]
+            x0, y0, bounds = self._drag_start
+            mx = (bounds[1] - bounds[0])/(ax.bbox.xmax - ax.bbox.xmin)
+            my = (bounds[3] - bounds[2])/(ax.bbox.ymax - ax.bbox.ymin)
+            dx = -(event.x - x0)*mx
+            dy = (event.y - y0)*my
+            self.scheduler.request(
+                self.scheduler.BOUNDS,
+                [bounds[0] + dx, bounds[1] + dx,
+                 bounds[2] + dy, bounds[3] + dy])
+
+    def mouse_press(self, event: tk.Event) -> None:
+        """
+        Remember where the mouse was pressed, for moving the plot around.
+        """
+        self._drag_start = (event.x, event.y, list(self._get_view_bounds()))
+
+    def _get_view_bounds(self) -> list:
+        """
+        Get the bounds that the plot is going to have,
+        including changes that haven't been applied yet.
+        """
+        return self.scheduler.get_pending(self.scheduler.BOUNDS, self.bounds)
 
     def update_function_by_entry(self, *event: tk.Event) -> None:
         """
@@ -296,7 +433,7 @@ class App(NonLinearVectorField2D):
         if args_vy.strip() == "":
             args_vy = "zero(x, y)"
         self.preset_dropdown_string.set("Choose Preset Vector Field")
-        self._update_function(args_vx, args_vy)
+        self.scheduler.request(self.scheduler.EXPRESSIONS, (args_vx, args_vy))
 
     def set_sliders(self) -> None:
         """
@@ -308,9 +445,8 @@ class App(NonLinearVectorField2D):
         self.destroy_widgets_after_sliders()
         self.sliderslist = []
         self.sliderslist_symbols = []
-        vx_defaults = self._vx.get_default_values()
-        vy_defaults = self._vy.get_default_values()
-        parameters = set(self._vx.parameters + self._vy.parameters)
+        parameters = list(dict.fromkeys(self._vx.parameters
+                                        + self._vy.parameters))
         for i, symbol in enumerate(parameters):
             self.sliderslist_symbols.append(symbol)
             self.sliderslist.append(tk.Scale(self.window,
@@ -320,13 +456,13 @@ class App(NonLinearVectorField2D):
                                              resolution=0.01,
                                              orient=tk.HORIZONTAL,
                                              length=200,
-                                             command=self.slider_update))
+                                             command=lambda value, s=symbol:
+                                             self.slider_update(s, value)))
             self.sliderslist[i].grid(row=i + 8, column=3,
                                      padx=(10, 10), pady=(0, 0))
-            if symbol in self._vx.parameters:
-                self.sliderslist[i].set(vx_defaults[symbol])
-            if symbol in self._vy.parameters:
-                self.sliderslist[i].set(vy_defaults[symbol])
+            # The sliders start at the current values, which are
+            # the defaults unless a session was restored.
+            self.sliderslist[i].set(self.get_parameter(symbol))
         self.set_widgets_after_sliders(len(parameters) + 8)
 
     def set_widgets_after_sliders(self, index: int) -> None:
@@ -357,53 +493,83 @@ class App(NonLinearVectorField2D):
         if self.quit_button is not None:
             self.quit_button.destroy()
 
+    def toggle_frame_stats(self, *event: tk.Event) -> None:
+        """
+        Show or hide the frame timing statistics on the plot.
+        """
+        if self.get_frame_stats() is None:
+            self.enable_frame_stats(overlay=True)
+        else:
+            self.disable_frame_stats()
+
+    def toggle_recording(self, *event: tk.Event) -> None:
+        """
+        Start writing the trajectory to a file chosen by the user,
+        or stop if it is already being written.
+        """
+        if self.is_recording():
+            self.stop_recording()
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".npy",
+            filetypes=[("Trajectory log", "*.npy")])
+        if path:
+            self.start_recording(path)
+
+    def update(self, delta_t: float) -> None:
+        """
+        Apply any changes from the widgets, then update
+        the vector field for this frame.
+        """
+        self.scheduler.flush()
+        NonLinearVectorField2D.update(self, delta_t)
+
     def popup_menu(self, event: tk.Event) -> None:
         """
         popup menu upon right click.
         """
         self.menu.tk_popup(event.x_root, event.y_root, 0)
 
-    # def zoom(self, event: tk.Event) -> None:
-    #     """
-    #     Zoom in and out of the plot.
-    #     """
-    #     if event.delta == -120 or event.num == 5:
-    #         x_scale_factor, y_scale_factor = 1.1, 1.1
-    #     elif event.delta == 120 or event.num == 4:
-    #         x_scale_factor, y_scale_factor = 0.9, 0.9
-    #     ax = self.figure.get_axes()[0]
-    #     xlim = ax.get_xlim()
-    #     ylim = ax.get_ylim()
-    #     dx = xlim[1] - xlim[0]
-    #     dy = ylim[1] - ylim[0]
-    #     xc = (xlim[1] + xlim[0])/2
-    #     yc = (ylim[1] + ylim[0])/2
-    #     xlim = (xc - x_scale_factor*dx/2.0, xc + x_scale_factor*dx/2.0)
-    #     ylim = (yc - y_scale_factor*dy/2.0, yc + y_scale_factor*dy/2.0)
-    #     # self.plot_vector_field()
-    #     # self.set_sliders()
-    #     self.set_bounds([xlim[0], xlim[1], ylim[0], ylim[1]])
-    #     # self.plot_vector_field()
-    #     self._zoom = True
-    #     # self.set_bounds([xlim[0], xlim[1], ylim[0], ylim[1]])
-
-    # def _clear_plot_after_zoom_or_move(self) -> None:
-    #     """
-    #     Clear the plot after a zoom or a move.
-    #     """
-    #     if self._zoom:
-    #         self.plot_vector_field()
-    #         self._zoom = False
+    def zoom(self, event: tk.Event) -> None:
+        """
+        Zoom in and out of the plot.
+        """
+        if event.delta < 0 or event.num == 5:
+            self._zoom_level += 1
+        elif event.delta > 0 or event.num == 4:
+            self._zoom_level -= 1
+        else:
+            return
+        scale_factor = 2.0**(self._zoom_level/4.0)
+        bounds = self._get_view_bounds()
+        xc = (bounds[1] + bounds[0])/2
+        yc = (bounds[3] + bounds[2])/2
+        dx = scale_factor*(self._home_bounds[1] - self._home_bounds[0])
+        dy = scale_factor*(self._home_bounds[3] - self._home_bounds[2])
+        self.scheduler.request(
+            self.scheduler.BOUNDS,
+            [xc - dx/2.0, xc + dx/2.0, yc - dy/2.0, yc + dy/2.0])
 
     def quit(self, *event: tk.Event) -> None:
         """
         Quit the application.
         """
+        self.set_background_simulation(False)
+        self.stop_recording()
+        self.stop_animation()
         self.window.quit()
         self.window.destroy()
 
 
 if __name__ == "__main__":
-    app = App()
+    parser = argparse.ArgumentParser(description="Nonlinear vector fields "
+                                     "in 2D.")
+    parser.add_argument("session", nargs="?",
+                        help="a session snapshot to restore")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long each phase of starting "
+                        "takes, up to the first frame")
+    args = parser.parse_args()
+    app = App(args.session, args.profile_startup)
     app.animation_loop()
     tk.mainloop()
@@ -0,0 +1,108 @@
+"""
+Fixed capacity storage for the most recent points of a trajectory.
+"""
+import numpy as np
+
+
+class TrajectoryBuffer:
+    """
+    Stores the most recent points of a trajectory in a preallocated
+    numpy array, where the oldest points are dropped once there are
+    more than max_length of them. The array has room for twice
+    max_length points, so that the stored points are always contiguous
+    and can be accessed as views, without the points being shifted
+    as they are added. Plotting them still copies the views, since
+    Line2D.set_data copies its input, but this copy is at most
+    max_length points however long the trajectory gets.
+
+    Attributes:
+    max_length [int]: The maximum number of points kept.
+    """
+
+    # Private Attributes:
+    # _data [np.ndarray]: (2, 2*max_length) array of x and y values
+    # _start [int]: column of the oldest point
+    # _end [int]: column after the most recent point
+
+    def __init__(self, max_length: int = 10000) -> None:
+        """
+        The initializer.
+
+        >>> buffer = TrajectoryBuffer(3)
+        >>> for i in range(5):
+        ...     buffer.append(float(i), -float(i))
+        >>> buffer.x, buffer.y
+        (array([2., 3., 4.]), array([-2., -3., -4.]))
+        >>> buffer.extend(np.arange(5.0, 9.0), np.zeros(4))
+        >>> buffer.x
+        array([6., 7., 8.])
+        """
+        self.max_length = max_length
+        self._data = np.zeros([2, 2*max_length])
+        self._start = 0
+        self._end = 0
+
+    @property
+    def x(self) -> np.ndarray:
+        """
+        View of the x values.
+        """
+        return self._data[0, self._start:self._end]
+
+    @property
+    def y(self) -> np.ndarray:
+        """
+        View of the y values.
+        """
+        return self._data[1, self._start:self._end]
+
+    def __len__(self) -> int:
+        """
+        The number of points stored.
+        """
+        return self._end - self._start
+
+    def _make_room(self, n: int) -> None:
+        """
+        Move the points that are kept after adding n more points to
+        the front of the array, if there is no room for them at the end.
+        """
+        if self._end + n > self._data.shape[1]:
+            keep = min(len(self), self.max_length - n)
+            self._data[:, :keep] = self._data[:, self._end - keep:self._end]
+            self._start, self._end = 0, keep
+
+    def append(self, x: float, y: float) -> None:
+        """
+        Add a point.
+        """
+        if self._end == self._data.shape[1]:
+            self._make_room(1)
+        self._data[0, self._end] = x
+        self._data[1, self._end] = y
+        self._end += 1
+        if self._end - self._start > self.max_length:
+            self._start += 1
+
+    def extend(self, x: np.ndarray, y: np.ndarray) -> None:
+        """
+        Add several points.
+        """
+        n = min(len(x), self.max_length)
+        self._make_room(n)
+        self._data[0, self._end:self._end + n] = x[len(x) - n:]
+        self._data[1, self._end:self._end + n] = y[len(y) - n:]
+        self._end += n
+        self._start = max(self._start, self._end - self.max_length)
+
+    def clear(self) -> None:
+        """
+        Remove every point.
+        """
+        self._start = 0
+        self._end = 0
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
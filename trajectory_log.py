@@ -0,0 +1,227 @@
+"""
+Append-only storage of long trajectories on disk.
+
+A trajectory log is a .npy file of float64 with a row of x and y values
+for each point, so that it can be read with np.load(path, mmap_mode="r")
+without copying it into memory. Separate trajectories in the same log
+are separated by a row of nan. The header has a fixed size, so the shape
+in it can be rewritten in place as points are added, and the file is
+grown a chunk at a time and written through a memory map. The header is
+rewritten every so many points, so a log that is still being recorded
+can be read, up to the points counted in its header. A finished log
+can be exported to a compressed .npz file, one chunk at a time:
+
+    python trajectory_log.py trajectory.npy trajectory.npz
+"""
+import os
+import sys
+import zipfile
+import numpy as np
+from typing import Sequence
+
+
+HEADER_SIZE = 128
+
+
+def make_header(length: int) -> bytes:
+    """
+    Make the .npy header of a log with the given number of points,
+    padded to HEADER_SIZE bytes.
+
+    >>> header = make_header(10)
+    >>> len(header), header[-1:]
+    (128, b'\\n')
+    """
+    text = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d, 2), }" % (
+        length)
+    prefix = np.lib.format.magic(1, 0)
+    # The magic string, then the length of the rest of the header.
+    size = HEADER_SIZE - len(prefix) - 2
+    text = text.ljust(size - 1) + "\n"
+    return prefix + size.to_bytes(2, "little") + text.encode("latin1")
+
+
+class TrajectoryLog:
+    """
+    Writes the points of a trajectory to a .npy file as they are
+    integrated, so that only the most recent points have to be
+    kept in memory.
+
+    Attributes:
+    path [str]: The path of the file.
+    chunk_size [int]: The number of points the file grows by at a time.
+    header_interval [int]: The number of points after which
+                           the header is rewritten.
+    length [int]: The number of points written so far.
+    """
+
+    # Private Attributes:
+    # _file: the open file, or None once closed
+    # _data [np.memmap]: (capacity, 2) map of the rows of the file
+    # _capacity [int]: the number of rows the file has room for
+    # _header_length [int]: the number of points in the header
+
+    def __init__(self, path: str, chunk_size: int = 65536,
+                 header_interval: int = 1024) -> None:
+        """
+        The initializer. The file is created, or overwritten
+        if it already exists.
+
+        >>> import tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "log.npy")
+        >>> log = TrajectoryLog(path, chunk_size=4)
+        >>> log.extend([1.0, 2.0, 3.0], [4.0, 5.0, 6.0])
+        >>> log.append(7.0, 8.0)
+        >>> log.append(9.0, 10.0)
+        >>> log.close()
+        >>> np.load(path, mmap_mode="r")[:, 0].tolist()
+        [1.0, 2.0, 3.0, 7.0, 9.0]
+        >>> os.path.getsize(path) == HEADER_SIZE + 5*2*8
+        True
+        >>> log = TrajectoryLog(path, header_interval=2)
+        >>> log.extend([1.0, 2.0, 3.0], [4.0, 5.0, 6.0])
+        >>> np.load(path, mmap_mode="r").shape
+        (3, 2)
+        >>> log.close()
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.header_interval = header_interval
+        self.length = 0
+        self._file = open(path, "w+b")
+        self._file.write(make_header(0))
+        self._data = None
+        self._capacity = 0
+        self._header_length = 0
+
+    def _grow(self, n: int) -> None:
+        """
+        Make room in the file for n more points.
+        """
+        if self.length + n <= self._capacity:
+            return
+        if self._data is not None:
+            # Unmap the file before resizing it.
+            self.flush()
+            self._data = None
+        chunks = -(-(self.length + n - self._capacity)//self.chunk_size)
+        self._capacity += chunks*self.chunk_size
+        self._file.truncate(HEADER_SIZE + self._capacity*2*8)
+        self._data = np.memmap(self._file, dtype="<f8", mode="r+",
+                               offset=HEADER_SIZE,
+                               shape=(self._capacity, 2))
+
+    def append(self, x: float, y: float) -> None:
+        """
+        Add a point.
+        """
+        self._grow(1)
+        self._data[self.length] = (x, y)
+        self.length += 1
+        self._update_header()
+
+    def extend(self, x: Sequence[float], y: Sequence[float]) -> None:
+        """
+        Add several points.
+        """
+        n = len(x)
+        self._grow(n)
+        self._data[self.length:self.length + n, 0] = x
+        self._data[self.length:self.length + n, 1] = y
+        self.length += n
+        self._update_header()
+
+    def _update_header(self) -> None:
+        """
+        Rewrite the header if enough points were added since it was last
+        written. The points written through the memory map can already
+        be read by other processes, so only the shape has to change.
+        """
+        if self.length - self._header_length >= self.header_interval:
+            self._write_header()
+
+    def _write_header(self) -> None:
+        """
+        Write the current number of points to the header.
+        """
+        self._file.seek(0)
+        self._file.write(make_header(self.length))
+        self._file.flush()
+        self._header_length = self.length
+
+    def break_line(self) -> None:
+        """
+        End the current trajectory, so that the next point
+        starts a new one.
+        """
+        if self.length and not np.isnan(self._data[self.length - 1, 0]):
+            self.append(np.nan, np.nan)
+
+    def flush(self) -> None:
+        """
+        Write the points so far and the header to the file, so that
+        the points can be read while more are added.
+        """
+        if self._data is not None:
+            self._data.flush()
+        self._write_header()
+
+    def close(self) -> None:
+        """
+        Write everything to the file, and cut off the room
+        that wasn't used.
+        """
+        if self._file is None:
+            return
+        self.flush()
+        self._data = None
+        self._file.truncate(HEADER_SIZE + self.length*2*8)
+        self._file.close()
+        self._file = None
+
+    def is_closed(self) -> bool:
+        """
+        Check if the log is closed.
+        """
+        return self._file is None
+
+
+def load_trajectory(path: str) -> np.ndarray:
+    """
+    Get the (N, 2) points of a trajectory log, mapped from the file
+    without reading it into memory.
+    """
+    return np.load(path, mmap_mode="r")
+
+
+def export_compressed(path: str, output: str,
+                      chunk_size: int = 1 << 20) -> None:
+    """
+    Export a trajectory log to a compressed .npz file, with the points
+    as the array xy, reading chunk_size points at a time.
+
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> log = TrajectoryLog(os.path.join(directory, "log.npy"))
+    >>> log.extend(np.arange(100.0), np.zeros(100))
+    >>> log.close()
+    >>> export_compressed(log.path, os.path.join(directory, "log.npz"), 7)
+    >>> xy = np.load(os.path.join(directory, "log.npz"))["xy"]
+    >>> xy.shape, float(xy[:, 0].sum())
+    ((100, 2), 4950.0)
+    """
+    data = load_trajectory(path)
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        with archive.open("xy.npy", "w", force_zip64=True) as stream:
+            stream.write(make_header(len(data)))
+            for start in range(0, len(data), chunk_size):
+                stream.write(np.ascontiguousarray(
+                    data[start:start + chunk_size]).tobytes())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        export_compressed(sys.argv[1], sys.argv[2])
+    else:
+        import doctest
+        doctest.testmod()
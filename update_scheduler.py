@@ -0,0 +1,83 @@
+"""
+Coalesce changes made from the GUI into a single update.
+"""
+from typing import Any, Callable, Dict
+
+
+class UpdateScheduler:
+    """
+    Collects requested changes to the expressions, bounds and parameters
+    of the vector field, keeping only the latest value of each, and
+    applies all of them together when flushed. Flushing once per
+    animation frame means that dragging a slider or rebuilding the
+    sliders causes at most one recompute of the field per frame.
+
+    Attributes:
+    apply [Callable]: Called with a dict of the pending changes,
+                      keyed by EXPRESSIONS, BOUNDS or PARAMETERS.
+                      The value for PARAMETERS is a dict of the latest
+                      value of each changed parameter.
+    """
+
+    EXPRESSIONS = "expressions"
+    BOUNDS = "bounds"
+    PARAMETERS = "parameters"
+
+    def __init__(self, apply: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        The initializer.
+
+        >>> applied = []
+        >>> scheduler = UpdateScheduler(applied.append)
+        >>> for value in [1.0, 2.0, 3.0]:
+        ...     scheduler.request(scheduler.PARAMETERS, {"a": value})
+        >>> scheduler.request(scheduler.PARAMETERS, {"b": 0.5})
+        >>> scheduler.request(scheduler.BOUNDS, [0.0, 1.0, 0.0, 1.0])
+        >>> scheduler.flush(), scheduler.flush()
+        (True, False)
+        >>> applied
+        [{'parameters': {'a': 3.0, 'b': 0.5}, 'bounds': [0.0, 1.0, 0.0, 1.0]}]
+        """
+        self.apply = apply
+        self._pending = {}
+
+    def request(self, kind: str, value: Any) -> None:
+        """
+        Request a change, which replaces any pending change of the
+        same kind. Parameter changes are merged instead.
+        """
+        if kind == self.PARAMETERS:
+            self._pending.setdefault(kind, {}).update(value)
+        else:
+            self._pending[kind] = value
+
+    def get_pending(self, kind: str, default: Any = None) -> Any:
+        """
+        Get the pending change of the given kind, or default
+        if there isn't one.
+        """
+        return self._pending.get(kind, default)
+
+    def has_pending(self) -> bool:
+        """
+        Check if there are changes that have not been applied.
+        """
+        return bool(self._pending)
+
+    def flush(self) -> bool:
+        """
+        Apply the pending changes, if there are any,
+        and return whether anything was applied.
+        """
+        if not self._pending:
+            return False
+        pending = self._pending
+        # Changes requested while applying are left for the next flush.
+        self._pending = {}
+        self.apply(pending)
+        return True
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -3,15 +3,34 @@ Abstract vector field in 2D.
 """
 import numpy as np
 from animator import Animator
-from matplotlib.pyplot import grid
-from typing import List
+from field_image import get_streamline_image, line_integral_convolution
+from tiled_field_cache import TiledFieldCache
+from fixed_points import FixedPoint
+from typing import Hashable, List, Tuple, Union
 
 
 class BaseVectorField2D(Animator):
     """
     Abstract VectorField2D class.
+
+    The vector field is drawn as arrows, as an image of its streamlines,
+    or both, depending on the field mode. The nullclines and fixed points
+    can also be shown on top of these.
     """
 
+    ARROWS = "arrows"
+    STREAMLINES = "streamlines"
+    ARROWS_AND_STREAMLINES = "arrows and streamlines"
+    # Face colour of the marker of each kind of fixed point,
+    # where stable points are filled and unstable ones are empty.
+    FIXED_POINT_COLOURS = {"stable node": "black",
+                           "stable spiral": "black",
+                           "unstable node": "white",
+                           "unstable spiral": "white",
+                           "saddle": "grey",
+                           "center": "lightgrey",
+                           "degenerate": "lightgrey"}
+
     def __init__(self, bounds: List[float]) -> None:
         """
         Initializer for the BaseVectorField2D class.
@@ -25,7 +44,19 @@ class BaseVectorField2D(Animator):
         self.title = None
         self.text = None
         self.line = None
+        self.field_image = None
+        self.show_nullclines = False
+        self.nullclines = []
+        self.fixed_points = []
+        self.fixed_point_plot = None
         self.bounds = [0.0, 0.0, 0.0, 0.0]
+        # Number of arrows along each axis, or "auto" to
+        # choose this from the size of the plot.
+        self.field_resolution = 21
+        self.field_mode = self.ARROWS
+        self.field_cache = TiledFieldCache()
+        self._field_key = None
+        self.grid = None
         self.set_coords(*bounds)
         self.set_values()
         self.set_plotting_objects()
@@ -45,18 +76,77 @@ class BaseVectorField2D(Animator):
         """
 
         # Number of points for each axis
-        N = 21
+        N = self.get_field_resolution()
 
         # Dimensions of the plot
         self.bounds = np.array([xmin, xmax, ymin, ymax])
 
-        x = np.outer(np.ones([N]),
-                     np.linspace(self.bounds[0], self.bounds[1], N))
-        y = np.outer(np.linspace(self.bounds[2], self.bounds[3], N),
-                     np.ones([N]))
+        # The points lie on a lattice with the same spacing along both
+        # axes, so that they stay in place when the plot is moved
+        # around, and their values can be cached.
+        spacing = (xmax - xmin)/(N - 1)
+        j0 = int(np.ceil(xmin/spacing - 1e-9))
+        i0 = int(np.ceil(ymin/spacing - 1e-9))
+        rows = max(2, int(round((ymax - ymin)/spacing)) + 1)
+        self.grid = (spacing, i0, j0, rows, N)
+
+        x = np.outer(np.ones([rows]), (j0 + np.arange(N))*spacing)
+        y = np.outer((i0 + np.arange(rows))*spacing, np.ones([N]))
 
         self.xy = [x, y]
 
+    def get_field_resolution(self) -> int:
+        """
+        Get the number of arrows along each axis.
+        """
+        if self.field_resolution != "auto":
+            return int(self.field_resolution)
+        axes = self.figure.get_axes()
+        if not axes:
+            return 21
+        # Leave about 30 pixels between each arrow.
+        return int(np.clip(axes[0].bbox.width/30.0, 9, 61))
+
+    def set_field_resolution(self, resolution: Union[int, str]) -> None:
+        """
+        Set the number of arrows along each axis, or "auto"
+        to choose this from the size of the plot.
+        """
+        self.field_resolution = resolution
+        self.set_coords(*self.bounds)
+        self.plot_vector_field(change_title=False)
+
+    def set_field_mode(self, mode: str) -> None:
+        """
+        Set whether the vector field is drawn as arrows,
+        streamlines, or both.
+        """
+        self.field_mode = mode
+        self.plot_vector_field(change_title=False)
+
+    def set_show_nullclines(self, show: bool) -> None:
+        """
+        Set whether the nullclines and fixed points are shown.
+        """
+        self.show_nullclines = show
+        self.plot_vector_field(change_title=False)
+
+    def find_fixed_points(self, xdot: np.ndarray,
+                          ydot: np.ndarray) -> List[FixedPoint]:
+        """
+        Find the fixed points within the bounds, given the values
+        of the field at the points of the quiver plot.
+        """
+        return []
+
+    def field_key(self) -> Hashable:
+        """
+        Get a key that identifies the vector field along with its
+        parameters, or None if the field can't be identified.
+        This is used to cache what is drawn from the field.
+        """
+        return None
+
     def set_simulation_speed(self, speed):
         """
         Setter for the simulation speed.
@@ -100,7 +190,7 @@ class BaseVectorField2D(Animator):
         #                   - 0.1*(self.bounds[3] - self.bounds[2]),
         #                  "", color="black")
         # self.title.set_bbox({"facecolor": "white", "alpha": 1.0})
-        grid()
+        ax.grid()
 
     def plot_trajectories(self, init_call: bool = False) -> None:
         """
@@ -113,16 +203,128 @@ class BaseVectorField2D(Animator):
         """
         Plot the vector field.
         """
-        xdot, ydot = self.f(self.xy)
-        if init_call:
-            self.line = self.figure.get_axes()[0].quiver(self.xy[0], self.xy[1],
-                                                         xdot, ydot, color="black")
-
+        xdot, ydot = self.evaluate_field()
+        if init_call or self.line.N != self.xy[0].size:
+            self._replace_quiver(xdot, ydot)
         else:
+            self._move_quiver()
             self.line.set_UVC(xdot, ydot)
+        self.line.set_visible(self.field_mode != self.STREAMLINES)
+        self.plot_field_image()
+        self.plot_nullclines(xdot, ydot)
         self.plot_trajectories(init_call=init_call)
         if change_title:
             self.set_title()
+        self.invalidate_background()
+
+    def evaluate_field(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate the vector field at the points of the quiver plot,
+        using the cached values where there are any.
+        """
+        key = self.field_key()
+        if key is None:
+            return self.f(self.xy)
+        spacing, i0, j0, _, _ = self.grid
+        if (key != self._field_key
+                and not self.field_cache.contains(key, spacing, i0, j0)):
+            # The key changes with every tick of a parameter slider,
+            # and whole tiles of a key that is unlikely to be seen
+            # again aren't worth evaluating, so only the points of the
+            # plot are. The tiles are cached once the view moves.
+            self._field_key = key
+            u, v = self.f(self.xy)
+            return (np.broadcast_to(u, self.xy[0].shape),
+                    np.broadcast_to(v, self.xy[0].shape))
+        self._field_key = key
+        return self.field_cache.evaluate(self.f, key, *self.grid)
+
+    def _move_quiver(self) -> None:
+        """
+        Move the arrows of the quiver plot to the current points.
+        """
+        # The arrows are placed at the offsets, since
+        # their angles don't depend on the data coordinates.
+        self.line.set_offsets(np.column_stack((self.xy[0].ravel(),
+                                               self.xy[1].ravel())))
+
+    def _replace_quiver(self, xdot: np.ndarray, ydot: np.ndarray) -> None:
+        """
+        Make a new quiver plot, for when the number of arrows changes.
+        """
+        old_line = self.line
+        self.line = self.figure.get_axes()[0].quiver(
+            self.xy[0], self.xy[1], xdot, ydot, color="black")
+        if old_line is None:
+            self.add_plot(self.line, static=True)
+        else:
+            self.replace_plot(old_line, self.line)
+
+    def plot_field_image(self) -> None:
+        """
+        Plot the image of the streamlines of the vector field,
+        if the field mode includes them.
+        """
+        if self.field_mode == self.ARROWS:
+            if self.field_image is not None:
+                self.field_image.set_visible(False)
+            return
+        ax = self.figure.get_axes()[0]
+        # Use about one pixel of the image for every two on the screen.
+        shape = (int(np.clip(ax.bbox.height/2.0, 64, 512)),
+                 int(np.clip(ax.bbox.width/2.0, 64, 512)))
+        key = self.field_key()
+        if key is None:
+            image = line_integral_convolution(self.f, self.bounds, shape)
+        else:
+            image = get_streamline_image(self.f, key, self.bounds, shape)
+        extent = [self.bounds[0], self.bounds[1],
+                  self.bounds[2], self.bounds[3]]
+        if self.field_image is None:
+            self.field_image = ax.imshow(
+                image, extent=extent, origin="lower", cmap="gray",
+                interpolation="bilinear", alpha=0.6, zorder=0)
+            ax.set_xlim(self.bounds[0], self.bounds[1])
+            ax.set_ylim(self.bounds[2], self.bounds[3])
+            self.add_plot(self.field_image, static=True)
+        else:
+            self.field_image.set_data(image)
+            self.field_image.set_extent(extent)
+        self.field_image.set_visible(True)
+
+    def plot_nullclines(self, xdot: np.ndarray, ydot: np.ndarray) -> None:
+        """
+        Plot the nullclines and fixed points, if these are shown,
+        from the values of the field at the points of the quiver plot.
+        """
+        for contour in self.nullclines:
+            self.remove_plot(contour)
+        self.nullclines = []
+        if not self.show_nullclines:
+            if self.fixed_point_plot is not None:
+                self.fixed_point_plot.set_visible(False)
+            self.fixed_points = []
+            return
+        ax = self.figure.get_axes()[0]
+        x, y = self.xy
+        for w, colour in ((xdot, "tab:red"), (ydot, "tab:green")):
+            w = np.broadcast_to(w, x.shape)
+            if np.nanmin(w) <= 0.0 <= np.nanmax(w):
+                contour = ax.contour(x, y, w, levels=[0.0], colors=colour,
+                                     linewidths=1.0, zorder=2)
+                self.add_plot(contour, static=True)
+                self.nullclines.append(contour)
+        self.fixed_points = self.find_fixed_points(xdot, ydot)
+        offsets = np.array([[p.x, p.y] for p in self.fixed_points])
+        colours = [self.FIXED_POINT_COLOURS[p.kind]
+                   for p in self.fixed_points]
+        if self.fixed_point_plot is None:
+            self.fixed_point_plot = ax.scatter(
+                [], [], s=30.0, edgecolors="black", zorder=3)
+            self.add_plot(self.fixed_point_plot, static=True)
+        self.fixed_point_plot.set_offsets(offsets.reshape(-1, 2))
+        self.fixed_point_plot.set_facecolors(colours)
+        self.fixed_point_plot.set_visible(True)
 
     def update(self, delta_t: float) -> None:
         """